@@ -0,0 +1,736 @@
+import argparse
+import bisect
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import socket as socket_module
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import project
+from project import (CSV, ColumnarStore, DEFAULT_CONFIG, DuplicateCheck, LedgerWriter, ShardedStore, budget_status,
+                     convert_amounts, daemon_request, format_transaction_table, generate_report, load_fx_rates,
+                     profiling, rebuild_budget_counters, rebuild_fingerprints, rebuild_search_index,
+                     search_transactions, split_ledger)
+
+
+# Per-subcategory (relative frequency, median amount, log-space spread) for the
+# default categories; subcategories only found in a custom config use the fallbacks
+AMOUNT_PROFILES = {
+    "Salary": (3, 3200, 0.15),
+    "Freelance": (1, 650, 0.8),
+    "Investments": (1, 180, 1.1),
+    "Other Income": (1, 90, 1.0),
+    "Food": (25, 24, 0.7),
+    "Transportation": (10, 16, 0.8),
+    "Housing": (2, 1250, 0.2),
+    "Utilities": (4, 95, 0.4),
+    "Healthcare": (3, 60, 1.0),
+    "Entertainment": (8, 32, 0.8),
+    "Shopping": (10, 45, 1.0),
+    "Other Expenses": (5, 30, 1.0),
+}
+FALLBACK_PROFILES = {"Income": (1, 250, 1.0), "Expense": (5, 40, 1.0)}
+MERCHANTS = ["Acme", "Northwind", "Contoso", "Globex", "Initech", "Umbrella", "Hooli", "Stark",
+             "Wayne", "Wonka", "Tyrell", "Cyberdyne", "Soylent", "Vandelay", "Pied Piper", "Dunder"]
+# The config the synthetic ledgers draw their categories from (see --config)
+SYNTHETIC_CONFIG = DEFAULT_CONFIG
+
+
+def generate_ledger(path, rows, seed=0, start="01-01-2000", end="31-12-2025", config=None, chunk_rows=1_000_000):
+    """Write a synthetic ledger of `rows` transactions in random date order.
+
+    Categories and subcategories come from `config` (default SYNTHETIC_CONFIG),
+    with per-subcategory frequencies and lognormal amounts from AMOUNT_PROFILES.
+    Weekends and December are busier. The output depends only on the arguments,
+    and is written `chunk_rows` at a time so 10M-row ledgers fit in memory.
+    """
+    config = config or SYNTHETIC_CONFIG
+    rng = np.random.default_rng(seed)
+    start_day = CSV._day_number(start)
+    end_day = CSV._day_number(end)
+    calendar = pd.to_datetime(np.arange(start_day, end_day + 1) - CSV.EPOCH_DAY, unit="D")
+    day_weights = np.where(calendar.dayofweek >= 5, 1.4, 1.0) * np.where(calendar.month == 12, 1.3, 1.0)
+    day_weights /= day_weights.sum()
+    day_labels = np.asarray(calendar.strftime(CSV.FORMAT), dtype=object)
+
+    profiles = [(category, subcategory) + AMOUNT_PROFILES.get(subcategory, FALLBACK_PROFILES.get(category, (5, 40, 1.0)))
+                for category, subcategories in config["categories"].items() for subcategory in subcategories]
+    weights = np.array([profile[2] for profile in profiles], dtype=float)
+    medians = np.log([profile[3] for profile in profiles])
+    sigmas = np.array([profile[4] for profile in profiles])
+    categories = np.array([profile[0] for profile in profiles], dtype=object)
+    subcategories = np.array([profile[1] for profile in profiles], dtype=object)
+    descriptions = np.array([f"{merchant} {subcategory.lower()}" for subcategory in subcategories
+                             for merchant in MERCHANTS], dtype=object)
+
+    with open(path, "w", newline="") as f:
+        f.write(",".join(CSV.COLUMNS) + "\n")
+        for offset in range(0, rows, chunk_rows):
+            size = min(chunk_rows, rows - offset)
+            days = rng.choice(len(day_weights), size=size, p=day_weights)
+            kind = rng.choice(len(profiles), size=size, p=weights / weights.sum())
+            amount = np.round(np.exp(medians[kind] + sigmas[kind] * rng.standard_normal(size)), 2)
+            merchant = rng.integers(0, len(MERCHANTS), size=size)
+            pd.DataFrame({
+                "date": day_labels[days],
+                "amount": np.maximum(amount, 0.01),
+                "category": categories[kind],
+                "subcategory": subcategories[kind],
+                "description": descriptions[kind * len(MERCHANTS) + merchant],
+            }, columns=CSV.COLUMNS).to_csv(f, header=False, index=False)
+    return path
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_range_query(rows, repeat=3):
+    """Compare a one-week range query via the date index against a full scan."""
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+
+        start = time.perf_counter()
+        CSV.rebuild_index()
+        build = time.perf_counter() - start
+
+        start_date, end_date = "01-06-2015", "07-06-2015"
+        indexed = best_of(lambda: CSV.get_transactions(start_date, end_date), repeat)
+        scan = best_of(lambda: CSV._scan_transactions(start_date, end_date), repeat)
+    print(f"{rows:>10,} rows  index build {build:8.3f}s  "
+          f"indexed {indexed * 1000:9.2f}ms  full scan {scan * 1000:9.2f}ms  "
+          f"speedup {scan / indexed:7.1f}x")
+    return {"index_build_s": build, "indexed_ms": indexed * 1000, "full_scan_ms": scan * 1000}
+
+
+def bench_render(rows, repeat=3, start_date="01-01-2015", end_date="31-12-2015"):
+    """Render a year of transactions with format_transaction_table into a null sink."""
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+        CSV.initialize_csv()
+        df = CSV.get_transactions(start_date, end_date)
+        with open(os.devnull, "w", encoding="utf-8") as sink:
+            full = best_of(lambda: format_transaction_table(df, out=sink), repeat)
+            streamed = best_of(lambda: format_transaction_table(
+                CSV.iter_transactions(start_date, end_date), limit=100, out=sink,
+                totals=CSV.get_summary(start_date, end_date)), repeat)
+    print(f"{rows:>10,} rows  {len(df):>9,} shown  full table {full:8.3f}s {len(df) / full:12,.0f} rows/s  "
+          f"first 100 + totals {streamed * 1000:9.2f}ms")
+    return {"full_table_s": full, "full_table_rows_per_s": len(df) / full, "first_page_ms": streamed * 1000}
+
+
+SEARCH_QUERIES = {
+    "word_category_year": dict(words=["acme"], category="Expense", year=2015),
+    "two_words": dict(words=["stark", "salary"]),
+    "subcategory_amount": dict(subcategory="Housing", min_amount=1300, max_amount=1310),
+    "category_year": dict(category="Income", year=2015),
+}
+
+
+def bench_search(rows, repeat=3):
+    """Inverted-index search latency against filtering the fully loaded ledger."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+        CSV.initialize_csv()
+        CSV.rebuild_index()
+        start = time.perf_counter()
+        rebuild_search_index(CSV)
+        metrics["index_build_s"] = time.perf_counter() - start
+        metrics["index_bytes_per_row"] = os.path.getsize(CSV._search_file()) / rows
+
+        def scan(words=(), category=None, subcategory=None, year=None, min_amount=None, max_amount=None):
+            df = CSV.read_ledger()
+            mask = pd.Series(True, index=df.index)
+            for word in words:
+                mask &= df["description"].str.contains(rf"\b{word}\b", case=False, na=False)
+            if category:
+                mask &= df["category"] == category
+            if subcategory:
+                mask &= df["subcategory"] == subcategory
+            if year:
+                mask &= df["date"].dt.year == year
+            if min_amount is not None:
+                mask &= df["amount"] >= min_amount
+            if max_amount is not None:
+                mask &= df["amount"] <= max_amount
+            return df[mask]
+
+        print(f"{rows:>10,} rows  index build {metrics['index_build_s']:7.2f}s  "
+              f"{metrics['index_bytes_per_row']:5.1f} B/row")
+        for name, query in SEARCH_QUERIES.items():
+            matches = len(search_transactions(**query, store=CSV))
+            indexed = best_of(lambda: search_transactions(**query, store=CSV), repeat)
+            full = best_of(lambda: scan(**query), 1)
+            print(f"{rows:>10,} rows  {name:<20} {matches:>8,} matches  indexed {indexed * 1000:9.2f}ms  "
+                  f"full scan {full * 1000:9.2f}ms  speedup {full / indexed:7.1f}x")
+            metrics[f"{name}_ms"] = indexed * 1000
+            metrics[f"{name}_scan_ms"] = full * 1000
+    return metrics
+
+
+def bench_add_entries(rows):
+    """Compare per-row CSV.add_entry against the batched CSV.add_entries path."""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = generate_ledger(os.path.join(tmp, "source.csv"), rows, seed=1)
+        entries = pd.read_csv(source, usecols=CSV.COLUMNS[:5]).to_dict("records")
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        CSV.initialize_csv()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for entry in entries:
+                CSV.add_entry(*entry.values())
+        per_row = time.perf_counter() - start
+
+        CSV.CSV_FILE = os.path.join(tmp, "bulk.csv")
+        CSV.initialize_csv()
+        start = time.perf_counter()
+        CSV.add_entries(entries)
+        bulk = time.perf_counter() - start
+    print(f"{rows:>10,} rows  add_entry {rows / per_row:12,.0f} rows/s  "
+          f"add_entries {rows / bulk:12,.0f} rows/s  speedup {per_row / bulk:7.1f}x")
+    return {"add_entry_rows_per_s": rows / per_row, "add_entries_rows_per_s": rows / bulk}
+
+
+def bench_dedupe(rows):
+    """Re-import a synthetic feed whose first half is already in the ledger, skipping the duplicates."""
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = generate_ledger(os.path.join(tmp, "feed.csv"), rows, seed=2)
+        entries = pd.read_csv(feed, usecols=CSV.COLUMNS[:5]).to_dict("records")
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        with open(feed) as source, open(CSV.CSV_FILE, "w") as ledger:
+            ledger.writelines(itertools.islice(source, rows // 2 + 1))
+        CSV.initialize_csv()
+        CSV.rebuild_index()
+        start = time.perf_counter()
+        rebuild_fingerprints(CSV)
+        build = time.perf_counter() - start
+
+        check = DuplicateCheck(CSV, "skip")
+        with profiling() as metrics, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            imported = CSV.add_entries(entries, check)
+        reimport = metrics["total_seconds"]
+        checking = metrics["stages"]["dedupe.check"]["seconds"]
+        assert check.found == rows // 2 and imported == rows - rows // 2, (check.found, imported)
+
+        # What finding them afterwards costs without the index
+        start = time.perf_counter()
+        CSV.read_ledger().duplicated(["date", "amount", "subcategory", "description"]).sum()
+        scan = time.perf_counter() - start
+    print(f"{rows:>10,} rows  index build {build:7.2f}s  re-import {reimport:7.2f}s ({rows / reimport:10,.0f} rows/s, "
+          f"checks {checking / rows * 1e6:5.2f}us/row)  {check.found:,} skipped  duplicated() scan {scan:7.2f}s")
+    return {"index_build_s": build, "reimport_s": reimport, "reimport_rows_per_s": rows / reimport,
+            "check_s": checking, "duplicated_scan_s": scan}
+
+
+EXPORT_SCRIPT = """
+import json, sys
+from project import CSV, export_ledger
+CSV.CSV_FILE = sys.argv[1]
+stats = export_ledger(sys.argv[2], sys.argv[3])
+print(json.dumps(stats))
+"""
+
+
+def bench_export(rows, formats):
+    """Export a synthetic ledger in a fresh process per format and report peak RSS."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = os.path.join(tmp, "ledger.csv")
+        generate_ledger(ledger, rows)
+        for file_format in formats:
+            output = os.path.join(tmp, f"export.{file_format}")
+            result = subprocess.run(
+                [sys.executable, "-c", EXPORT_SCRIPT, ledger, file_format, output],
+                capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+            )
+            if result.returncode != 0:
+                print(f"{rows:>10,} rows  {file_format:<8} failed: {result.stderr.strip().splitlines()[-1]}")
+                continue
+            stats = json.loads(result.stdout.strip().splitlines()[-1])
+            peak = stats["peak_rss_kb"] / 1024 if stats["peak_rss_kb"] else float("nan")
+            print(f"{rows:>10,} rows  {file_format:<8} {stats['elapsed']:8.2f}s  peak RSS {peak:8.1f} MiB")
+            metrics[f"{file_format}_s"] = stats["elapsed"]
+            metrics[f"{file_format}_peak_rss_mib"] = peak
+    return metrics
+
+
+def bench_typed_load(rows):
+    """Compare the typed CSV.read_ledger load against an untyped read_csv + to_datetime."""
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+
+        start = time.perf_counter()
+        untyped = pd.read_csv(CSV.CSV_FILE)
+        untyped["date"] = pd.to_datetime(untyped["date"], format=CSV.FORMAT)
+        untyped_time = time.perf_counter() - start
+        untyped_bytes = untyped.astype({col: object for col in ["category", "subcategory", "description"]}) \
+            .memory_usage(deep=True).sum()
+        del untyped
+
+        start = time.perf_counter()
+        typed = CSV.read_ledger()
+        typed_time = time.perf_counter() - start
+        typed_bytes = typed.memory_usage(deep=True).sum()
+    print(f"{rows:>10,} rows  untyped {untyped_time:7.2f}s {untyped_bytes / rows:7.1f} B/row  "
+          f"typed {typed_time:7.2f}s {typed_bytes / rows:7.1f} B/row")
+    return {"untyped_load_s": untyped_time, "typed_load_s": typed_time,
+            "untyped_bytes_per_row": untyped_bytes / rows, "typed_bytes_per_row": typed_bytes / rows}
+
+
+def bench_backends(rows, repeat=3):
+    """Compare full loads and narrow range queries on the CSV and columnar backends."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        ColumnarStore.DATA_DIR = os.path.join(tmp, "ledger.cols")
+        generate_ledger(CSV.CSV_FILE, rows)
+        ColumnarStore.initialize_csv()
+        for chunk in CSV.read_ledger(chunksize=100_000, parse_dates=False):
+            ColumnarStore.add_entries(chunk.astype(object).where(chunk.notna(), "").to_dict("records"))
+        CSV.rebuild_index()
+
+        start_date, end_date = "01-06-2015", "07-06-2015"
+        for name, store in (("csv", CSV), ("columnar", ColumnarStore)):
+            load = best_of(lambda: store.read_ledger(), repeat)
+            query = best_of(lambda: store.get_transactions(start_date, end_date), repeat)
+            print(f"{rows:>10,} rows  {name:<9} full load {load:8.3f}s  range query {query * 1000:9.2f}ms")
+            metrics[f"{name}_full_load_s"] = load
+            metrics[f"{name}_range_query_ms"] = query * 1000
+    return metrics
+
+
+def _concurrent_writer(csv_file, worker, rows, batch_size):
+    CSV.CSV_FILE = csv_file
+    with LedgerWriter(CSV, batch_size=batch_size, max_delay=60) as writer:
+        for i in range(rows):
+            writer.add({"date": "15-06-2015", "amount": 12.5, "category": "Expense",
+                        "subcategory": "Food", "description": f"w{worker}-{i}"})
+
+
+def bench_concurrent_writers(workers, rows_per_worker, batch_size):
+    """Measure locked, journaled commit throughput with several writer processes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        CSV.initialize_csv()
+        context = multiprocessing.get_context("fork")
+        processes = [context.Process(target=_concurrent_writer, args=(CSV.CSV_FILE, w, rows_per_worker, batch_size))
+                     for w in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        written = len(pd.read_csv(CSV.CSV_FILE))
+    rows = workers * rows_per_worker
+    commits = workers * -(-rows_per_worker // batch_size)
+    status = "ok" if written == rows else f"LOST {rows - written} ROWS"
+    print(f"{workers:>3} writers  batch {batch_size:>5}  {rows / elapsed:10,.0f} rows/s  "
+          f"{commits / elapsed:8,.0f} commits/s  {status}")
+    return {"rows_per_s": rows / elapsed, "commits_per_s": commits / elapsed, "lost_rows": rows - written}
+
+
+def _import_time_ms(module):
+    """Cumulative import time of `module` in a fresh interpreter, from python -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    return float("nan")
+
+
+def bench_startup(repeat=5):
+    """Compare the CLI's import time with the pandas import it now defers."""
+    metrics = {}
+    for module in ("project", "pandas"):
+        best = min(_import_time_ms(module) for _ in range(repeat))
+        print(f"import {module:<10} {best:8.1f}ms")
+        metrics[f"import_{module}_ms"] = best
+    return metrics
+
+
+def bench_daemon(rows, client_counts=(1, 4, 16), requests_per_client=200):
+    """Latency and throughput of monthly summaries from a resident daemon vs a cold CLI run."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_ledger(os.path.join(tmp, "finance_data.csv"), rows)
+        shutil.copy(os.path.join(here, "finance_config.json"), tmp)
+        socket_path = os.path.join(tmp, "daemon.sock")
+        project = os.path.join(here, "project.py")
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, project, "summary", "01-06-2015", "30-06-2015"],
+                       cwd=tmp, capture_output=True, check=True)
+        metrics["cold_cli_ms"] = (time.perf_counter() - start) * 1000
+        print(f"{rows:>10,} rows  cold CLI summary {metrics['cold_cli_ms']:9.1f}ms")
+
+        server = subprocess.Popen([sys.executable, project, "serve", "--socket", socket_path],
+                                  cwd=tmp, stdout=subprocess.DEVNULL)
+        try:
+            start = time.perf_counter()
+            while True:
+                try:
+                    daemon_request({"op": "ping"}, socket_path)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            metrics["ready_s"] = time.perf_counter() - start
+            print(f"{rows:>10,} rows  daemon ready in {metrics['ready_s']:6.2f}s")
+
+            for clients in client_counts:
+                latencies = []
+
+                def client(seed):
+                    for i in range(requests_per_client):
+                        month = (seed + i) % 12 + 1
+                        begin = time.perf_counter()
+                        daemon_request({"op": "summary", "start": f"01-{month:02d}-2015",
+                                        "end": f"28-{month:02d}-2015"}, socket_path)
+                        latencies.append(time.perf_counter() - begin)
+
+                threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+                start = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+                latencies.sort()
+                p99 = latencies[int(len(latencies) * 0.99) - 1]
+                print(f"{rows:>10,} rows  {clients:>3} clients  {len(latencies) / elapsed:8,.0f} req/s  "
+                      f"p50 {statistics.median(latencies) * 1000:7.2f}ms  p99 {p99 * 1000:7.2f}ms")
+                metrics[f"clients{clients}_requests_per_s"] = len(latencies) / elapsed
+                metrics[f"clients{clients}_p50_ms"] = statistics.median(latencies) * 1000
+                metrics[f"clients{clients}_p99_ms"] = p99 * 1000
+        finally:
+            daemon_request({"op": "shutdown"}, socket_path)
+            server.wait(timeout=30)
+    return metrics
+
+
+def bench_budgets(rows, repeat=3, adds=200):
+    """Budget checks from the running counters vs recomputing a month's spend from the ledger."""
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+        config = json.loads(json.dumps(DEFAULT_CONFIG))
+        config["budgets"] = {name: {"monthly": 500, "yearly": 6000} for name in config["categories"]["Expense"]}
+        saved_config = project.CONFIG_FILE
+        project.CONFIG_FILE = os.path.join(tmp, "config.json")
+        try:
+            project.save_config(config)
+            CSV.initialize_csv()
+
+            start = time.perf_counter()
+            rebuild_budget_counters(CSV)
+            rebuild = time.perf_counter() - start
+
+            day = date(2015, 6, 15)
+            check = best_of(lambda: budget_status(CSV, day.toordinal()), repeat)
+
+            def recompute():
+                df = CSV.read_ledger(columns=["date", "amount", "category", "subcategory"])
+                month = df[(df["category"] == "Expense") & (df["date"].dt.year == day.year)
+                           & (df["date"].dt.month == day.month)]
+                return month.groupby("subcategory", observed=True)["amount"].sum()
+            scan = best_of(recompute, 1)
+
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                for _ in range(adds):
+                    CSV.add_entry("15-06-2015", 12.5, "Expense", "Food", "Synthetic transaction")
+            per_add = (time.perf_counter() - start) / adds
+        finally:
+            project.CONFIG_FILE = saved_config
+    print(f"{rows:>10,} rows  rebuild {rebuild:7.2f}s  check month {check * 1000:7.2f}ms  "
+          f"recompute {scan * 1000:9.2f}ms  add_entry+warn {per_add * 1000:6.2f}ms")
+    return {"rebuild_s": rebuild, "check_ms": check * 1000, "recompute_ms": scan * 1000,
+            "add_entry_warn_ms": per_add * 1000}
+
+
+def bench_report(rows, workers=(1, 4)):
+    """Chart render time per worker count; it should not grow with the number of rows."""
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+        CSV.initialize_csv()
+        CSV.rebuild_aggregates()
+        for count in workers:
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                results = generate_report(os.path.join(tmp, "reports"), "png", workers=count)
+            elapsed = time.perf_counter() - start
+            charts = "  ".join(f"{name} {seconds * 1000:6.0f}ms" for name, _, seconds in results)
+            print(f"{rows:>10,} rows  {count} worker(s)  total {elapsed:6.2f}s  {charts}")
+            metrics[f"workers{count}_total_s"] = elapsed
+    return metrics
+
+
+def bench_shards(rows, repeat=3, workers=(1, 2, 4, 8)):
+    """Split a synthetic ledger into yearly shards, then time a pruned range query and full-range summaries.
+
+    Cold summaries first rebuild every shard's aggregates, which is the work
+    the process pool spreads across workers; warm ones only merge.
+    """
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        CSV.CSV_FILE = os.path.join(tmp, "ledger.csv")
+        generate_ledger(CSV.CSV_FILE, rows)
+        saved_config, saved_dir, saved_workers = project.CONFIG_FILE, ShardedStore.DATA_DIR, ShardedStore.WORKERS
+        saved_min_rows = ShardedStore.POOL_MIN_ROWS
+        project.CONFIG_FILE = os.path.join(tmp, "config.json")
+        ShardedStore.DATA_DIR = os.path.join(tmp, "ledger.shards")
+        try:
+            project.save_config(json.loads(json.dumps(SYNTHETIC_CONFIG)))
+            start = time.perf_counter()
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                split_ledger("year")
+            metrics["split_s"] = time.perf_counter() - start
+            shards = ShardedStore._read_manifest()["shards"]
+
+            CSV.rebuild_index()
+            flat = best_of(lambda: CSV.get_transactions("01-06-2015", "07-06-2015"), repeat)
+            sharded = best_of(lambda: ShardedStore.get_transactions("01-06-2015", "07-06-2015"), repeat)
+            metrics["week_query_ms"] = sharded * 1000
+            metrics["week_query_flat_ms"] = flat * 1000
+            print(f"{rows:>10,} rows  split into {len(shards)} shards {metrics['split_s']:7.2f}s  "
+                  f"one-week query {sharded * 1000:8.2f}ms (single file {flat * 1000:8.2f}ms)")
+
+            ShardedStore.POOL_MIN_ROWS = 0  # measure the pool at every size
+            for count in workers:
+                ShardedStore.WORKERS = count
+                for info in shards:
+                    aggregates = ShardedStore._shard(info)._aggregate_file()
+                    if os.path.exists(aggregates):
+                        os.remove(aggregates)
+                start = time.perf_counter()
+                ShardedStore.get_summary("01-01-2000", "31-12-2025")
+                cold = time.perf_counter() - start
+                warm = best_of(lambda: ShardedStore.get_summary("01-01-2000", "31-12-2025"), repeat)
+                print(f"{rows:>10,} rows  {count} worker(s)  summary cold {cold:7.2f}s  warm {warm * 1000:8.2f}ms")
+                metrics[f"summary_cold_workers{count}_s"] = cold
+                metrics[f"summary_warm_workers{count}_ms"] = warm * 1000
+        finally:
+            project.CONFIG_FILE, ShardedStore.DATA_DIR, ShardedStore.WORKERS = saved_config, saved_dir, saved_workers
+            ShardedStore.POOL_MIN_ROWS = saved_min_rows
+    return metrics
+
+
+def bench_fx(rows=1_000_000, per_row_sample=100_000):
+    """Vectorized as-of currency conversion of mixed-currency rows vs per-row bisect lookups."""
+    rng = np.random.default_rng(0)
+    start_day, end_day = CSV._day_number("01-01-2000"), CSV._day_number("31-12-2025")
+    codes = {"USD": 1.1, "GBP": 0.85, "JPY": 130.0, "INR": 85.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        saved_rates = project.FX_RATES_FILE
+        project.FX_RATES_FILE = os.path.join(tmp, "fx_rates.csv")
+        try:
+            # Business-day rates only, so many lookups fall back to an earlier date
+            rate_days = [day for day in range(start_day - 7, end_day + 1) if date.fromordinal(day).weekday() < 5]
+            with open(project.FX_RATES_FILE, "w") as f:
+                f.write("date,code,rate\n")
+                for code, level in codes.items():
+                    walk = level * np.exp(np.cumsum(rng.normal(0, 0.004, len(rate_days))))
+                    f.writelines(f"{date.fromordinal(day).strftime(CSV.FORMAT)},{code},{rate:.6f}\n"
+                                 for day, rate in zip(rate_days, walk))
+
+            start = time.perf_counter()
+            rates = load_fx_rates()
+            load = time.perf_counter() - start
+
+            amounts = np.round(rng.lognormal(3.5, 1.0, size=rows), 2)
+            currencies = np.array(["", "EUR", "GBP", "JPY", "INR"], dtype=object)[rng.integers(0, 5, size=rows)]
+            days = rng.integers(start_day, end_day + 1, size=rows)
+
+            start = time.perf_counter()
+            convert_amounts(amounts, currencies, days, "USD")
+            vectorized = time.perf_counter() - start
+
+            def rate(code, day):
+                if code == "EUR":
+                    return 1.0
+                code_days, code_rates = rates[code]
+                return code_rates[bisect.bisect_right(code_days, day) - 1]
+
+            start = time.perf_counter()
+            for amount, code, day in zip(amounts[:per_row_sample], currencies[:per_row_sample],
+                                         days[:per_row_sample].tolist()):
+                if code and code != "USD":
+                    amount * rate("USD", day) / rate(code, day)
+            per_row = (time.perf_counter() - start) * rows / per_row_sample
+        finally:
+            project.FX_RATES_FILE = saved_rates
+    print(f"{rows:>10,} rows  rate table load {load * 1000:7.1f}ms  vectorized {vectorized * 1000:8.1f}ms  "
+          f"per-row (extrapolated) {per_row * 1000:9.1f}ms  speedup {per_row / vectorized:6.1f}x")
+    return {"rate_load_ms": load * 1000, "vectorized_ms": vectorized * 1000, "per_row_ms": per_row * 1000}
+
+
+# Metric name suffixes that say which direction is better; other metrics are informational
+HIGHER_IS_BETTER = ("_per_s",)
+LOWER_IS_BETTER = ("_s", "_ms", "_mib")
+
+
+def compare_results(results, baseline, threshold=0.2):
+    """Return (benchmark, metric, baseline, current, change) for every metric that got
+    worse than the baseline by more than `threshold` (a fraction, 0.2 = 20%).
+
+    Only benchmarks and metrics present in both runs are compared.
+    """
+    regressions = []
+    for name, metrics in results["results"].items():
+        for metric, current in metrics.items():
+            previous = baseline["results"].get(name, {}).get(metric)
+            if previous is None or current is None or not previous or previous != previous:
+                continue
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = previous / current - 1 if current else float("inf")
+            elif metric.endswith(LOWER_IS_BETTER):
+                change = current / previous - 1
+            else:
+                continue
+            if change > threshold:
+                regressions.append((name, metric, previous, current, change))
+    return regressions
+
+
+def run_metadata(args):
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "args": {key: value for key, value in vars(args).items() if key not in ("json", "baseline")},
+    }
+
+
+BENCHMARKS = ("startup", "range_query", "add_entry", "render", "search", "dedupe", "writers", "budgets", "report",
+              "fx", "typed_load", "backends", "shards", "daemon", "export")
+
+
+def main():
+    global SYNTHETIC_CONFIG
+    parser = argparse.ArgumentParser(description="Personal Finance Manager benchmarks")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS,
+                        help="Run only these benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--write-rows", type=int, default=10_000,
+                        help="Rows appended by the add_entry throughput benchmark")
+    parser.add_argument("--writer-rows", type=int, default=2_000, help="Rows per concurrent writer process")
+    parser.add_argument("--feed-rows", type=int, default=1_000_000,
+                        help="Rows re-imported by the dedupe benchmark (half are already in the ledger)")
+    parser.add_argument("--export-sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--export-formats", nargs="+", default=["csv", "csv.gz", "parquet", "xlsx"])
+    parser.add_argument("--config", help="Config file whose categories the synthetic ledgers use")
+    parser.add_argument("--generate", metavar="FILE",
+                        help="Only write a synthetic ledger of --rows rows to FILE and exit")
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows written by --generate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used by --generate")
+    parser.add_argument("--json", metavar="FILE", help="Write the results as JSON to FILE")
+    parser.add_argument("--baseline", metavar="FILE", help="Compare the results against a saved --json file")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Slowdown fraction counted as a regression (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config) as f:
+            SYNTHETIC_CONFIG = json.load(f)
+    if args.generate:
+        generate_ledger(args.generate, args.rows, seed=args.seed)
+        print(f"Wrote {args.rows:,} synthetic transactions to {args.generate}")
+        return 0
+
+    results = {"meta": run_metadata(args), "results": {}}
+
+    def run(title, name, bench, *bench_args):
+        if title:
+            print(title)
+        results["results"][name] = bench(*bench_args)
+
+    def each_size(title, name, bench, *bench_args, sizes=None):
+        print(title)
+        for rows in sizes or args.sizes:
+            run(None, f"{name}/{rows}", bench, rows, *bench_args)
+
+    if "startup" in args.only:
+        run("Startup (python -X importtime):", "startup", bench_startup)
+    if "range_query" in args.only:
+        each_size("Narrow range query (one week):", "range_query", bench_range_query, args.repeat)
+    if "add_entry" in args.only:
+        run("Append throughput:", f"add_entry/{args.write_rows}", bench_add_entries, args.write_rows)
+    if "render" in args.only:
+        each_size("Transaction table rendering (one year, null sink):", "render", bench_render, args.repeat)
+    if "search" in args.only:
+        each_size("Search through the inverted index:", "search", bench_search, args.repeat)
+    if "dedupe" in args.only:
+        run("Re-import with duplicate detection:", f"dedupe/{args.feed_rows}", bench_dedupe, args.feed_rows)
+    if "writers" in args.only and hasattr(os, "fork"):
+        print("Concurrent group-committed writers:")
+        for workers in (1, 2, 4, 8):
+            for batch_size in (1, 100):
+                run(None, f"writers/{workers}x{args.writer_rows}/batch{batch_size}",
+                    bench_concurrent_writers, workers, args.writer_rows, batch_size)
+    if "budgets" in args.only:
+        each_size("Budget checks (should stay flat as rows grow):", "budgets", bench_budgets, args.repeat)
+    if "report" in args.only:
+        each_size("Report charts (render time should stay flat as rows grow):", "report", bench_report)
+    if "fx" in args.only:
+        run("Currency conversion (mixed currencies, as-of rates):", "fx", bench_fx)
+    if "typed_load" in args.only:
+        each_size("Typed vs untyped load:", "typed_load", bench_typed_load)
+    if "backends" in args.only:
+        each_size("Storage backends:", "backends", bench_backends, args.repeat)
+    if "shards" in args.only:
+        each_size("Sharded ledger (summaries merged from a process pool):", "shards", bench_shards, args.repeat)
+    if "daemon" in args.only and hasattr(socket_module, "AF_UNIX"):
+        each_size("Resident daemon:", "daemon", bench_daemon)
+    if "export" in args.only:
+        each_size("Streaming export (peak RSS should stay flat as rows grow):", "export", bench_export,
+                  args.export_formats, sizes=args.export_sizes)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        for name, metric, previous, current, change in regressions:
+            print(f"REGRESSION {name} {metric}: {previous:,.3f} -> {current:,.3f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
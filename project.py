@@ -1,14 +1,37 @@
-import pandas as pd
+import argparse
+import array
+import bisect
+import copy
 import csv
+import functools
+import gc
+import gzip
+import hashlib
+import io
+import itertools
 import json
-from datetime import datetime
+import math
+import mmap
+import re
+import shutil
+import socket
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime
 from colorama import init, Fore, Back, Style
+import contextlib
 import os
 
-# Initialize colorama for colored output
-init()
+try:
+    import fcntl
+except ImportError:  # Windows: writes go unlocked
+    fcntl = None
 
-# Initialize colorama for Windows support
+# Initialize colorama for colored output (and Windows support)
 init()
 
 # Constants
@@ -40,6 +63,8 @@ DEFAULT_CONFIG = {
     }
 }
 
+DAEMON_PORT = 8765  # localhost TCP port used where Unix sockets are unavailable
+
 CURRENCY_OPTIONS = {
     "1": {"symbol": "$", "code": "USD", "position": "before"},
     "2": {"symbol": "€", "code": "EUR", "position": "before"},
@@ -48,6 +73,149 @@ CURRENCY_OPTIONS = {
     "5": {"symbol": "₹", "code": "INR", "position": "before"}
 }
 
+# Advisory locks held by this process, so nested writers don't deadlock on themselves
+_held_locks = {}
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on `path` (via `path`.lock) for the duration."""
+    key = (os.path.abspath(path), threading.get_ident())
+    if key in _held_locks:
+        _held_locks[key] += 1
+        try:
+            yield
+        finally:
+            _held_locks[key] -= 1
+        return
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        _held_locks[key] = 1
+        try:
+            yield
+        finally:
+            del _held_locks[key]
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# Stage timers and counters for --profile. Hooks wrap per-query and per-chunk
+# work, never single rows; while profiling is off they return immediately.
+_profile = {"enabled": False, "stages": {}, "counters": {}}
+_NO_STAGE = contextlib.nullcontext()
+PROFILE_CAPTURES = ("cprofile", "tracemalloc")
+PROFILE_TOP = 15
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timing = _profile["stages"].setdefault(self.name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += time.perf_counter() - self.start
+
+
+def profile_stage(name):
+    """Context manager timing its block as stage `name` while profiling is on."""
+    if not _profile["enabled"]:
+        return _NO_STAGE
+    return _Stage(name)
+
+
+def profile_count(name, amount=1):
+    """Add `amount` to counter `name` while profiling is on."""
+    if _profile["enabled"]:
+        counters = _profile["counters"]
+        counters[name] = counters.get(name, 0) + amount
+
+
+@contextlib.contextmanager
+def profiling(capture=None):
+    """Record stage timings and counters for the block and yield the metrics dict.
+
+    The dict is filled in on exit: total_seconds, stages ({name: {calls,
+    seconds}}), counters, and with `capture` set to "cprofile" or
+    "tracemalloc", the top functions or allocation sites.
+    """
+    metrics = {}
+    _profile.update(enabled=True, stages={}, counters={})
+    if capture == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif capture == "tracemalloc":
+        import tracemalloc
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics["total_seconds"] = time.perf_counter() - start
+        _profile["enabled"] = False
+        metrics["stages"] = {name: {"calls": calls, "seconds": seconds}
+                             for name, (calls, seconds) in _profile["stages"].items()}
+        metrics["counters"] = dict(_profile["counters"])
+        if capture == "cprofile":
+            profiler.disable()
+            metrics["cprofile"] = _cprofile_top(profiler)
+        elif capture == "tracemalloc":
+            current, peak = tracemalloc.get_traced_memory()
+            sites = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            tracemalloc.stop()
+            metrics["tracemalloc"] = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"location": _source_label(site.traceback[0].filename, site.traceback[0].lineno),
+                         "bytes": site.size, "blocks": site.count} for site in sites],
+            }
+
+
+def _source_label(filename, line):
+    """package/module.py:line, short enough to tell apart e.g. several __init__.py files."""
+    return "/".join(filename.replace(os.sep, "/").split("/")[-2:]) + f":{line}"
+
+
+def _cprofile_top(profiler):
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP]
+    return [{"function": f"{_source_label(filename, line)}({function})", "calls": calls,
+             "own_seconds": own, "cumulative_seconds": cumulative}
+            for (filename, line, function), (_, calls, own, cumulative, _) in top]
+
+
+def print_profile(metrics, out=None):
+    """Print the stage breakdown and counters collected by profiling()."""
+    out = out or sys.stdout
+    total = metrics["total_seconds"]
+    lines = [f"\n{Fore.CYAN}Profile: {total:.3f}s total (stages may nest){Style.RESET_ALL}",
+             f"{Fore.WHITE}{'Stage':<28}{'Calls':>8}{'Seconds':>10}{'Share':>8}{Style.RESET_ALL}"]
+    for name, timing in sorted(metrics["stages"].items(), key=lambda item: -item[1]["seconds"]):
+        share = timing["seconds"] / total if total else 0.0
+        lines.append(f"{name:<28}{timing['calls']:>8,}{timing['seconds']:>10.4f}{share:>8.1%}")
+    if metrics["counters"]:
+        lines.append(f"{Fore.WHITE}{'Counter':<28}{'Value':>26}{Style.RESET_ALL}")
+        lines += [f"{name:<28}{value:>26,}" for name, value in sorted(metrics["counters"].items())]
+    if "cprofile" in metrics:
+        lines.append(f"{Fore.WHITE}{'Function (by cumulative time)':<60}{'Calls':>10}{'Own':>10}{'Cumul.':>10}{Style.RESET_ALL}")
+        lines += [f"{entry['function'][-60:]:<60}{entry['calls']:>10,}{entry['own_seconds']:>10.4f}"
+                  f"{entry['cumulative_seconds']:>10.4f}" for entry in metrics["cprofile"]]
+    if "tracemalloc" in metrics:
+        memory = metrics["tracemalloc"]
+        lines.append(f"{Fore.WHITE}Python allocations: peak {memory['peak_bytes'] / 2**20:.1f} MiB, "
+                     f"still held {memory['current_bytes'] / 2**20:.1f} MiB{Style.RESET_ALL}")
+        lines += [f"{entry['location'][-60:]:<60}{entry['bytes'] / 1024:>10,.1f} KiB{entry['blocks']:>10,}"
+                  for entry in memory["top"]]
+    out.write("\n".join(lines) + "\n")
+
 
 def get_date(prompt="Enter date (dd-mm-yyyy): ", allow_default=False, test_input=None):
     if test_input is not None:
@@ -75,6 +243,8 @@ def get_amount(test_input=None):
         else:
             amount = float(input(f"{Fore.YELLOW}Enter the amount: {Style.RESET_ALL}"))
             
+        if not math.isfinite(amount):
+            raise ValueError("Amount must be a finite number.")
         if amount <= 0:
             raise ValueError("Amount must be a non-negative non-zero value.")
         return amount
@@ -118,17 +288,56 @@ def get_category():
     
 
 
+# In-process config cache, keyed by (path, mtime_ns, size) of the file it was read from
+_config_cache = {"key": None, "config": None, "category_sets": None}
+
+
+def _config_key(path):
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def _cache_config(key, config):
+    _config_cache["key"] = key
+    _config_cache["config"] = config
+    _config_cache["category_sets"] = {
+        type_name: set(categories) for type_name, categories in config["categories"].items()
+    }
+
+
 def load_config():
+    """Return the config, re-reading the file only when it changed on disk.
+
+    The returned dict is shared; callers that modify it must call save_config.
+    """
+    profile_count("config.calls")
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
+        key = _config_key(CONFIG_FILE)
     except FileNotFoundError:
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
+        config = copy.deepcopy(DEFAULT_CONFIG)
+        save_config(config)
+        return config
+    if _config_cache["key"] != key:
+        profile_count("config.reloads")
+        with profile_stage("config.load"), open(CONFIG_FILE, 'r') as f:
+            _cache_config(key, json.load(f))
+    return _config_cache["config"]
 
 def save_config(config):
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=4)
+    """Write the config atomically (temp file + rename) and refresh the cache."""
+    with file_lock(CONFIG_FILE):
+        tmp_file = CONFIG_FILE + ".tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(config, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, CONFIG_FILE)
+        _cache_config(_config_key(CONFIG_FILE), config)
+
+def has_category(category_type, category):
+    """O(1) check that `category` is configured under `category_type`."""
+    load_config()
+    return category in _config_cache["category_sets"].get(category_type, ())
 
 def format_amount(amount, currency):
     if currency["position"] == "before":
@@ -144,12 +353,178 @@ def set_currency():
         choice = input(f"\n{Fore.YELLOW}Select currency (1-{len(CURRENCY_OPTIONS)}): {Style.RESET_ALL}")
         if choice in CURRENCY_OPTIONS:
             config = load_config()
+            # Existing rows keep the currency they were entered in; they are converted for display
+            config.setdefault("base_currency", config["currency"]["code"])
             config["currency"] = CURRENCY_OPTIONS[choice]
             save_config(config)
             print(f"{Fore.GREEN}Currency updated successfully!{Style.RESET_ALL}")
+            code = config["currency"]["code"]
+            if code != config["base_currency"] and not (has_fx_rates(code) and has_fx_rates(config["base_currency"])):
+                print(f"{Fore.YELLOW}⚠️  Add {code} and {config['base_currency']} rates to {FX_RATES_FILE} "
+                      f"to convert existing amounts.{Style.RESET_ALL}")
             return
         print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
 
+def currency_info(code):
+    """Display settings (symbol and position) for a currency code."""
+    for option in CURRENCY_OPTIONS.values():
+        if option["code"] == code:
+            return option
+    return {"symbol": f"{code} ", "code": code, "position": "before"}
+
+def ledger_currency():
+    """Currency of ledger rows that don't name one.
+
+    This is the config's "base_currency", recorded the first time the display
+    currency is changed, or the display currency if it never was.
+    """
+    config = load_config()
+    return config.get("base_currency") or config["currency"]["code"]
+
+
+# Historical exchange rates: a local CSV of date,code,rate rows giving the units of `code`
+# that one FX_REFERENCE unit bought on that date (the layout of the ECB euro reference
+# rates). Conversions use the latest rate on or before each transaction's date.
+FX_RATES_FILE = "fx_rates.csv"
+FX_REFERENCE = "EUR"
+
+# In-process rate cache, keyed like the config cache by (path, mtime_ns, size)
+_fx_cache = {"key": None, "rates": {}, "table": None}
+
+
+def load_fx_rates():
+    """Return {code: (day ordinals, rates)} sorted by day, re-reading FX_RATES_FILE only when it changed."""
+    try:
+        key = _config_key(FX_RATES_FILE)
+    except FileNotFoundError:
+        return {}
+    if _fx_cache["key"] != key:
+        days = {}
+        pairs = {}
+        with open(FX_RATES_FILE, newline="") as f:
+            for row in csv.DictReader(f):
+                date_str = row["date"].strip()
+                if date_str not in days:
+                    days[date_str] = CSV._day_number(date_str)
+                pairs.setdefault(row["code"].strip().upper(), []).append((days[date_str], float(row["rate"])))
+        rates = {}
+        for code, series in pairs.items():
+            series.sort()
+            rates[code] = ([day for day, _ in series], [rate for _, rate in series])
+        _fx_cache["key"] = key
+        _fx_cache["rates"] = rates
+        _fx_cache["table"] = None
+    return _fx_cache["rates"]
+
+def has_fx_rates(code):
+    """True if amounts in `code` can be converted with the local rate file."""
+    return code == FX_REFERENCE or code in load_fx_rates()
+
+def _fx_table():
+    """All rates as one array sorted by (code id << 32 | day), for a single searchsorted join."""
+    import numpy as np
+    rates = load_fx_rates()
+    if _fx_cache["table"] is None:
+        ids = {code: i for i, code in enumerate(sorted(rates))}
+        keys = [np.left_shift(np.int64(ids[code]), 32) | np.asarray(rates[code][0], dtype=np.int64)
+                for code in sorted(rates)]
+        values = [np.asarray(rates[code][1], dtype=float) for code in sorted(rates)]
+        _fx_cache["table"] = (
+            ids,
+            np.concatenate(keys) if keys else np.empty(0, dtype=np.int64),
+            np.concatenate(values) if values else np.empty(0),
+        )
+    return _fx_cache["table"]
+
+def _fx_code_ids(codes):
+    """Table ids for currency codes: -2 for FX_REFERENCE, -1 for codes without rates."""
+    import numpy as np
+    ids = _fx_table()[0]
+    return np.array([-2 if code == FX_REFERENCE else ids.get(code, -1) for code in codes], dtype=np.int64)
+
+def _fx_rates_for_ids(code_ids, days):
+    """As-of rates for arrays of table ids and day ordinals in one searchsorted; NaN where missing."""
+    import numpy as np
+    _, keys, values = _fx_table()
+    positions = np.searchsorted(keys, np.left_shift(np.maximum(code_ids, 0), 32) | days, side="right") - 1
+    found = (code_ids >= 0) & (positions >= 0)
+    found[found] = np.right_shift(keys[positions[found]], 32) == code_ids[found]
+    rates = np.full(len(code_ids), np.nan)
+    rates[found] = values[positions[found]]
+    rates[code_ids == -2] = 1.0
+    return rates
+
+def _fx_check(rates, codes, days):
+    """Raise for the first row without a rate; `codes` is one code or one per row."""
+    import numpy as np
+    missing = np.flatnonzero(np.isnan(rates))
+    if len(missing):
+        day = date.fromordinal(int(days[missing[0]]))
+        code = codes if isinstance(codes, str) else codes[missing[0]]
+        raise ValueError(f"No exchange rate for {code} on or before "
+                         f"{day.strftime(date_format)} in {FX_RATES_FILE}")
+
+def fx_rates_asof(codes, days):
+    """Rate of each code on or before each day ordinal, looked up for all rows at once."""
+    import numpy as np
+    import pandas as pd
+    labels, unique = pd.factorize(np.asarray(codes, dtype=object))
+    rates = _fx_rates_for_ids(_fx_code_ids(unique)[labels], np.asarray(days, dtype=np.int64))
+    _fx_check(rates, np.asarray(codes, dtype=object), days)
+    return rates
+
+def convert_amounts(amounts, currencies, days, target=None):
+    """Convert amounts from per-row currencies into `target` (default: the display currency).
+
+    Blank or missing currencies mean the ledger currency. Rows already in
+    `target` are left as they are; the rest are converted at the as-of rate
+    of their day ordinal. Returns a float array.
+    """
+    import numpy as np
+    import pandas as pd
+    target = target or load_config()["currency"]["code"]
+    amounts = np.array(amounts, dtype=float)
+    # Work on the few distinct codes rather than on one string per row
+    labels, unique = pd.factorize(np.asarray(currencies, dtype=object))
+    base = ledger_currency()
+    names = np.array([code or base for code in unique] + [base], dtype=object)
+    labels = np.where(labels < 0, len(unique), labels)
+    foreign = np.array([name != target for name in names], dtype=bool)[labels]
+    if foreign.any():
+        days = np.asarray(days, dtype=np.int64)[foreign]
+        labels = labels[foreign]
+        source = _fx_rates_for_ids(_fx_code_ids(names)[labels], days)
+        _fx_check(source, names[labels], days)
+        destination = _fx_rates_for_ids(np.full(len(days), _fx_code_ids([target])[0]), days)
+        _fx_check(destination, target, days)
+        amounts[foreign] *= destination / source
+    return amounts
+
+def convert_frame(df, target=None):
+    """Convert a ledger frame's amounts into `target` in place.
+
+    Converted rows are rounded to cents and relabelled with `target`; blank
+    currencies are left blank when the ledger currency already is `target`.
+    Dates may be datetimes or dd-mm-yyyy strings.
+    """
+    import numpy as np
+    import pandas as pd
+    target = target or load_config()["currency"]["code"]
+    codes = df["currency"].to_numpy(dtype=object, na_value="", copy=True)
+    foreign = (codes != target) & ((codes != "") | (ledger_currency() != target))
+    if foreign.any():
+        profile_count("fx.rows_converted", int(foreign.sum()))
+        dates = df["date"][foreign]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format=CSV.FORMAT)
+        days = dates.to_numpy().astype("datetime64[D]").astype(np.int64) + CSV.EPOCH_DAY
+        amounts = df["amount"].to_numpy(dtype=float, copy=True)
+        amounts[foreign] = np.round(convert_amounts(amounts[foreign], codes[foreign], days, target), 2)
+        codes[foreign] = target
+        df["amount"] = amounts
+        df["currency"] = pd.Series(np.where(codes == "", np.nan, codes), index=df.index, dtype="str")
+    return df
+
 def manage_categories():
     config = load_config()
     while True:
@@ -172,7 +547,7 @@ def manage_categories():
             type_name = input(f"{Fore.YELLOW}Enter type (Income/Expense): {Style.RESET_ALL}").capitalize()
             if type_name in config["categories"]:
                 new_cat = input(f"{Fore.YELLOW}Enter new category name: {Style.RESET_ALL}")
-                if new_cat not in config["categories"][type_name]:
+                if not has_category(type_name, new_cat):
                     config["categories"][type_name].append(new_cat)
                     save_config(config)
                     print(f"{Fore.GREEN}Category added successfully!{Style.RESET_ALL}")
@@ -206,207 +581,3921 @@ def manage_categories():
             print(f"{Fore.RED}Invalid choice. Please enter 1-4.{Style.RESET_ALL}")
 
 
+EXPORT_FORMATS = {
+    "xlsx": "finance_export.xlsx",
+    "csv": "finance_export.csv",
+    "csv.gz": "finance_export.csv.gz",
+    "parquet": "finance_export.parquet",
+}
+
+
+def _peak_rss_kb():
+    # VmHWM is per address space; ru_maxrss can carry over a parent's peak across exec
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def iter_export_chunks(start_date=None, end_date=None, columns=None, chunksize=50000):
+    """Yield ledger chunks for export with dates kept as dd-mm-yyyy strings.
+
+    Without a date range the CSV is read sequentially in `chunksize` pieces;
+    with one, only the rows found through the date index are read. Amounts
+    are converted to the display currency.
+    """
+    columns = columns or CSV.COLUMNS
+    # Amounts are converted to the display currency, which needs each row's date and currency
+    needed = columns if "amount" not in columns else list(dict.fromkeys(columns + ["date", "currency"]))
+    if start_date is None and end_date is None:
+        chunks = get_store().read_ledger(columns=needed, chunksize=chunksize, parse_dates=False)
+    else:
+        chunks = get_store().iter_transactions(start_date, end_date, chunksize=chunksize, by_date=False)
+    for chunk in chunks:
+        if "amount" in columns:
+            chunk = convert_frame(chunk)
+        if start_date is not None or end_date is not None:
+            chunk["date"] = chunk["date"].dt.strftime(CSV.FORMAT)
+        yield chunk[columns]
+
+
+def export_ledger(file_format, output_file=None, start_date=None, end_date=None, columns=None, chunksize=50000):
+    """Stream the ledger to `output_file` in fixed-size chunks.
+
+    Supports xlsx (write-only openpyxl workbook), csv, csv.gz and parquet
+    (pyarrow). Returns a dict with the output file, row count, elapsed time
+    and peak RSS in KiB.
+    """
+    output_file = output_file or EXPORT_FORMATS[file_format]
+    columns = columns or CSV.COLUMNS
+    unknown = set(columns) - set(CSV.COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    start = time.perf_counter()
+    chunks = iter_export_chunks(start_date, end_date, columns, chunksize)
+    rows = 0
+
+    if file_format in ("csv", "csv.gz"):
+        opener = gzip.open if file_format == "csv.gz" else open
+        with opener(output_file, "wt", newline="") as f:
+            f.write(",".join(columns) + "\n")
+            for chunk in chunks:
+                with profile_stage("export.write"):
+                    chunk.to_csv(f, header=False, index=False)
+                rows += len(chunk)
+    elif file_format == "xlsx":
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Sheet1")
+        sheet.append(columns)
+        for chunk in chunks:
+            with profile_stage("export.write"):
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                for row in chunk.itertuples(index=False, name=None):
+                    sheet.append(row)
+            rows += len(chunk)
+        with profile_stage("export.write"):
+            workbook.save(output_file)
+    elif file_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        schema = pa.schema([(col, pa.float64() if col == "amount" else pa.string()) for col in columns])
+        with pq.ParquetWriter(output_file, schema) as writer:
+            for chunk in chunks:
+                with profile_stage("export.write"):
+                    chunk = chunk.astype({col: object for col in columns if col != "amount"})
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                rows += len(chunk)
+    else:
+        raise ValueError(f"Unsupported export format: {file_format}")
+
+    return {
+        "output_file": output_file,
+        "rows": rows,
+        "elapsed": time.perf_counter() - start,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def print_export_stats(stats):
+    print(f"{Fore.GREEN}Data exported successfully to {stats['output_file']}!{Style.RESET_ALL}")
+    peak = f", peak RSS {stats['peak_rss_kb'] / 1024:.1f} MiB" if stats["peak_rss_kb"] else ""
+    print(f"{Fore.CYAN}{stats['rows']} rows in {stats['elapsed']:.2f}s{peak}{Style.RESET_ALL}")
+
+
 def export_data():
-    config = load_config()
+    load_config()
+    options = {"1": "xlsx", "2": "csv", "3": "csv.gz", "4": "parquet"}
     while True:
         print(f"\n{Fore.CYAN}Export Options:{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}1. Export to Excel{Style.RESET_ALL}")
         print(f"{Fore.YELLOW}2. Export to CSV{Style.RESET_ALL}")
-        print(f"{Fore.YELLOW}3. Back to main menu{Style.RESET_ALL}")
-        
-        choice = input(f"\n{Fore.GREEN}Enter your choice (1-3): {Style.RESET_ALL}")
-        
-        if choice in ["1", "2"]:
+        print(f"{Fore.YELLOW}3. Export to gzip-compressed CSV{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}4. Export to Parquet{Style.RESET_ALL}")
+        print(f"{Fore.YELLOW}5. Back to main menu{Style.RESET_ALL}")
+
+        choice = input(f"\n{Fore.GREEN}Enter your choice (1-5): {Style.RESET_ALL}")
+
+        if choice in options:
             try:
-                df = pd.read_csv(CSV.CSV_FILE)
-                if choice == "1":
-                    output_file = "finance_export.xlsx"
-                    df.to_excel(output_file, index=False)
-                else:
-                    output_file = "finance_export.csv"
-                    df.to_csv(output_file, index=False)
-                print(f"{Fore.GREEN}Data exported successfully to {output_file}!{Style.RESET_ALL}")
+                print_export_stats(export_ledger(options[choice]))
                 break
             except Exception as e:
                 print(f"{Fore.RED}Error exporting data: {str(e)}{Style.RESET_ALL}")
                 break
-        elif choice == "3":
+        elif choice == "5":
             break
         else:
-            print(f"{Fore.RED}Invalid choice. Please enter 1-3.{Style.RESET_ALL}")
+            print(f"{Fore.RED}Invalid choice. Please enter 1-5.{Style.RESET_ALL}")
 
 def get_description():
     return input(f"{Fore.YELLOW}Enter a description (optional): {Style.RESET_ALL}")
 
 
+def validate_entry(row):
+    """Validate an imported row with the same rules as the interactive prompts.
+
+    Returns a normalized entry dict or raises ValueError.
+    """
+    date = get_date(test_input=(row.get("date") or "").strip())
+    amount = row.get("amount")
+    amount = get_amount(test_input="" if amount is None else amount)
+    category_type = (row.get("category") or "").strip().capitalize()
+    subcategory = (row.get("subcategory") or "").strip()
+    if category_type not in ("Income", "Expense"):
+        raise ValueError(f"Invalid category '{category_type}'. Use 'Income' or 'Expense'")
+    if not has_category(category_type, subcategory):
+        raise ValueError(f"Unknown {category_type} category '{subcategory}'")
+    description = " ".join((row.get("description") or "").splitlines())
+    currency = (row.get("currency") or "").strip().upper()
+    if currency and currency != ledger_currency() and not has_fx_rates(currency):
+        raise ValueError(f"No exchange rates for currency '{currency}' in {FX_RATES_FILE}")
+    entry = {
+        "date": date,
+        "amount": amount,
+        "category": category_type,
+        "subcategory": subcategory,
+        "description": description,
+        "currency": currency,
+    }
+    account = (row.get("account") or "").strip()
+    if account:
+        if not SHARD_ACCOUNT.fullmatch(account):
+            raise ValueError(f"Invalid account '{account}'. Use letters, digits, '-' and '_'")
+        entry["account"] = account  # only the sharded store keeps it, as the shard the row goes to
+    return entry
+
+
+def read_import_rows(source, file_format=None):
+    """Yield (line number, row dict) pairs from a CSV or JSONL file."""
+    if file_format is None:
+        file_format = "jsonl" if source.endswith((".jsonl", ".json")) else "csv"
+    with open(source, newline="") as f:
+        if file_format == "jsonl":
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, e
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def import_transactions(source, file_format=None, duplicates=None, fuzzy=None):
+    """Validate and bulk-append every row of `source`, collecting errors.
+
+    `duplicates` and `fuzzy` override the configured duplicate policy (see DuplicateCheck).
+    """
+    store = get_store()
+    store.initialize_csv()
+    check = DuplicateCheck(store, duplicates, fuzzy)
+    errors = []
+
+    def valid_entries():
+        for line_no, row in read_import_rows(source, file_format):
+            try:
+                if isinstance(row, Exception):
+                    raise ValueError(str(row))
+                yield validate_entry(row)
+            except (ValueError, TypeError, AttributeError) as e:
+                errors.append((line_no, str(e)))
+
+    start = time.perf_counter()
+    imported = store.add_entries(valid_entries(), check)
+    elapsed = time.perf_counter() - start
+
+    rate = imported / elapsed if elapsed > 0 else float("inf")
+    print(f"{Fore.GREEN}✓ Imported {imported} transactions in {elapsed:.2f}s ({rate:,.0f} rows/s){Style.RESET_ALL}")
+    if errors:
+        print(f"{Fore.RED}Skipped {len(errors)} invalid rows:{Style.RESET_ALL}")
+        for line_no, message in errors[:20]:
+            print(f"{Fore.RED}  line {line_no}: {message}{Style.RESET_ALL}")
+        if len(errors) > 20:
+            print(f"{Fore.RED}  ... and {len(errors) - 20} more{Style.RESET_ALL}")
+    return imported, errors
+
+
 class CSV:
     CSV_FILE = "finance_data.csv"
-    COLUMNS = ["date", "amount", "category", "subcategory", "description"]
+    # `currency` is optional per row: blank means the ledger currency (see ledger_currency)
+    COLUMNS = ["date", "amount", "category", "subcategory", "description", "currency"]
     FORMAT = "%d-%m-%Y"
 
+    # Date index sidecar: a header followed by (day ordinal, byte offset) records.
+    # The first `sorted_count` records are sorted by day; entries appended by
+    # add_entry land unsorted after them until the next compaction.
+    INDEX_SUFFIX = ".idx"
+    INDEX_MAGIC = b"PFMIDX1\0"
+    INDEX_HEADER = struct.Struct("<8sQQq")  # magic, sorted_count, csv_size, csv_mtime_ns
+    INDEX_RECORD = struct.Struct("<iq")
+    INDEX_DTYPE = [("day", "<i4"), ("offset", "<i8")]
+    INDEX_COMPACT_MIN = 1024
+    WRITE_BATCH = 10000
+
+    # Write-ahead journal: one header (magic, CSV offset, length, crc32) plus the rows of the
+    # group commit in progress. It is empty whenever no commit is in flight.
+    JOURNAL_SUFFIX = ".journal"
+    JOURNAL_MAGIC = b"PFMJNL1\0"
+    JOURNAL_HEADER = struct.Struct("<8sQQI")
+
+    # Aggregate sidecar: per-day and per-month totals in integer cents keyed by
+    # (category, subcategory, currency), plus the CSV size/mtime they were computed for.
+    AGGREGATE_SUFFIX = ".agg.db"
+    AGGREGATE_VERSION = 2
+    BUDGET_SUFFIX = ".budget.db"
+    SEARCH_SUFFIX = ".search"
+    FINGERPRINT_SUFFIX = ".dedupe"
+    COLUMN_DTYPES = {
+        "date": "str",
+        "amount": "float64",
+        "category": "category",
+        "subcategory": "category",
+        "description": "str",
+        "currency": "str",
+    }
+    EPOCH_DAY = date(1970, 1, 1).toordinal()
+    SEED_FINGERPRINTS = True  # shards leave duplicate detection to their ShardedStore
+
     @classmethod
     def initialize_csv(cls):
+        """Create the CSV if needed and recover from any interrupted write."""
+        with file_lock(cls.CSV_FILE):
+            created = not os.path.exists(cls.CSV_FILE)
+            if created:
+                with open(cls.CSV_FILE, "w", newline="") as f:
+                    f.write(",".join(cls.COLUMNS) + "\n")
+            cls._recover_journal()
+            cls._upgrade_header()
+            with open(cls.CSV_FILE, "rb+") as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        # Keep a hand-edited last row from merging with the next append
+                        f.write(b"\r\n")
+            if created:
+                create_fingerprints(cls)
+            elif cls.SEED_FINGERPRINTS:
+                ensure_fingerprints(cls)
+
+    @classmethod
+    def _upgrade_header(cls):
+        """Add the currency column to a ledger written before it existed.
+
+        Only the header changes; older rows simply end one field early and
+        read back with a blank currency.
+        """
+        with open(cls.CSV_FILE, "rb") as f:
+            header = f.readline()
+            names = header.rstrip(b"\r\n")
+            if names != ",".join(cls.COLUMNS[:-1]).encode():
+                return
+            tmp_file = cls.CSV_FILE + ".tmp"
+            with open(tmp_file, "wb") as out:
+                out.write(",".join(cls.COLUMNS).encode() + header[len(names):])
+                shutil.copyfileobj(f, out)
+                out.flush()
+                os.fsync(out.fileno())
+        os.replace(tmp_file, cls.CSV_FILE)
+
+    @classmethod
+    def is_empty(cls):
         try:
-            pd.read_csv(cls.CSV_FILE)
+            with open(cls.CSV_FILE, "rb") as f:
+                f.readline()
+                return not any(line.strip() for line in itertools.islice(f, 10))
         except FileNotFoundError:
-            df = pd.DataFrame(columns=cls.COLUMNS)
-            df.to_csv(cls.CSV_FILE, index=False)
+            return True
 
     @classmethod
-    def add_entry(cls, date, amount, category_type, subcategory, description):
+    def add_entry(cls, date, amount, category_type, subcategory, description, currency=""):
         new_entry = {
             "date": date,
             "amount": amount,
             "category": category_type,
             "subcategory": subcategory,
             "description": description,
+            "currency": currency,
         }
-        with open(cls.CSV_FILE, "a", newline="") as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=cls.COLUMNS)
-            writer.writerow(new_entry)
-        print(f"{Fore.GREEN}✓ Entry added successfully{Style.RESET_ALL}")
+        if cls.add_entries([new_entry]):
+            print(f"{Fore.GREEN}✓ Entry added successfully{Style.RESET_ALL}")
+            warn_over_budget(cls, [new_entry])
 
     @classmethod
-    def get_transactions(cls, start_date, end_date):
-        df = pd.read_csv(cls.CSV_FILE)
-        df["date"] = pd.to_datetime(df["date"], format=CSV.FORMAT)
-        start_date = datetime.strptime(start_date, CSV.FORMAT)
-        end_date = datetime.strptime(end_date, CSV.FORMAT)
+    def add_entries(cls, entries, check=None):
+        """Append many entries (dicts keyed by COLUMNS; currency optional), group-committing WRITE_BATCH rows at a time.
+
+        Each batch is first passed through `check` (default: a DuplicateCheck
+        with the configured policy). Returns the number of rows written.
+        """
+        check = check or DuplicateCheck(cls)
+        count = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= cls.WRITE_BATCH:
+                count += cls._commit_checked(batch, check)
+                batch = []
+        if batch:
+            count += cls._commit_checked(batch, check)
+        check.report()
+        return count
+
+    @classmethod
+    def _commit_checked(cls, entries, check):
+        with file_lock(cls.CSV_FILE):
+            entries = check.filter(entries)
+            return len(cls._commit(entries)) if entries else 0
+
+    @classmethod
+    def _commit(cls, entries):
+        """Write one group of rows under the ledger lock.
+
+        The rows are first written and fsync'd to the journal together with the
+        CSV offset they belong at, then appended to the CSV and fsync'd, and
+        only then is the journal cleared. A crash at any point leaves either a
+        complete journal to replay or a torn one to discard (see _recover_journal).
+        Returns the byte offsets the rows were written at.
+        """
+        row_buffer = io.StringIO()
+        writer = csv.DictWriter(row_buffer, fieldnames=cls.COLUMNS, extrasaction="ignore")
+        lines = []
+        days = []
+        for entry in entries:
+            row_buffer.seek(0)
+            row_buffer.truncate()
+            writer.writerow(entry)
+            lines.append(row_buffer.getvalue().encode())
+            days.append(cls._day_number(entry["date"]))
+        payload = b"".join(lines)
+
+        with file_lock(cls.CSV_FILE):
+            with open(cls.CSV_FILE, "ab") as csvfile:
+                start_offset = csvfile.tell()
+                with open(cls._journal_file(), "wb") as journal:
+                    journal.write(cls.JOURNAL_HEADER.pack(
+                        cls.JOURNAL_MAGIC, start_offset, len(payload), zlib.crc32(payload)))
+                    journal.write(payload)
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                csvfile.write(payload)
+                csvfile.flush()
+                os.fsync(csvfile.fileno())
+
+            index_entries = []
+            deltas = {}
+            offset = start_offset
+            for entry, day, line in zip(entries, days, lines):
+                index_entries.append((day, offset))
+                offset += len(line)
+                key = (day, entry["category"], entry["subcategory"], entry.get("currency") or "")
+                delta = deltas.setdefault(key, [0, 0])
+                delta[0] += cls._to_cents(entry["amount"])
+                delta[1] += 1
+            cls._index_append(index_entries)
+            cls._aggregates_append(start_offset, deltas)
+            _budget_counters_append(cls, start_offset, entries, days)
+            ids = [offset for _, offset in index_entries]
+            _search_index_append(cls, start_offset, entries, ids)
+            _fingerprints_append(cls, start_offset, entries, days, ids)
+            open(cls._journal_file(), "wb").close()
+        return ids
+
+    @classmethod
+    def _journal_file(cls):
+        return cls.CSV_FILE + cls.JOURNAL_SUFFIX
+
+    @classmethod
+    def _lock_path(cls):
+        return cls.CSV_FILE
+
+    @classmethod
+    def _budget_file(cls):
+        return cls.CSV_FILE + cls.BUDGET_SUFFIX
 
-        mask = (df["date"] >= start_date) & (df["date"] <= end_date)
-        filtered_df = df.loc[mask]
+    @classmethod
+    def _search_file(cls):
+        return cls.CSV_FILE + cls.SEARCH_SUFFIX
+
+    @classmethod
+    def _fingerprint_file(cls):
+        return cls.CSV_FILE + cls.FINGERPRINT_SUFFIX
+
+    @classmethod
+    def _indexed_rows(cls):
+        """Yield (row ids, day ordinals, rows) chunks of the whole ledger for the sidecar indexes.
+
+        Ids are byte offsets; the days come from the date index, so dates are not parsed.
+        """
+        import numpy as np
+        records, _ = cls._load_index()
+        records = records[np.argsort(records["offset"])]
+        position = 0
+        for chunk in cls.read_ledger(columns=["date", "amount", "category", "subcategory", "description"],
+                                     chunksize=cls.WRITE_BATCH * 10, parse_dates=False):
+            chunk = chunk.dropna(subset=["date"])  # the date index skips rows without a date too
+            part = records[position:position + len(chunk)]
+            yield part["offset"], part["day"], chunk
+            position += len(chunk)
+
+    @classmethod
+    def _date_ids(cls, start_day, end_day):
+        """Sorted row ids (byte offsets) of the rows dated within the range."""
+        return cls._index_lookup(start_day, end_day)
+
+    @classmethod
+    def _rows_by_id(cls, ids):
+        return cls._read_rows(ids)
+
+    @classmethod
+    def _ledger_stamp(cls):
+        """(position, mtime_ns) identifying the ledger contents that sidecars were built from."""
+        stat = os.stat(cls.CSV_FILE)
+        return stat.st_size, stat.st_mtime_ns
+
+    @classmethod
+    def _recover_journal(cls):
+        """Replay a complete journal whose rows are missing from the CSV, or discard a torn one.
+
+        A journal starting past the end of the CSV, which was cut short since,
+        is discarded with a warning: writing it there would leave a gap.
+        Must be called with the ledger lock held.
+        """
+        try:
+            with open(cls._journal_file(), "rb") as f:
+                record = f.read()
+        except FileNotFoundError:
+            return
+        if len(record) >= cls.JOURNAL_HEADER.size:
+            magic, offset, length, crc = cls.JOURNAL_HEADER.unpack_from(record)
+            payload = record[cls.JOURNAL_HEADER.size:]
+            if magic == cls.JOURNAL_MAGIC and os.path.getsize(cls.CSV_FILE) < offset:
+                print(f"{Fore.YELLOW}⚠️  Discarded an unfinished write of {length:,} bytes: {cls.CSV_FILE} "
+                      f"is now shorter than where it started{Style.RESET_ALL}")
+            elif magic == cls.JOURNAL_MAGIC:
+                with open(cls.CSV_FILE, "rb+") as csvfile:
+                    csvfile.seek(offset)
+                    complete = len(payload) == length and zlib.crc32(payload) == crc
+                    if complete and csvfile.read(length) != payload:
+                        csvfile.seek(offset)
+                        csvfile.truncate()
+                        csvfile.write(payload)
+                        csvfile.flush()
+                        os.fsync(csvfile.fileno())
+                    elif not complete and os.path.getsize(cls.CSV_FILE) > offset:
+                        # The CSV write never started before the crash, but drop anything torn anyway
+                        csvfile.truncate(offset)
+        open(cls._journal_file(), "wb").close()
+
+    @classmethod
+    def read_appended(cls, position=None):
+        """Read whole rows appended after byte `position` (None for all rows).
+
+        Returns (DataFrame or None, new position), or (None, None) when the file
+        shrank and callers must reload from scratch.
+        """
+        with open(cls.CSV_FILE, "rb") as f:
+            header = f.readline()
+            position = f.tell() if position is None else position
+            size = f.seek(0, os.SEEK_END)
+            if size < position:
+                return None, None
+            f.seek(position)
+            data = f.read(size - position)
+        end = data.rfind(b"\n") + 1
+        while data.count(b'"', 0, end) % 2:  # that newline is inside a quoted field of a partly written row
+            end = data.rfind(b"\n", 0, end - 1) + 1
+        data = data[:end]
+        if not data.strip():
+            return None, position + len(data)
+        return cls.read_ledger(io.BytesIO(header + data)), position + len(data)
+
+    @classmethod
+    def get_transactions(cls, start_date, end_date):
+        start_day = cls._day_number(start_date)
+        end_day = cls._day_number(end_date)
+        offsets = cls._index_lookup(start_day, end_day)
+        filtered_df = cls._read_rows(offsets)
+        profile_count("rows.returned", len(filtered_df))
 
         if filtered_df.empty:
             print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
 
         return filtered_df
 
+    @classmethod
+    def iter_transactions(cls, start_date, end_date, chunksize=10000, by_date=True):
+        """Yield the transactions in a date range as chunks of at most `chunksize` rows.
 
-def add():
-    CSV.initialize_csv()
-    date = get_date(
-        "Enter the date of the transaction (dd-mm-yyyy) or enter for today's date: ",
-        allow_default=True,
-    )
-    amount = get_amount()
-    category_type, subcategory = get_category()
-    description = get_description()
-    CSV.add_entry(date, amount, category_type, subcategory, description)
+        Rows come in date order, or in file order if `by_date` is False. Either
+        bound may be None for an open-ended range.
+        """
+        start_day = cls._day_number(start_date) if start_date else 1
+        end_day = cls._day_number(end_date) if end_date else date.max.toordinal()
+        offsets = cls._index_lookup(start_day, end_day, by_date=by_date)
+        for start in range(0, len(offsets), chunksize):
+            chunk = cls._read_rows(offsets[start:start + chunksize])
+            profile_count("rows.returned", len(chunk))
+            yield chunk
 
+    @classmethod
+    def _scan_transactions(cls, start_date, end_date):
+        """Full-scan range query; kept as the reference path for the index."""
+        df = cls.read_ledger()
+        start_date = datetime.strptime(start_date, CSV.FORMAT)
+        end_date = datetime.strptime(end_date, CSV.FORMAT)
 
-def format_transaction_table(df):
-    """Format the transaction table with colors and alignment"""
-    # Convert date to datetime for proper sorting
-    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y')
-    df = df.sort_values('date')
-    
-    config = load_config()
-    currency = config["currency"]
-    
-    # Print transaction table header with blue borders
-    print(f"\n{Fore.BLUE}╔{'═' * 86}╗{Style.RESET_ALL}")
-    print(f"{Fore.BLUE}║{Fore.WHITE}{'Transaction History':^86}{Fore.BLUE}║{Style.RESET_ALL}")
-    print(f"{Fore.BLUE}╠{'═' * 12}╦{'═' * 14}╦{'═' * 12}╦{'═' * 15}╦{'═' * 30}╣{Style.RESET_ALL}")
-    print(f"{Fore.BLUE}║{Fore.WHITE}{'Date':^12}{Fore.BLUE}║{Fore.WHITE}{'Amount':^14}{Fore.BLUE}║{Fore.WHITE}{'Category':^12}{Fore.BLUE}║{Fore.WHITE}{'Subcategory':^15}{Fore.BLUE}║{Fore.WHITE}{'Description':^30}{Fore.BLUE}║{Style.RESET_ALL}")
-    print(f"{Fore.BLUE}╠{'═' * 12}╬{'═' * 14}╬{'═' * 12}╬{'═' * 15}╬{'═' * 30}╣{Style.RESET_ALL}")
-    
-    # Print each transaction
-    for _, row in df.iterrows():
-        date_str = row['date'].strftime('%d-%m-%Y')
-        amount_str = format_amount(row['amount'], currency)
-        category_color = Fore.GREEN if row['category'] == 'Income' else Fore.RED
-        
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}", end='')
-        print(f"{date_str:^12}", end='')
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}", end='')
-        print(f"{category_color}{amount_str:>14}{Style.RESET_ALL}", end='')
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}", end='')
-        print(f"{category_color}{row['category']:^12}{Style.RESET_ALL}", end='')
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}", end='')
-        print(f"{row['subcategory']:^15}", end='')
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}", end='')
-        print(f"{row['description']:<30}", end='')
-        print(f"{Fore.BLUE}║{Style.RESET_ALL}")
-    
-    print(f"{Fore.BLUE}╚{'═' * 12}╩{'═' * 14}╩{'═' * 12}╩{'═' * 15}╩{'═' * 30}╝{Style.RESET_ALL}\n")
-    
-    # Category Summary with magenta borders
-    print(f"{Fore.MAGENTA}╔{'═' * 50}╗{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}║{Fore.WHITE}{'Category Summary':^50}{Fore.MAGENTA}║{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}╠{'═' * 25}╦{'═' * 24}╣{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}║{Fore.WHITE}{'Category/Subcategory':^25}{Fore.MAGENTA}║{Fore.WHITE}{'Amount':^24}{Fore.MAGENTA}║{Style.RESET_ALL}")
-    print(f"{Fore.MAGENTA}╠{'═' * 25}╬{'═' * 24}╣{Style.RESET_ALL}")
-    
-    # Calculate category and subcategory totals
-    categories = df.groupby(['category', 'subcategory'])['amount'].sum()
-    
-    current_category = None
-    for (category, subcategory), amount in categories.items():
-        if current_category != category:
-            if current_category is not None:
-                print(f"{Fore.MAGENTA}╟{'─' * 25}╫{'─' * 24}╢{Style.RESET_ALL}")
-            current_category = category
-            cat_total = df[df['category'] == category]['amount'].sum()
-            category_color = Fore.GREEN if category == 'Income' else Fore.RED
-            print(f"{Fore.MAGENTA}║{category_color}{category:^25}{Fore.MAGENTA}║{category_color}{format_amount(cat_total, currency):>24}{Style.RESET_ALL}{Fore.MAGENTA}║{Style.RESET_ALL}")
-        print(f"{Fore.MAGENTA}║{Style.RESET_ALL} - {subcategory:<22}{Fore.MAGENTA}║{Style.RESET_ALL}{format_amount(amount, currency):>24}{Fore.MAGENTA}║{Style.RESET_ALL}")
-    
-    print(f"{Fore.MAGENTA}╚{'═' * 25}╩{'═' * 24}╝{Style.RESET_ALL}\n")
-    
-    # Financial Summary with cyan borders
-    total_income = df[df['category'] == 'Income']['amount'].sum()
-    total_expense = df[df['category'] == 'Expense']['amount'].sum()
-    net_savings = total_income - total_expense
-    
-    print(f"{Fore.CYAN}╔{'═' * 45}╗{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Fore.WHITE}{'Financial Summary':^45}{Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╠{'═' * 45}╣{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} {'Total Income:':<25} {Fore.GREEN}{format_amount(total_income, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} {'Total Expenses:':<25} {Fore.RED}{format_amount(total_expense, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╟{'─' * 45}╢{Style.RESET_ALL}")
-    savings_color = Fore.GREEN if net_savings >= 0 else Fore.RED
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} {'Net Savings:':<25} {savings_color}{format_amount(net_savings, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╚{'═' * 45}╝{Style.RESET_ALL}")
+        with profile_stage("scan.date_mask"):
+            mask = (df["date"] >= start_date) & (df["date"] <= end_date)
+            df = df.loc[mask]
+        profile_count("rows.returned", len(df))
+        return df
 
+    @classmethod
+    @functools.lru_cache(maxsize=65536)  # strptime dominates appends and duplicate checks otherwise
+    def _day_number(cls, date_str):
+        return datetime.strptime(date_str, cls.FORMAT).toordinal()
 
-def display_menu():
-    print(f"\n{Fore.CYAN}╔══════════════════════════════════╗{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║     Personal Finance Manager     ║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╠══════════════════════════════════╣{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 1. {Fore.YELLOW}📝 Add a new transaction{Style.RESET_ALL}      {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 2. {Fore.YELLOW}📊 View transactions summary{Style.RESET_ALL}  {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 3. {Fore.YELLOW}🚪 Exit{Style.RESET_ALL}                       {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╚══════════════════════════════════╝{Style.RESET_ALL}")
+    @classmethod
+    def _index_file(cls):
+        return cls.CSV_FILE + cls.INDEX_SUFFIX
 
-def display_menu():
-    print(f"\n{Fore.CYAN}╔══════════════════════════════════╗{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║     Personal Finance Manager     ║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╠══════════════════════════════════╣{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 1. {Fore.YELLOW}📝 Add a new transaction{Style.RESET_ALL}      {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 2. {Fore.YELLOW}📊 View transactions & summary{Style.RESET_ALL}{Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 3. {Fore.YELLOW}💰 Manage categories{Style.RESET_ALL}          {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 4. {Fore.YELLOW}💱 Change currency{Style.RESET_ALL}            {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 5. {Fore.YELLOW}📤 Export data{Style.RESET_ALL}                {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}║{Style.RESET_ALL} 6. {Fore.YELLOW}🚪 Exit{Style.RESET_ALL}                       {Fore.CYAN}║{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}╚══════════════════════════════════╝{Style.RESET_ALL}")
+    @classmethod
+    def _index_is_current(cls, header):
+        stat = os.stat(cls.CSV_FILE)
+        magic, _, csv_size, csv_mtime_ns = header
+        return magic == cls.INDEX_MAGIC and csv_size == stat.st_size and csv_mtime_ns == stat.st_mtime_ns
 
-def main():
-    # Initialize config if it doesn't exist
-    if not os.path.exists(CONFIG_FILE):
-        save_config(DEFAULT_CONFIG)
+    @classmethod
+    def _read_index_header(cls):
+        try:
+            with open(cls._index_file(), "rb") as f:
+                raw = f.read(cls.INDEX_HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(raw) != cls.INDEX_HEADER.size:
+            return None
+        return cls.INDEX_HEADER.unpack(raw)
 
-    while True:
-        display_menu()
-        choice = input(f"{Fore.GREEN}Enter your choice (1-6): {Style.RESET_ALL}")
+    @classmethod
+    def _write_index(cls, records):
+        """Write a fully sorted index for the current CSV file atomically."""
+        import numpy as np
+        order = np.lexsort((records["offset"], records["day"]))
+        records = records[order]
+        stat = os.stat(cls.CSV_FILE)
+        tmp_file = cls._index_file() + ".tmp"
+        with open(tmp_file, "wb") as f:
+            f.write(cls.INDEX_HEADER.pack(cls.INDEX_MAGIC, len(records), stat.st_size, stat.st_mtime_ns))
+            f.write(records.tobytes())
+        os.replace(tmp_file, cls._index_file())
+        return records
 
-        if choice == "1":
-            add()
-        elif choice == "2":
-            start_date = get_date("Enter the start date (dd-mm-yyyy): ")
-            end_date = get_date("Enter the end date (dd-mm-yyyy): ")
-            df = CSV.get_transactions(start_date, end_date)
-            if not df.empty:
-                format_transaction_table(df)
+    @classmethod
+    def rebuild_index(cls):
+        """Scan the CSV once, recording the byte offset and date of every row."""
+        with file_lock(cls.CSV_FILE):
+            return cls._rebuild_index()
+
+    @classmethod
+    def _rebuild_index(cls):
+        import numpy as np
+        days = []
+        offsets = []
+        day_cache = {}
+        with open(cls.CSV_FILE, "rb") as f:
+            f.readline()
+            for offset, row in cls._row_spans(f):
+                date_field = row.split(b",", 1)[0].strip()
+                if date_field:
+                    day = day_cache.get(date_field)
+                    if day is None:
+                        day = day_cache[date_field] = cls._day_number(date_field.decode())
+                    days.append(day)
+                    offsets.append(offset)
+        records = np.empty(len(days), dtype=cls.INDEX_DTYPE)
+        records["day"] = days
+        records["offset"] = offsets
+        return cls._write_index(records)
+
+    @staticmethod
+    def _row_spans(f):
+        """Yield (byte offset, raw bytes) of each row from the current position of binary file `f`."""
+        offset = f.tell()
+        lines, quotes = [], 0
+        for line in f:
+            lines.append(line)
+            quotes += line.count(b'"')
+            if quotes % 2:  # a quoted field (e.g. a description with a newline) continues on the next line
+                continue
+            row = lines[0] if len(lines) == 1 else b"".join(lines)
+            yield offset, row
+            offset += len(row)
+            lines, quotes = [], 0
+
+    @classmethod
+    def _index_append(cls, entries):
+        """Append (day, offset) records for rows just written to the CSV.
+
+        The index is only extended when it covered the file right up to the
+        first new row; otherwise it is left stale and rebuilt on next query.
+        """
+        header = cls._read_index_header()
+        if header is None or header[0] != cls.INDEX_MAGIC or header[2] != entries[0][1]:
+            return
+        stat = os.stat(cls.CSV_FILE)
+        with open(cls._index_file(), "r+b") as f:
+            f.seek(0, os.SEEK_END)
+            f.write(b"".join(cls.INDEX_RECORD.pack(day, offset) for day, offset in entries))
+            f.seek(0)
+            f.write(cls.INDEX_HEADER.pack(cls.INDEX_MAGIC, header[1], stat.st_size, stat.st_mtime_ns))
+
+    @classmethod
+    def _load_index(cls):
+        import numpy as np
+        header = cls._read_index_header()
+        if header is None or not cls._index_is_current(header):
+            with profile_stage("csv.index_rebuild"):
+                records = cls.rebuild_index()
+            return records, len(records)
+        sorted_count = header[1]
+        size = os.path.getsize(cls._index_file()) - cls.INDEX_HEADER.size
+        count = size // cls.INDEX_RECORD.size
+        if count == 0:
+            return np.empty(0, dtype=cls.INDEX_DTYPE), 0
+        records = np.memmap(cls._index_file(), dtype=cls.INDEX_DTYPE, mode="r",
+                            offset=cls.INDEX_HEADER.size, shape=(count,))
+        if count - sorted_count > max(cls.INDEX_COMPACT_MIN, sorted_count // 8):
+            with file_lock(cls.CSV_FILE):
+                cls._write_index(np.array(records))
+            return cls._load_index()
+        return records, sorted_count
+
+    @classmethod
+    def _index_lookup(cls, start_day, end_day, by_date=False):
+        """Return the byte offsets of all rows dated within the range.
+
+        Offsets are in file order, or ordered by (date, file order) when `by_date` is set.
+        """
+        import numpy as np
+        with profile_stage("csv.index_lookup"):
+            records, sorted_count = cls._load_index()
+            main = records[:sorted_count]
+            lo = np.searchsorted(main["day"], start_day, side="left")
+            hi = np.searchsorted(main["day"], end_day, side="right")
+            tail = records[sorted_count:]
+            tail_mask = (tail["day"] >= start_day) & (tail["day"] <= end_day)
+            if not by_date:
+                return np.sort(np.concatenate([main["offset"][lo:hi], tail["offset"][tail_mask]]))
+            selected = np.concatenate([main[lo:hi], tail[tail_mask]])
+            return selected["offset"][np.lexsort((selected["offset"], selected["day"]))]
+
+    @classmethod
+    def count_transactions(cls, start_date, end_date):
+        """Number of rows dated within the range, counted from the index without reading them."""
+        import numpy as np
+        start_day = cls._day_number(start_date)
+        end_day = cls._day_number(end_date)
+        records, sorted_count = cls._load_index()
+        main = records[:sorted_count]
+        lo = np.searchsorted(main["day"], start_day, side="left")
+        hi = np.searchsorted(main["day"], end_day, side="right")
+        tail = records[sorted_count:]
+        return int(hi - lo) + int(np.count_nonzero((tail["day"] >= start_day) & (tail["day"] <= end_day)))
+
+    @classmethod
+    def get_summary(cls, start_date, end_date):
+        """Return amount totals per (category, subcategory) for a date range.
+
+        Whole months inside the range are read from the monthly buckets and the
+        partial months at either end from the daily buckets, so the cost depends
+        on the span of the range rather than the number of rows in it. Buckets
+        in other currencies than the display currency are read per day and
+        converted with one as-of rate lookup.
+        """
+        import pandas as pd
+        target = load_config()["currency"]["code"]
+        native = [target] + ([""] if ledger_currency() == target else [])
+        in_native = f"currency IN ({', '.join('?' * len(native))})"
+        start = datetime.strptime(start_date, cls.FORMAT).date()
+        end = datetime.strptime(end_date, cls.FORMAT).date()
+        first_month = cls._month_number(start) + (start.day != 1)
+        next_day = date.fromordinal(end.toordinal() + 1)
+        last_month = cls._month_number(end) - (next_day.day != 1)
+
+        if first_month > last_month:
+            day_ranges = [(start.toordinal(), end.toordinal())]
+            month_range = None
+        else:
+            day_ranges = [
+                (start.toordinal(), cls._month_start(first_month).toordinal() - 1),
+                (cls._month_start(last_month + 1).toordinal(), end.toordinal()),
+            ]
+            month_range = (first_month, last_month)
+
+        parts = []
+        params = []
+        for first_day, last_day in day_ranges:
+            if first_day <= last_day:
+                parts.append(f"SELECT category, subcategory, cents FROM daily WHERE day BETWEEN ? AND ? AND {in_native}")
+                params += [first_day, last_day] + native
+        if month_range:
+            parts.append(f"SELECT category, subcategory, cents FROM monthly WHERE month BETWEEN ? AND ? AND {in_native}")
+            params += list(month_range) + native
+
+        conn = cls._connect_aggregates()
+        with profile_stage("summary.aggregates"), conn:
+            rows = conn.execute(
+                "SELECT category, subcategory, SUM(cents) FROM (" + " UNION ALL ".join(parts) + ") "
+                "GROUP BY category, subcategory ORDER BY category, subcategory",
+                params,
+            ).fetchall()
+            foreign = conn.execute(
+                f"SELECT day, currency, category, subcategory, cents FROM daily "
+                f"WHERE day BETWEEN ? AND ? AND NOT {in_native}",
+                [start.toordinal(), end.toordinal()] + native,
+            ).fetchall()
+        conn.close()
+        totals = {(category, subcategory): cents / 100 for category, subcategory, cents in rows}
+        if foreign:
+            days, currencies, categories, subcategories, cents = zip(*foreign)
+            amounts = convert_amounts([c / 100 for c in cents], currencies, days, target)
+            for key, amount in zip(zip(categories, subcategories), amounts.tolist()):
+                totals[key] = totals.get(key, 0.0) + amount
+        keys = sorted(totals)
+        index = pd.MultiIndex.from_tuples(keys, names=["category", "subcategory"])
+        return pd.Series([totals[key] for key in keys], index=index, name="amount", dtype=float)
+
+    @classmethod
+    def get_monthly_totals(cls):
+        """Return (month number, category, subcategory, cents) rows in the display currency.
+
+        Read straight from the monthly aggregates; buckets in other currencies
+        come from the daily ones, converted at each day's rate.
+        """
+        target = load_config()["currency"]["code"]
+        native = [target] + ([""] if ledger_currency() == target else [])
+        in_native = f"currency IN ({', '.join('?' * len(native))})"
+        conn = cls._connect_aggregates()
+        with conn:
+            rows = conn.execute(
+                f"SELECT month, category, subcategory, SUM(cents) FROM monthly WHERE {in_native} "
+                "GROUP BY month, category, subcategory", native
+            ).fetchall()
+            foreign = conn.execute(
+                f"SELECT day, currency, category, subcategory, cents FROM daily WHERE NOT {in_native}", native
+            ).fetchall()
+        conn.close()
+        if not foreign:
+            return sorted(rows)
+        totals = {row[:3]: row[3] for row in rows}
+        days, currencies, categories, subcategories, cents = zip(*foreign)
+        amounts = convert_amounts(cents, currencies, days, target)
+        for day, category, subcategory, amount in zip(days, categories, subcategories, amounts.tolist()):
+            key = (cls._month_number(date.fromordinal(day)), category, subcategory)
+            totals[key] = totals.get(key, 0) + amount
+        return sorted((*key, int(round(cents))) for key, cents in totals.items())
+
+    @staticmethod
+    def _to_cents(amount):
+        return int(round(float(amount) * 100))
+
+    @staticmethod
+    def _month_number(day):
+        return day.year * 12 + day.month - 1
+
+    @staticmethod
+    def _month_start(month):
+        return date(month // 12, month % 12 + 1, 1)
+
+    @classmethod
+    def _aggregate_file(cls):
+        return cls.CSV_FILE + cls.AGGREGATE_SUFFIX
+
+    @classmethod
+    def _open_aggregates(cls, path=None):
+        conn = sqlite3.connect(path or cls._aggregate_file())
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily (
+                day INTEGER, category TEXT, subcategory TEXT, currency TEXT, cents INTEGER, count INTEGER,
+                PRIMARY KEY (day, category, subcategory, currency));
+            CREATE TABLE IF NOT EXISTS monthly (
+                month INTEGER, category TEXT, subcategory TEXT, currency TEXT, cents INTEGER, count INTEGER,
+                PRIMARY KEY (month, category, subcategory, currency));
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+        """)
+        return conn
+
+    @classmethod
+    def _connect_aggregates(cls):
+        """Open the aggregate tables, rebuilding them if the CSV changed behind our back."""
+        conn = cls._open_aggregates()
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        stat = os.stat(cls.CSV_FILE)
+        if (meta.get("csv_size") != stat.st_size or meta.get("csv_mtime_ns") != stat.st_mtime_ns
+                or meta.get("version") != cls.AGGREGATE_VERSION):
+            conn.close()
+            with profile_stage("summary.aggregates_rebuild"):
+                cls.rebuild_aggregates()
+            conn = cls._open_aggregates()
+        return conn
+
+    @classmethod
+    def _upsert_aggregates(cls, conn, deltas):
+        """Add {(day, category, subcategory, currency): [cents, count]} into the daily and monthly buckets."""
+        monthly = {}
+        for (day, category, subcategory, currency), (cents, count) in deltas.items():
+            month = cls._month_number(date.fromordinal(day))
+            bucket = monthly.setdefault((month, category, subcategory, currency), [0, 0])
+            bucket[0] += cents
+            bucket[1] += count
+        for table, period, buckets in (("daily", "day", deltas), ("monthly", "month", monthly)):
+            conn.executemany(
+                f"INSERT INTO {table} VALUES (?, ?, ?, ?, ?, ?) "
+                f"ON CONFLICT ({period}, category, subcategory, currency) "
+                "DO UPDATE SET cents = cents + excluded.cents, count = count + excluded.count",
+                [key + tuple(value) for key, value in buckets.items()],
+            )
+
+    @classmethod
+    def _set_aggregate_meta(cls, conn):
+        stat = os.stat(cls.CSV_FILE)
+        conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         [("csv_size", stat.st_size), ("csv_mtime_ns", stat.st_mtime_ns),
+                          ("version", cls.AGGREGATE_VERSION)])
+
+    @classmethod
+    def _aggregates_append(cls, start_offset, deltas):
+        """Fold rows just appended at `start_offset` into the aggregates.
+
+        Like the date index, the aggregates are only updated when they were
+        current up to the append; otherwise they are rebuilt on next query.
+        """
+        if not os.path.exists(cls._aggregate_file()):
+            return
+        with cls._open_aggregates() as conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("csv_size") != start_offset or meta.get("version") != cls.AGGREGATE_VERSION:
+                return
+            cls._upsert_aggregates(conn, deltas)
+            cls._set_aggregate_meta(conn)
+        conn.close()
+
+    @classmethod
+    def rebuild_aggregates(cls):
+        """Recompute all daily and monthly buckets from the CSV."""
+        with file_lock(cls.CSV_FILE):
+            cls._rebuild_aggregates()
+
+    @classmethod
+    def _rebuild_aggregates(cls):
+        import numpy as np
+        import pandas as pd
+        deltas = {}
+        for chunk in cls.read_ledger(columns=["date", "amount", "category", "subcategory", "currency"],
+                                     chunksize=cls.WRITE_BATCH * 10):
+            chunk = chunk.dropna(subset=["date", "amount"])
+            grouped = pd.DataFrame({
+                "day": chunk["date"].to_numpy().astype("datetime64[D]").astype(np.int64) + cls.EPOCH_DAY,
+                "category": chunk["category"],
+                "subcategory": chunk["subcategory"],
+                "currency": chunk["currency"].fillna(""),
+                "cents": np.round(chunk["amount"] * 100).astype(np.int64),
+            }).groupby(["day", "category", "subcategory", "currency"], observed=True)["cents"].agg(["sum", "count"])
+            for key, (cents, count) in zip(grouped.index, grouped.to_numpy()):
+                delta = deltas.setdefault((int(key[0]), key[1], key[2], key[3]), [0, 0])
+                delta[0] += int(cents)
+                delta[1] += int(count)
+
+        tmp_file = cls._aggregate_file() + ".tmp"
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        with cls._open_aggregates(tmp_file) as conn:
+            cls._upsert_aggregates(conn, deltas)
+            cls._set_aggregate_meta(conn)
+        conn.close()
+        os.replace(tmp_file, cls._aggregate_file())
+
+    @classmethod
+    def read_ledger(cls, source=None, columns=None, chunksize=None, parse_dates=True):
+        """Load ledger rows with compact, explicit dtypes.
+
+        `category` and `subcategory` are categoricals seeded from the configured
+        categories, `amount` is float64 and `date` is parsed to datetime64 during
+        the read (or left as dd-mm-yyyy strings if `parse_dates` is False).
+        Returns a DataFrame, or an iterator of DataFrames when `chunksize` is set.
+        """
+        import pandas as pd
+        columns = columns or cls.COLUMNS
+        dates = ["date"] if parse_dates and "date" in columns else False
+        if _profile["enabled"]:
+            profile_count("bytes.read", source.getbuffer().nbytes if source is not None else os.path.getsize(cls.CSV_FILE))
+        with profile_stage("csv.read_csv"):
+            reader = pd.read_csv(
+                source or cls.CSV_FILE,
+                usecols=columns,
+                dtype={col: cls.COLUMN_DTYPES[col] for col in columns if col != "date" or not dates},
+                parse_dates=dates,
+                date_format=cls.FORMAT,
+                chunksize=chunksize,
+            )
+        if chunksize is None:
+            return cls._apply_ledger_types(reader, dates)
+        return (cls._apply_ledger_types(chunk, dates) for chunk in cls._timed_chunks(reader))
+
+    @staticmethod
+    def _timed_chunks(reader):
+        """Yield read_csv chunks, timing the parse of each one as csv.read_csv."""
+        while True:
+            with profile_stage("csv.read_csv"):
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    @classmethod
+    def _apply_ledger_types(cls, df, dates):
+        import pandas as pd
+        profile_count("rows.scanned", len(df))
+        if dates and df["date"].dtype == object:
+            # read_csv leaves unparseable dates as strings; this raises on them instead
+            with profile_stage("csv.to_datetime"):
+                df["date"] = pd.to_datetime(df["date"], format=cls.FORMAT)
+        categories = load_config()["categories"]
+        known = {
+            "category": list(categories),
+            "subcategory": [sub for subs in categories.values() for sub in subs],
+        }
+        for col, values in known.items():
+            if col in df:
+                # Sorted so groupby output keeps the same order as on plain strings
+                df[col] = df[col].cat.set_categories(sorted(set(values).union(df[col].cat.categories)))
+        return df
+
+    @classmethod
+    def memory_usage(cls, df):
+        """Return (typed bytes, bytes the same rows take as untyped object columns)."""
+        import pandas as pd
+        typed = df.memory_usage(deep=True)
+        untyped = typed.copy()
+        pointer = 8
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                counts = df[col].value_counts()
+                untyped[col] = sum(count * (sys.getsizeof(str(value)) + pointer) for value, count in counts.items())
+                untyped[col] += df[col].isna().sum() * pointer
+            elif col == "date" and pd.api.types.is_datetime64_any_dtype(df[col]):
+                untyped[col] = len(df) * (sys.getsizeof(datetime.today().strftime(cls.FORMAT)) + pointer)
+        return int(typed.sum()), int(untyped.sum())
+
+    @classmethod
+    def _read_rows(cls, offsets):
+        header, lines = cls._read_lines(offsets)
+        return cls.read_ledger(io.BytesIO(header + b"".join(lines)))
+
+    @classmethod
+    def _read_lines(cls, offsets):
+        with profile_stage("csv.seek_read"), open(cls.CSV_FILE, "rb") as f:
+            header = f.readline()
+            lines = []
+            for offset in offsets:
+                f.seek(offset)
+                line = f.readline()
+                while line.count(b'"') % 2:  # the row has a quoted field spanning lines
+                    more = f.readline()
+                    if not more:
+                        break
+                    line += more
+                lines.append(line)
+        return header, lines
+
+
+class ColumnarStore:
+    """Binary columnar ledger with the same interface as CSV.
+
+    Each column lives in its own fixed-width file under DATA_DIR and is
+    memory-mapped for reads: dates as int32 day ordinals, amounts as int64
+    cents and categories and currencies as dictionary codes. Descriptions are UTF-8 bytes
+    with an int64 end-offset column. Appends only extend the column files;
+    meta.json is rewritten last and holds the authoritative row count, the
+    dictionaries and min/max day per row group for range pruning. Each append
+    is made durable by one fsync of journal.bin (see _commit).
+    """
+    DATA_DIR = "finance_data.cols"
+    COLUMNS = CSV.COLUMNS
+    FORMAT = CSV.FORMAT
+    ROW_GROUP_SIZE = 65536
+    COLUMN_FILES = {
+        "day": ("day.i4", "<i4"),
+        "cents": ("cents.i8", "<i8"),
+        "category": ("category.u1", "u1"),
+        "subcategory": ("subcategory.u2", "<u2"),
+        "description_end": ("description.off", "<i8"),
+        "currency": ("currency.u1", "u1"),
+    }
+    DESCRIPTION_FILE = "description.bin"
+    JOURNAL_FILE = "journal.bin"
+    JOURNAL_MAGIC = b"PFMCOL1\0"
+    JOURNAL_HEADER = struct.Struct("<8sII")  # magic, payload length, payload crc32
+    JOURNAL_SEGMENT = struct.Struct("<QQ")  # byte offset in the file, length
+    JOURNAL_CHECKPOINT = 4 * 2**20  # journal bytes after which every file is fsync'd and the journal restarts
+    BUDGET_FILE = "budget.db"
+    SEARCH_FILE = "search.idx"
+    FINGERPRINT_FILE = "dedupe.idx"
+
+    @classmethod
+    def initialize_csv(cls):
+        """Create an empty store if none exists (named to match CSV) and recover its journal."""
+        with file_lock(cls.DATA_DIR):
+            if os.path.exists(cls._meta_file()):
+                cls._recover_journal()
+                ensure_fingerprints(cls)
+                return
+            os.makedirs(cls.DATA_DIR, exist_ok=True)
+            for name, _ in list(cls.COLUMN_FILES.values()) + [(cls.DESCRIPTION_FILE, None)]:
+                open(os.path.join(cls.DATA_DIR, name), "wb").close()
+            cls._write_meta({"rows": 0, "categories": [], "subcategories": [], "currencies": [""], "groups": []})
+            create_fingerprints(cls)
+
+    @classmethod
+    def is_empty(cls):
+        return not os.path.exists(cls._meta_file()) or cls._read_meta()["rows"] == 0
+
+    @classmethod
+    def add_entry(cls, date, amount, category_type, subcategory, description, currency=""):
+        new_entry = {
+            "date": date,
+            "amount": amount,
+            "category": category_type,
+            "subcategory": subcategory,
+            "description": description,
+            "currency": currency,
+        }
+        if cls.add_entries([new_entry]):
+            print(f"{Fore.GREEN}✓ Entry added successfully{Style.RESET_ALL}")
+            warn_over_budget(cls, [new_entry])
+
+    @classmethod
+    def add_entries(cls, entries, check=None):
+        """Append entries (dicts keyed by COLUMNS) that pass `check` (see CSV.add_entries); returns the number of rows written."""
+        check = check or DuplicateCheck(cls)
+        count = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= CSV.WRITE_BATCH:
+                count += cls._append_rows(batch, check)
+                batch = []
+        if batch:
+            count += cls._append_rows(batch, check)
+        check.report()
+        return count
+
+    @classmethod
+    def _append_rows(cls, entries, check):
+        with file_lock(cls._lock_path()):
+            entries = check.filter(entries)
+            return cls._append_rows_locked(entries) if entries else 0
+
+    @classmethod
+    def _append_rows_locked(cls, entries):
+        import numpy as np
+        meta = cls._read_meta()
+        rows = meta["rows"]
+        day_cache = {}
+        for entry in entries:
+            if entry["date"] not in day_cache:
+                day_cache[entry["date"]] = CSV._day_number(entry["date"])
+        days = np.array([day_cache[entry["date"]] for entry in entries], dtype="<i4")
+        cents = np.array([CSV._to_cents(e["amount"]) for e in entries], dtype="<i8")
+        categories = cls._encode(meta["categories"], [e["category"] for e in entries], "u1")
+        subcategories = cls._encode(meta["subcategories"], [e["subcategory"] for e in entries], "<u2")
+        # Stores created before the currency column get it zero-filled (= blank) by the truncate below
+        currencies = cls._encode(meta.setdefault("currencies", [""]),
+                                 [e.get("currency") or "" for e in entries], "u1")
+        descriptions = [(e.get("description") or "").encode() for e in entries]
+
+        description_start = int(cls._column("description_end", rows)[-1]) if rows else 0
+        ends = description_start + np.cumsum([len(d) for d in descriptions], dtype="<i8")
+        columns = {
+            "day": days,
+            "cents": cents,
+            "category": categories,
+            "subcategory": subcategories,
+            "description_end": ends,
+            "currency": currencies,
+        }
+        segments = [(rows * np.dtype(cls.COLUMN_FILES[column][1]).itemsize, values.tobytes())
+                    for column, values in columns.items()]
+        segments.append((description_start, b"".join(descriptions)))
+
+        groups = meta["groups"]
+        group_ids = (rows + np.arange(len(days))) // cls.ROW_GROUP_SIZE
+        for group in np.unique(group_ids):
+            group_days = days[group_ids == group]
+            bounds = [int(group_days.min()), int(group_days.max())]
+            if group == len(groups):
+                groups.append(bounds)
+            else:
+                groups[group] = [min(groups[group][0], bounds[0]), max(groups[group][1], bounds[1])]
+        meta["rows"] = rows + len(entries)
+        cls._commit(segments, meta)
+        _budget_counters_append(cls, rows, entries, days.tolist())
+        ids = range(rows, rows + len(entries))
+        _search_index_append(cls, rows, entries, ids)
+        _fingerprints_append(cls, rows, entries, days, ids)
+        return len(entries)
+
+    @classmethod
+    def _journaled_files(cls):
+        return [name for name, _ in cls.COLUMN_FILES.values()] + [cls.DESCRIPTION_FILE]
+
+    @classmethod
+    def _journal_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.JOURNAL_FILE)
+
+    @classmethod
+    def _commit(cls, segments, meta):
+        """Write one append: a (byte offset, data) segment per _journaled_files() entry, then `meta`.
+
+        The segments and meta are written to the journal at meta["journal"]
+        and fsync'd, which is the append's only durability barrier; the column
+        files and meta.json are then written without an fsync of their own,
+        and _recover_journal rewrites whatever of them a crash loses. Once the
+        journal passes JOURNAL_CHECKPOINT bytes, every file is fsync'd and
+        the journal starts over.
+        """
+        payload = b"".join(cls.JOURNAL_SEGMENT.pack(offset, len(data)) + data for offset, data in segments)
+        payload += json.dumps(meta).encode()
+        with open(os.open(cls._journal_file(), os.O_RDWR | os.O_CREAT), "r+b") as journal:
+            journal.seek(meta.get("journal", 0))
+            journal.write(cls.JOURNAL_HEADER.pack(cls.JOURNAL_MAGIC, len(payload), zlib.crc32(payload)))
+            journal.write(payload)
+            journal.truncate()
+            journal.flush()
+            os.fsync(journal.fileno())
+            meta["journal"] = journal.tell()
+        # Truncate first so a torn earlier append can never shift the columns
+        for name, (offset, data) in zip(cls._journaled_files(), segments):
+            with open(os.path.join(cls.DATA_DIR, name), "ab") as f:
+                f.truncate(offset)
+                f.write(data)
+        if meta["journal"] > cls.JOURNAL_CHECKPOINT:
+            cls._checkpoint(meta)
+        else:
+            cls._write_meta(meta, sync=False)
+
+    @classmethod
+    def _checkpoint(cls, meta):
+        """fsync every column file, write `meta` durably and empty the journal that covered them."""
+        for name in cls._journaled_files():
+            with open(os.path.join(cls.DATA_DIR, name), "ab") as f:
+                os.fsync(f.fileno())
+        meta["journal"] = 0
+        cls._write_meta(meta)
+        open(cls._journal_file(), "wb").close()
+
+    @classmethod
+    def _recover_journal(cls):
+        """Rewrite journaled appends whose column or meta writes were lost in a crash.
+
+        Complete records are replayed in order; a torn last one is ignored, as
+        the crash came before its columns were touched. Any repair ends with a
+        checkpoint. Must be called with the store lock held.
+        """
+        try:
+            with open(cls._journal_file(), "rb") as f:
+                journal = f.read()
+        except FileNotFoundError:
+            return
+        meta = None
+        repaired = False
+        position = 0
+        while position + cls.JOURNAL_HEADER.size <= len(journal):
+            magic, length, crc = cls.JOURNAL_HEADER.unpack_from(journal, position)
+            position += cls.JOURNAL_HEADER.size
+            payload = journal[position:position + length]
+            if magic != cls.JOURNAL_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+                break
+            position += length
+            cursor = 0
+            for name in cls._journaled_files():
+                offset, size = cls.JOURNAL_SEGMENT.unpack_from(payload, cursor)
+                cursor += cls.JOURNAL_SEGMENT.size
+                data = payload[cursor:cursor + size]
+                cursor += size
+                with open(os.path.join(cls.DATA_DIR, name), "rb+") as f:
+                    f.seek(offset)
+                    if f.read(size) != data:
+                        f.seek(offset)
+                        f.truncate()
+                        f.write(data)
+                        repaired = True
+            meta = json.loads(payload[cursor:])
+        if meta is None:
+            return
+        try:
+            repaired = repaired or cls._read_meta()["rows"] < meta["rows"]
+        except ValueError:  # meta.json torn by the crash
+            repaired = True
+        if repaired:
+            cls._checkpoint(meta)
+
+    @staticmethod
+    def _encode(dictionary, values, dtype):
+        import numpy as np
+        codes = {value: i for i, value in enumerate(dictionary)}
+        for value in values:
+            if value not in codes:
+                codes[value] = len(dictionary)
+                dictionary.append(value)
+        return np.array([codes[value] for value in values], dtype=dtype)
+
+    @classmethod
+    def _meta_file(cls):
+        return os.path.join(cls.DATA_DIR, "meta.json")
+
+    @classmethod
+    def _lock_path(cls):
+        return cls.DATA_DIR
+
+    @classmethod
+    def _budget_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.BUDGET_FILE)
+
+    @classmethod
+    def _search_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.SEARCH_FILE)
+
+    @classmethod
+    def _fingerprint_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.FINGERPRINT_FILE)
+
+    @classmethod
+    def _indexed_rows(cls):
+        """Yield (row ids, day ordinals, rows) chunks of the whole store for the sidecar indexes; ids are row numbers."""
+        import numpy as np
+        meta = cls._read_meta()
+        days = cls._column("day", meta["rows"])
+        columns = ["amount", "category", "subcategory", "description"]
+        for start in range(0, meta["rows"], CSV.WRITE_BATCH * 10):
+            rows = np.arange(start, min(start + CSV.WRITE_BATCH * 10, meta["rows"]))
+            yield rows, days[start:start + len(rows)], cls._frame(rows, meta, columns)
+
+    @classmethod
+    def _date_ids(cls, start_day, end_day):
+        """Sorted row numbers of the rows dated within the range."""
+        return cls._select(start_day, end_day, cls._read_meta())
+
+    @classmethod
+    def _rows_by_id(cls, ids):
+        return cls._frame(ids, cls._read_meta())
+
+    @classmethod
+    def _ledger_stamp(cls):
+        return cls._read_meta()["rows"], os.stat(cls._meta_file()).st_mtime_ns
+
+    @classmethod
+    def _read_meta(cls):
+        with open(cls._meta_file()) as f:
+            return json.load(f)
+
+    @classmethod
+    def _write_meta(cls, meta, sync=True):
+        tmp_file = cls._meta_file() + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(meta, f)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, cls._meta_file())
+
+    @classmethod
+    def _column(cls, column, rows):
+        import numpy as np
+        name, dtype = cls.COLUMN_FILES[column]
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(cls.DATA_DIR, name), dtype=dtype, mode="r", shape=(rows,))
+
+    @classmethod
+    def _select(cls, start_day, end_day, meta):
+        """Row numbers dated within the range, visiting only overlapping row groups."""
+        import numpy as np
+        day = cls._column("day", meta["rows"])
+        selected = []
+        with profile_stage("columnar.select"):
+            for group, (min_day, max_day) in enumerate(meta["groups"]):
+                if max_day < start_day or min_day > end_day:
+                    continue
+                start = group * cls.ROW_GROUP_SIZE
+                days = day[start:start + cls.ROW_GROUP_SIZE]
+                profile_count("columnar.days_checked", len(days))
+                selected.append(start + np.flatnonzero((days >= start_day) & (days <= end_day)))
+        return np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def _frame(cls, rows, meta, columns=None, parse_dates=True):
+        """Materialize the given row numbers as a DataFrame typed like CSV.read_ledger."""
+        import numpy as np
+        columns = columns or cls.COLUMNS
+        with profile_stage("columnar.frame"):
+            df = cls._build_frame(rows, meta, columns, parse_dates)
+        if _profile["enabled"]:
+            files = {"date": "day", "amount": "cents", "description": "description_end"}
+            profile_count("bytes.read", len(rows) * sum(
+                np.dtype(cls.COLUMN_FILES[files.get(column, column)][1]).itemsize for column in columns))
+        return CSV._apply_ledger_types(df, parse_dates and "date" in columns)
+
+    @classmethod
+    def _build_frame(cls, rows, meta, columns, parse_dates):
+        import numpy as np
+        import pandas as pd
+        data = {}
+        if "date" in columns:
+            days = cls._column("day", meta["rows"])[rows].astype(np.int64) - CSV.EPOCH_DAY
+            dates = pd.Series(days.astype("datetime64[D]")).astype("datetime64[us]")
+            data["date"] = dates if parse_dates else dates.dt.strftime(cls.FORMAT)
+        if "amount" in columns:
+            data["amount"] = cls._column("cents", meta["rows"])[rows] / 100
+        for column, dictionary in (("category", "categories"), ("subcategory", "subcategories")):
+            if column in columns:
+                codes = cls._column(column, meta["rows"])[rows]
+                data[column] = pd.Categorical.from_codes(codes.astype(np.int64), meta[dictionary])
+        if "description" in columns:
+            data["description"] = pd.Series(cls._descriptions(rows, meta), dtype="str")
+        if "currency" in columns:
+            data["currency"] = pd.Series(cls._currencies(rows, meta), dtype="str")
+        return pd.DataFrame(data, columns=columns)
+
+    @classmethod
+    def _currencies(cls, rows, meta):
+        """Currency codes of the given rows as an object array, NaN where blank."""
+        import numpy as np
+        lookup = np.array([code or np.nan for code in meta.get("currencies", [""])], dtype=object)
+        if "currencies" not in meta:
+            return lookup[np.zeros(len(rows), dtype=np.int64)]
+        return lookup[cls._column("currency", meta["rows"])[rows]]
+
+    @classmethod
+    def _descriptions(cls, rows, meta):
+        import numpy as np
+        ends = cls._column("description_end", meta["rows"])
+        if not len(rows) or not ends[-1]:
+            return [np.nan] * len(rows)
+        with open(os.path.join(cls.DATA_DIR, cls.DESCRIPTION_FILE), "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+            stops = ends[rows]
+            starts = np.where(rows > 0, ends[np.maximum(rows - 1, 0)], 0)
+            return [blob[start:stop].decode() or np.nan for start, stop in zip(starts.tolist(), stops.tolist())]
+
+    @classmethod
+    def read_appended(cls, position=None):
+        """Rows committed after row number `position`; see CSV.read_appended."""
+        import numpy as np
+        meta = cls._read_meta()
+        position = position or 0
+        if meta["rows"] < position:
+            return None, None
+        if meta["rows"] == position:
+            return None, position
+        return cls._frame(np.arange(position, meta["rows"]), meta), meta["rows"]
+
+    @classmethod
+    def get_transactions(cls, start_date, end_date):
+        meta = cls._read_meta()
+        rows = cls._select(CSV._day_number(start_date), CSV._day_number(end_date), meta)
+        filtered_df = cls._frame(rows, meta)
+        profile_count("rows.returned", len(filtered_df))
+
+        if filtered_df.empty:
+            print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
+
+        return filtered_df
+
+    @classmethod
+    def iter_transactions(cls, start_date, end_date, chunksize=10000, by_date=True):
+        import numpy as np
+        meta = cls._read_meta()
+        start_day = CSV._day_number(start_date) if start_date else 1
+        end_day = CSV._day_number(end_date) if end_date else date.max.toordinal()
+        rows = cls._select(start_day, end_day, meta)
+        if by_date:
+            rows = rows[np.argsort(cls._column("day", meta["rows"])[rows], kind="stable")]
+        for start in range(0, len(rows), chunksize):
+            chunk = cls._frame(rows[start:start + chunksize], meta)
+            profile_count("rows.returned", len(chunk))
+            yield chunk
+
+    @classmethod
+    def read_ledger(cls, columns=None, chunksize=None, parse_dates=True):
+        import numpy as np
+        meta = cls._read_meta()
+        if chunksize is None:
+            return cls._frame(np.arange(meta["rows"]), meta, columns, parse_dates)
+        return (cls._frame(np.arange(start, min(start + chunksize, meta["rows"])), meta, columns, parse_dates)
+                for start in range(0, meta["rows"], chunksize))
+
+    @classmethod
+    def count_transactions(cls, start_date, end_date):
+        meta = cls._read_meta()
+        return len(cls._select(CSV._day_number(start_date), CSV._day_number(end_date), meta))
+
+    @classmethod
+    def get_summary(cls, start_date, end_date):
+        """Totals per (category, subcategory), summed in integer cents straight from the columns.
+
+        Rows in other currencies than the display currency are converted first.
+        """
+        import pandas as pd
+        meta = cls._read_meta()
+        rows = cls._select(CSV._day_number(start_date), CSV._day_number(end_date), meta)
+        totals = pd.DataFrame({
+            "category": cls._column("category", meta["rows"])[rows],
+            "subcategory": cls._column("subcategory", meta["rows"])[rows],
+            "cents": cls._converted_cents(rows, meta),
+        }).groupby(["category", "subcategory"])["cents"].sum()
+        index = pd.MultiIndex.from_tuples(
+            [(meta["categories"][c], meta["subcategories"][s]) for c, s in totals.index],
+            names=["category", "subcategory"],
+        )
+        return pd.Series(totals.to_numpy() / 100, index=index, name="amount", dtype=float).sort_index()
+
+    @classmethod
+    def _converted_cents(cls, rows, meta):
+        """Amounts of the given rows in display-currency cents: the int64 column when no
+        conversion is needed, otherwise floats from one vectorized as-of conversion."""
+        cents = cls._column("cents", meta["rows"])[rows]
+        if len(meta.get("currencies", [""])) == 1 and ledger_currency() == load_config()["currency"]["code"]:
+            return cents
+        days = cls._column("day", meta["rows"])[rows]
+        return convert_amounts(cents, cls._currencies(rows, meta), days)
+
+    @classmethod
+    def get_monthly_totals(cls):
+        """Return (month number, category, subcategory, cents) rows in the display currency, summed from the columns."""
+        import numpy as np
+        import pandas as pd
+        meta = cls._read_meta()
+        days = cls._column("day", meta["rows"]).astype(np.int64) - CSV.EPOCH_DAY
+        totals = pd.DataFrame({
+            "month": days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) + 1970 * 12,
+            "category": cls._column("category", meta["rows"]),
+            "subcategory": cls._column("subcategory", meta["rows"]),
+            "cents": cls._converted_cents(np.arange(meta["rows"]), meta),
+        }).groupby(["month", "category", "subcategory"])["cents"].sum()
+        rows = [(int(month), meta["categories"][c], meta["subcategories"][s], int(round(cents)))
+                for (month, c, s), cents in totals.items()]
+        return sorted(rows)
+
+
+SHARD_ACCOUNT = re.compile(r"[A-Za-z0-9_-]+")
+SHARD_PERIODS = ("year", "month")
+
+
+def _shard_summary(path, start_date, end_date):
+    """get_summary of one shard; module level so process pool workers can run it."""
+    return ShardedStore._shard_at(path).get_summary(start_date, end_date)
+
+
+def _shard_monthly_totals(path):
+    return ShardedStore._shard_at(path).get_monthly_totals()
+
+
+def _init_shard_worker(config_file, fx_rates_file):
+    """Point a pool worker, which starts from a fresh import, at its parent's config and rate files."""
+    global CONFIG_FILE, FX_RATES_FILE
+    CONFIG_FILE, FX_RATES_FILE = config_file, fx_rates_file
+
+
+class ShardedStore:
+    """Ledger split into CSV shards by period (year or month) and account, with the same interface as CSV.
+
+    Each shard is an ordinary CSV ledger under DATA_DIR/<account>/<period>.csv
+    with its own date index, journal and aggregates. manifest.json lists every
+    shard with its number, account, period, first and last day, row count and
+    the file size/mtime those were read at, so range queries only open the
+    shards overlapping the range. Summaries over several shards holding at
+    least POOL_MIN_ROWS rows run in a process pool of WORKERS processes, kept
+    for the life of the process, and are merged. The search, budget and
+    duplicate sidecars cover the whole store; their row ids are the shard
+    number * SHARD_ID_SPAN plus the row's byte offset in the shard.
+    """
+    DATA_DIR = "finance_data.shards"
+    COLUMNS = CSV.COLUMNS
+    FORMAT = CSV.FORMAT
+    PERIOD = "year"  # for new stores; an existing store keeps the period in its manifest
+    DEFAULT_ACCOUNT = "main"
+    SHARD_ID_SPAN = 2 ** 40
+    WORKERS = None  # summary processes; None means one per CPU
+    POOL_MIN_ROWS = 1_000_000  # smaller summaries run inline, where they finish before a pool round trip would
+    BUDGET_FILE = "budget.db"
+    SEARCH_FILE = "search.idx"
+    FINGERPRINT_FILE = "dedupe.idx"
+    _shard_classes = {}
+    _pool = None  # ((pid, workers, config file, rates file), executor) for this process
+    _pool_lock = threading.Lock()
+
+    @classmethod
+    def initialize_csv(cls, period=None):
+        """Create an empty store if none exists (named to match CSV) and recover every shard's journal.
+
+        Shard files found without a manifest (after a crash or a manual
+        deletion) are listed in a new one rather than started over.
+        """
+        with file_lock(cls.DATA_DIR):
+            if not os.path.exists(cls._manifest_file()):
+                period = period or cls.PERIOD
+                if period not in SHARD_PERIODS:
+                    raise ValueError(f"Unknown shard period '{period}'. Use one of: {', '.join(SHARD_PERIODS)}")
+                os.makedirs(cls.DATA_DIR, exist_ok=True)
+                manifest = cls._found_shards(period)
+                cls._write_manifest(manifest)
+                if not manifest["shards"]:
+                    create_fingerprints(cls)
+            for info in cls._read_manifest()["shards"]:
+                cls._shard(info).initialize_csv()
+            ensure_fingerprints(cls)
+
+    @classmethod
+    def _found_shards(cls, period):
+        """A manifest for the <account>/<period>.csv shard files already under DATA_DIR.
+
+        Their rows and date ranges are read from their date indexes on first
+        use (see _current_manifest); the period follows their names.
+        """
+        manifest = {"period": period, "next_id": 0, "shards": []}
+        for account in sorted(os.listdir(cls.DATA_DIR)):
+            folder = os.path.join(cls.DATA_DIR, account)
+            if not SHARD_ACCOUNT.fullmatch(account) or not os.path.isdir(folder):
+                continue
+            for name in sorted(os.listdir(folder)):
+                label, extension = os.path.splitext(name)
+                if extension != ".csv":
+                    continue
+                manifest["period"] = "month" if "-" in label else "year"
+                manifest["shards"].append({"id": manifest["next_id"], "account": account, "period": label,
+                                           "file": os.path.join(account, name), "rows": 0, "first_day": None,
+                                           "last_day": None, "size": None, "mtime_ns": None})
+                manifest["next_id"] += 1
+        return manifest
+
+    @classmethod
+    def is_empty(cls):
+        return not os.path.exists(cls._manifest_file()) or not any(
+            info["rows"] for info in cls._current_manifest()["shards"])
+
+    @classmethod
+    def add_entry(cls, date, amount, category_type, subcategory, description, currency=""):
+        new_entry = {
+            "date": date,
+            "amount": amount,
+            "category": category_type,
+            "subcategory": subcategory,
+            "description": description,
+            "currency": currency,
+        }
+        if cls.add_entries([new_entry]):
+            print(f"{Fore.GREEN}✓ Entry added successfully{Style.RESET_ALL}")
+            warn_over_budget(cls, [new_entry])
+
+    @classmethod
+    def add_entries(cls, entries, check=None):
+        """Append entries (dicts keyed by COLUMNS, plus an optional "account") that pass `check`; see CSV.add_entries."""
+        check = check or DuplicateCheck(cls)
+        count = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= CSV.WRITE_BATCH:
+                count += cls._append_rows(batch, check)
+                batch = []
+        if batch:
+            count += cls._append_rows(batch, check)
+        check.report()
+        return count
+
+    @classmethod
+    def _append_rows(cls, entries, check):
+        """Group-commit a batch into its shards, creating shards as needed, then update the manifest."""
+        with file_lock(cls._lock_path()):
+            entries = check.filter(entries)
+            if not entries:
+                return 0
+            manifest = cls._current_manifest()
+            start_position = cls._ledger_stamp()[0]
+            days = [CSV._day_number(entry["date"]) for entry in entries]
+            groups = {}
+            for i, (entry, day) in enumerate(zip(entries, days)):
+                account = entry.get("account") or cls.DEFAULT_ACCOUNT
+                if not SHARD_ACCOUNT.fullmatch(account):
+                    raise ValueError(f"Invalid account '{account}'. Use letters, digits, '-' and '_'")
+                groups.setdefault((account, cls._period_label(day, manifest["period"])), []).append(i)
+
+            shards = {(info["account"], info["period"]): info for info in manifest["shards"]}
+            ids = [0] * len(entries)
+            for key, indexes in groups.items():
+                info = shards.get(key) or cls._create_shard(manifest, *key)
+                offsets = cls._shard(info)._commit([entries[i] for i in indexes])
+                base = info["id"] * cls.SHARD_ID_SPAN
+                for i, offset in zip(indexes, offsets):
+                    ids[i] = base + offset
+                group_days = [days[i] for i in indexes]
+                if info["first_day"] is not None:
+                    group_days += [info["first_day"], info["last_day"]]
+                info["rows"] += len(indexes)
+                info["first_day"], info["last_day"] = min(group_days), max(group_days)
+                info["size"], info["mtime_ns"] = cls._shard(info)._ledger_stamp()
+            cls._write_manifest(manifest)
+            _budget_counters_append(cls, start_position, entries, days)
+            _search_index_append(cls, start_position, entries, ids)
+            _fingerprints_append(cls, start_position, entries, days, ids)
+            return len(entries)
+
+    @staticmethod
+    def _period_label(day, period):
+        day = date.fromordinal(day)
+        return f"{day.year:04d}" if period == "year" else f"{day.year:04d}-{day.month:02d}"
+
+    @classmethod
+    def _create_shard(cls, manifest, account, period):
+        """Start an empty shard file and register it in `manifest` (written by the caller)."""
+        name = os.path.join(account, f"{period}.csv")
+        path = os.path.join(cls.DATA_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "x", newline="") as f:  # never over a file the manifest does not know about
+            f.write(",".join(CSV.COLUMNS) + "\n")
+        info = {"id": manifest["next_id"], "account": account, "period": period, "file": name,
+                "rows": 0, "first_day": None, "last_day": None}
+        info["size"], info["mtime_ns"] = cls._shard(info)._ledger_stamp()
+        manifest["next_id"] += 1
+        manifest["shards"].append(info)
+        return info
+
+    @classmethod
+    def _shard_at(cls, path):
+        """The CSV subclass that reads and writes the shard at `path`."""
+        shard = cls._shard_classes.get(path)
+        if shard is None:
+            shard = cls._shard_classes[path] = type("Shard", (CSV,), {"CSV_FILE": path, "SEED_FINGERPRINTS": False})
+        return shard
+
+    @classmethod
+    def _shard(cls, info):
+        return cls._shard_at(os.path.join(cls.DATA_DIR, info["file"]))
+
+    @classmethod
+    def _manifest_file(cls):
+        return os.path.join(cls.DATA_DIR, "manifest.json")
+
+    @classmethod
+    def _read_manifest(cls):
+        with open(cls._manifest_file()) as f:
+            return json.load(f)
+
+    @classmethod
+    def _write_manifest(cls, manifest):
+        tmp_file = cls._manifest_file() + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, cls._manifest_file())
+
+    @classmethod
+    def _current_manifest(cls):
+        """The manifest, with the entries of shards changed outside the store re-read from their date index."""
+        manifest = cls._read_manifest()
+        stale = [info for info in manifest["shards"]
+                 if [info["size"], info["mtime_ns"]] != list(cls._shard(info)._ledger_stamp())]
+        if not stale:
+            return manifest
+        with file_lock(cls._lock_path()):
+            manifest = cls._read_manifest()
+            for info in manifest["shards"]:
+                shard = cls._shard(info)
+                stamp = list(shard._ledger_stamp())
+                if [info["size"], info["mtime_ns"]] == stamp:
+                    continue
+                records, _ = shard._load_index()
+                info["rows"] = len(records)
+                info["first_day"] = int(records["day"].min()) if len(records) else None
+                info["last_day"] = int(records["day"].max()) if len(records) else None
+                info["size"], info["mtime_ns"] = stamp
+            cls._write_manifest(manifest)
+        return manifest
+
+    @classmethod
+    def _shards_in(cls, start_day, end_day, accounts=None):
+        """Shards with rows in the day range (and accounts), ordered by first day; counts the pruned ones."""
+        shards = cls._current_manifest()["shards"]
+        selected = [info for info in shards
+                    if info["rows"] and info["first_day"] <= end_day and info["last_day"] >= start_day
+                    and (accounts is None or info["account"] in accounts)]
+        profile_count("shards.read", len(selected))
+        profile_count("shards.pruned", len(shards) - len(selected))
+        return sorted(selected, key=lambda info: (info["first_day"], info["id"]))
+
+    @classmethod
+    def _map_shards(cls, function, shards, *args):
+        """Return [function(shard path, *args)] for the shards, in the process pool when there are several large ones."""
+        paths = [cls._shard(info).CSV_FILE for info in shards]
+        workers = min(cls.WORKERS or os.cpu_count() or 1, len(paths))
+        with profile_stage("shards.map"):
+            if workers <= 1 or sum(info["rows"] for info in shards) < cls.POOL_MIN_ROWS:
+                return [function(path, *args) for path in paths]
+            pool = cls._worker_pool(workers)
+            return list(pool.map(function, paths, *([arg] * len(paths) for arg in args)))
+
+    @classmethod
+    def _worker_pool(cls, workers):
+        """This process's summary pool, started on first use and reused until the worker count or files change.
+
+        Workers come from a forkserver (spawn where there is none) rather than
+        a fork of this process, which may be the daemon with other threads
+        holding locks mid-request.
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        key = (os.getpid(), workers, CONFIG_FILE, FX_RATES_FILE)
+        with cls._pool_lock:
+            if cls._pool is None or cls._pool[0] != key:
+                if cls._pool is not None and cls._pool[0][0] == key[0]:
+                    cls._pool[1].shutdown()  # a pool inherited over fork belongs to the parent
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                cls._pool = (key, ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context(method),
+                    initializer=_init_shard_worker, initargs=(CONFIG_FILE, FX_RATES_FILE)))
+            return cls._pool[1]
+
+    @classmethod
+    def _concat(cls, frames):
+        """Concatenate shard frames, keeping the ledger dtypes when shards saw different categories."""
+        import pandas as pd
+        if not frames:
+            return CSV.read_ledger(io.BytesIO((",".join(CSV.COLUMNS) + "\n").encode()))
+        if len(frames) == 1:
+            return frames[0]
+        df = pd.concat(frames, ignore_index=True)
+        if all(isinstance(df[col].dtype, pd.CategoricalDtype) for col in ("category", "subcategory") if col in df):
+            return df
+        for col in ("category", "subcategory"):
+            if col in df and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        return CSV._apply_ledger_types(df, False)
+
+    @classmethod
+    def _lock_path(cls):
+        return cls.DATA_DIR
+
+    @classmethod
+    def _budget_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.BUDGET_FILE)
+
+    @classmethod
+    def _search_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.SEARCH_FILE)
+
+    @classmethod
+    def _fingerprint_file(cls):
+        return os.path.join(cls.DATA_DIR, cls.FINGERPRINT_FILE)
+
+    @classmethod
+    def _ledger_stamp(cls):
+        """(total bytes in the shards, latest mtime_ns of the shards and manifest)."""
+        position = 0
+        mtime_ns = os.stat(cls._manifest_file()).st_mtime_ns
+        for info in cls._read_manifest()["shards"]:
+            size, shard_mtime_ns = cls._shard(info)._ledger_stamp()
+            position += size
+            mtime_ns = max(mtime_ns, shard_mtime_ns)
+        return position, mtime_ns
+
+    @classmethod
+    def _indexed_rows(cls):
+        """Yield (row ids, day ordinals, rows) chunks of every shard for the sidecar indexes."""
+        for info in sorted(cls._current_manifest()["shards"], key=lambda info: info["id"]):
+            base = info["id"] * cls.SHARD_ID_SPAN
+            for offsets, days, chunk in cls._shard(info)._indexed_rows():
+                yield base + offsets, days, chunk
+
+    @classmethod
+    def _date_ids(cls, start_day, end_day):
+        """Sorted row ids of the rows dated within the range."""
+        import numpy as np
+        parts = [info["id"] * cls.SHARD_ID_SPAN + cls._shard(info)._index_lookup(start_day, end_day)
+                 for info in sorted(cls._shards_in(start_day, end_day), key=lambda info: info["id"])]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def _rows_by_id(cls, ids):
+        import numpy as np
+        ids = np.asarray(ids, dtype=np.int64)
+        shards = {info["id"]: info for info in cls._read_manifest()["shards"]}
+        numbers = ids // cls.SHARD_ID_SPAN
+        frames = [cls._shard(shards[number])._read_rows(ids[numbers == number] % cls.SHARD_ID_SPAN)
+                  for number in np.unique(numbers).tolist()]
+        return cls._concat(frames)
+
+    @classmethod
+    def read_appended(cls, position=None):
+        """Rows appended after `position`, a {shard file: byte position} dict; see CSV.read_appended."""
+        position = dict(position or {})
+        frames = []
+        for info in cls._read_manifest()["shards"]:
+            df, position[info["file"]] = cls._shard(info).read_appended(position.get(info["file"]))
+            if position[info["file"]] is None:
+                return None, None
+            if df is not None:
+                frames.append(df)
+        return (cls._concat(frames) if frames else None), position
+
+    @classmethod
+    def get_transactions(cls, start_date, end_date, accounts=None):
+        start_day = CSV._day_number(start_date)
+        end_day = CSV._day_number(end_date)
+        frames = []
+        for info in cls._shards_in(start_day, end_day, accounts):
+            shard = cls._shard(info)
+            frames.append(shard._read_rows(shard._index_lookup(start_day, end_day)))
+        filtered_df = cls._concat(frames)
+        profile_count("rows.returned", len(filtered_df))
+        if filtered_df.empty:
+            print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
+        return filtered_df
+
+    @classmethod
+    def iter_transactions(cls, start_date, end_date, chunksize=10000, by_date=True, accounts=None):
+        """Yield the transactions in a date range in chunks; see CSV.iter_transactions.
+
+        In date order, shards of the same period (one per account) are merged
+        a period at a time; other periods never overlap.
+        """
+        start_day = CSV._day_number(start_date) if start_date else 1
+        end_day = CSV._day_number(end_date) if end_date else date.max.toordinal()
+        shards = cls._shards_in(start_day, end_day, accounts)
+        if by_date:
+            periods = [list(group) for _, group in itertools.groupby(
+                sorted(shards, key=lambda info: (info["period"], info["id"])), key=lambda info: info["period"])]
+        else:
+            periods = [[info] for info in sorted(shards, key=lambda info: info["id"])]
+        for group in periods:
+            if len(group) == 1:
+                shard = cls._shard(group[0])
+                offsets = shard._index_lookup(start_day, end_day, by_date=by_date)
+                for start in range(0, len(offsets), chunksize):
+                    chunk = shard._read_rows(offsets[start:start + chunksize])
+                    profile_count("rows.returned", len(chunk))
+                    yield chunk
+                continue
+            df = cls._concat([cls._shard(info)._read_rows(cls._shard(info)._index_lookup(start_day, end_day))
+                              for info in group])
+            df = df.sort_values("date", kind="stable", ignore_index=True)
+            for start in range(0, len(df), chunksize):
+                chunk = df.iloc[start:start + chunksize]
+                profile_count("rows.returned", len(chunk))
+                yield chunk
+
+    @classmethod
+    def read_ledger(cls, columns=None, chunksize=None, parse_dates=True):
+        """Load every shard, oldest first; an iterator of DataFrames when `chunksize` is set."""
+        shards = sorted(cls._current_manifest()["shards"], key=lambda info: (info["first_day"] or 0, info["id"]))
+        if chunksize is None:
+            return cls._concat([cls._shard(info).read_ledger(columns=columns, parse_dates=parse_dates)
+                                for info in shards if info["rows"]])
+        return (chunk for info in shards if info["rows"]
+                for chunk in cls._shard(info).read_ledger(columns=columns, chunksize=chunksize, parse_dates=parse_dates))
+
+    @classmethod
+    def count_transactions(cls, start_date, end_date, accounts=None):
+        shards = cls._shards_in(CSV._day_number(start_date), CSV._day_number(end_date), accounts)
+        return sum(cls._shard(info).count_transactions(start_date, end_date) for info in shards)
+
+    @classmethod
+    def get_summary(cls, start_date, end_date, accounts=None):
+        """Totals per (category, subcategory), from each overlapping shard's aggregates in parallel, merged."""
+        import pandas as pd
+        shards = cls._shards_in(CSV._day_number(start_date), CSV._day_number(end_date), accounts)
+        parts = [part for part in cls._map_shards(_shard_summary, shards, start_date, end_date) if len(part)]
+        if not parts:
+            index = pd.MultiIndex.from_tuples([], names=["category", "subcategory"])
+            return pd.Series([], index=index, name="amount", dtype=float)
+        if len(parts) == 1:
+            return parts[0]
+        return pd.concat(parts).groupby(level=["category", "subcategory"]).sum().rename("amount")
+
+    @classmethod
+    def rebuild_aggregates(cls):
+        """Recompute every shard's daily and monthly buckets; see CSV.rebuild_aggregates."""
+        for info in cls._current_manifest()["shards"]:
+            cls._shard(info).rebuild_aggregates()
+
+    @classmethod
+    def get_monthly_totals(cls):
+        """Return (month number, category, subcategory, cents) rows merged across shards; see CSV.get_monthly_totals."""
+        shards = [info for info in cls._current_manifest()["shards"] if info["rows"]]
+        totals = {}
+        for rows in cls._map_shards(_shard_monthly_totals, shards):
+            for month, category, subcategory, cents in rows:
+                key = (month, category, subcategory)
+                totals[key] = totals.get(key, 0) + cents
+        return sorted((*key, cents) for key, cents in totals.items())
+
+
+def split_ledger(period="year"):
+    """Split finance_data.csv into per-period shards of a new sharded store and switch storage to it.
+
+    The rows are copied in bulk (no per-row validation or duplicate checks);
+    finance_data.csv itself is left in place.
+    """
+    import pandas as pd
+    target = ShardedStore
+    CSV.initialize_csv()
+    target.initialize_csv(period)
+    if not target.is_empty():
+        print(f"{Fore.RED}{target.DATA_DIR} already contains transactions; not splitting.{Style.RESET_ALL}")
+        return 0
+    start = time.perf_counter()
+    copied = 0
+    with file_lock(target._lock_path()):
+        manifest = target._read_manifest()
+        for info in manifest["shards"]:  # all empty; their files are replaced by the new period's
+            shard_file = target._shard(info).CSV_FILE
+            folder = os.path.dirname(shard_file)
+            for name in os.listdir(folder):
+                if name.startswith(os.path.basename(shard_file)):  # the shard and its own sidecars
+                    os.remove(os.path.join(folder, name))
+        manifest = {"period": period, "next_id": manifest["next_id"], "shards": []}
+        shards = {}
+        for chunk in CSV.read_ledger(chunksize=CSV.WRITE_BATCH * 10, parse_dates=False):
+            chunk = chunk.dropna(subset=["date"])
+            dates = pd.to_datetime(chunk["date"], format=CSV.FORMAT)
+            days = dates.to_numpy().astype("datetime64[D]").astype("int64") + CSV.EPOCH_DAY
+            labels = dates.dt.strftime("%Y" if period == "year" else "%Y-%m")
+            for label, rows in chunk.groupby(labels.to_numpy(), sort=False).indices.items():
+                info = shards.get(label) or target._create_shard(manifest, target.DEFAULT_ACCOUNT, label)
+                shards[label] = info
+                chunk.iloc[rows].to_csv(target._shard(info).CSV_FILE, mode="a", header=False, index=False,
+                                        columns=CSV.COLUMNS)
+                info["rows"] += len(rows)
+                info["first_day"] = min(int(days[rows].min()), info["first_day"] or date.max.toordinal())
+                info["last_day"] = max(int(days[rows].max()), info["last_day"] or 0)
+            copied += len(chunk)
+        for info in manifest["shards"]:
+            info["size"], info["mtime_ns"] = target._shard(info)._ledger_stamp()
+        target._write_manifest(manifest)
+        rebuild_fingerprints(target)  # so entries added to the new store are checked for duplicates
+    config = load_config()
+    config["storage"] = "sharded"
+    save_config(config)
+    print(f"{Fore.GREEN}✓ Split {copied} transactions into {len(manifest['shards'])} shards by {period} "
+          f"in {time.perf_counter() - start:.2f}s{Style.RESET_ALL}")
+    return copied
+
+
+STORAGE_BACKENDS = {"csv": CSV, "columnar": ColumnarStore, "sharded": ShardedStore}
+
+
+def get_store():
+    """Return the storage backend selected by the config's "storage" key."""
+    return STORAGE_BACKENDS[load_config().get("storage", "csv")]
+
+
+class LedgerWriter:
+    """Buffer entries for a storage backend and group-commit them.
+
+    Each commit takes the ledger lock once and fsyncs once for the whole
+    batch, so high-rate writers amortize the cost across many entries.
+    Entries are committed when `batch_size` are pending, when the oldest has
+    waited `max_delay` seconds, on commit() and on leaving a with-block.
+    """
+
+    def __init__(self, store=None, batch_size=1000, max_delay=0.5):
+        self.store = store or get_store()
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = []
+        self.first_pending_at = None
+        self.committed = 0
+
+    def add(self, entry):
+        if not self.pending:
+            self.first_pending_at = time.monotonic()
+        self.pending.append(entry)
+        if len(self.pending) >= self.batch_size or time.monotonic() - self.first_pending_at >= self.max_delay:
+            self.commit()
+
+    def commit(self):
+        if self.pending:
+            self.committed += self.store.add_entries(self.pending)
+            self.pending = []
+        return self.committed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.commit()
+
+
+def migrate_storage(target):
+    """Copy every transaction from the current backend into `target` and switch to it."""
+    source = get_store()
+    destination = STORAGE_BACKENDS[target]
+    if source is destination:
+        print(f"{Fore.YELLOW}Storage is already '{target}'.{Style.RESET_ALL}")
+        return 0
+    source.initialize_csv()
+    destination.initialize_csv()
+    if not destination.is_empty():
+        print(f"{Fore.RED}The '{target}' store already contains transactions; not migrating.{Style.RESET_ALL}")
+        return 0
+    start = time.perf_counter()
+    migrated = 0
+    for chunk in source.read_ledger(chunksize=CSV.WRITE_BATCH * 10, parse_dates=False):
+        records = chunk.astype(object).where(chunk.notna(), "").to_dict("records")
+        migrated += destination.add_entries(records, DuplicateCheck(destination, "force"))
+    config = load_config()
+    config["storage"] = target
+    save_config(config)
+    print(f"{Fore.GREEN}✓ Migrated {migrated} transactions to '{target}' storage "
+          f"in {time.perf_counter() - start:.2f}s{Style.RESET_ALL}")
+    return migrated
+
+
+# Budget counters: running Expense totals in integer cents of the ledger currency per
+# (period, subcategory), kept in a sqlite sidecar next to the ledger. A "monthly" period is a month number (year * 12 + month - 1)
+# and a "yearly" one is the year. Like the aggregates, the counters record the ledger position
+# they cover, are updated in place by appends and rebuilt when the ledger changed otherwise.
+BUDGET_PERIODS = ("monthly", "yearly")
+
+
+def load_budgets():
+    """Return the config's budgets as {subcategory: {"monthly": limit, "yearly": limit}}."""
+    return load_config().get("budgets", {})
+
+
+def _budget_periods(day):
+    """Map a day ordinal to the period numbers it counts towards."""
+    day = date.fromordinal(day)
+    return {"monthly": CSV._month_number(day), "yearly": day.year}
+
+
+def _open_budget_counters(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS spend (
+            kind TEXT, period INTEGER, subcategory TEXT, cents INTEGER,
+            PRIMARY KEY (kind, period, subcategory));
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+    """)
+    return conn
+
+
+def _upsert_budget_counters(conn, deltas):
+    conn.executemany(
+        "INSERT INTO spend VALUES (?, ?, ?, ?) ON CONFLICT (kind, period, subcategory) "
+        "DO UPDATE SET cents = cents + excluded.cents",
+        [key + (cents,) for key, cents in deltas.items()],
+    )
+
+
+def _set_budget_stamp(conn, store):
+    position, mtime_ns = store._ledger_stamp()
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                     [("position", position), ("mtime_ns", mtime_ns)])
+
+
+def _budget_counters_append(store, start_position, entries, days):
+    """Add entries just appended at `start_position` (with their day ordinals) to the counters.
+
+    Called under the ledger lock. Counters that were not current up to the
+    append are left alone and rebuilt on their next read.
+    """
+    path = store._budget_file()
+    if not os.path.exists(path):
+        return
+    base = ledger_currency()
+    expenses = [(entry, day) for entry, day in zip(entries, days) if entry["category"] == "Expense"]
+    amounts = [entry["amount"] for entry, _ in expenses]
+    if any((entry.get("currency") or base) != base for entry, _ in expenses):
+        try:
+            amounts = convert_amounts(amounts, [entry.get("currency") for entry, _ in expenses],
+                                      [day for _, day in expenses], base).tolist()
+        except ValueError:
+            return  # no rate yet: leave the counters stale so the next read rebuilds and reports it
+    deltas = {}
+    periods = {}
+    for (entry, day), amount in zip(expenses, amounts):
+        if day not in periods:
+            periods[day] = _budget_periods(day)
+        cents = CSV._to_cents(amount)
+        for kind, period in periods[day].items():
+            key = (kind, period, entry["subcategory"])
+            deltas[key] = deltas.get(key, 0) + cents
+    with _open_budget_counters(path) as conn:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        if meta.get("position") == start_position:
+            _upsert_budget_counters(conn, deltas)
+            _set_budget_stamp(conn, store)
+    conn.close()
+
+
+def rebuild_budget_counters(store=None):
+    """Recompute every budget counter from the ledger."""
+    import numpy as np
+    import pandas as pd
+    store = store or get_store()
+    with file_lock(store._lock_path()):
+        deltas = {}
+        for chunk in store.read_ledger(columns=["date", "amount", "category", "subcategory", "currency"],
+                                       chunksize=CSV.WRITE_BATCH * 10):
+            chunk = chunk[chunk["category"] == "Expense"].dropna(subset=["date", "amount"])
+            years = chunk["date"].dt.year.to_numpy()
+            months = years * 12 + chunk["date"].dt.month.to_numpy() - 1
+            days = chunk["date"].to_numpy().astype("datetime64[D]").astype(np.int64) + CSV.EPOCH_DAY
+            amounts = convert_amounts(chunk["amount"], chunk["currency"], days, ledger_currency())
+            cents = np.round(amounts * 100).astype(np.int64)
+            for kind, periods in (("monthly", months), ("yearly", years)):
+                grouped = pd.DataFrame({
+                    "period": periods,
+                    "subcategory": chunk["subcategory"].to_numpy(),
+                    "cents": cents,
+                }).groupby(["period", "subcategory"])["cents"].sum()
+                for (period, subcategory), total in grouped.items():
+                    key = (kind, int(period), subcategory)
+                    deltas[key] = deltas.get(key, 0) + int(total)
+
+        tmp_file = store._budget_file() + ".tmp"
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        with _open_budget_counters(tmp_file) as conn:
+            _upsert_budget_counters(conn, deltas)
+            _set_budget_stamp(conn, store)
+        conn.close()
+        os.replace(tmp_file, store._budget_file())
+
+
+def budget_spend(store, day):
+    """Return {(kind, subcategory): cents} spent in the month and year of a day ordinal.
+
+    Reads at most two counter rows per subcategory, however long the history.
+    """
+    path = store._budget_file()
+    conn = _open_budget_counters(path)
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    if (meta.get("position"), meta.get("mtime_ns")) != store._ledger_stamp():
+        conn.close()
+        rebuild_budget_counters(store)
+        conn = _open_budget_counters(path)
+    periods = _budget_periods(day)
+    with conn:
+        rows = conn.execute(
+            "SELECT kind, subcategory, cents FROM spend "
+            "WHERE (kind = 'monthly' AND period = ?) OR (kind = 'yearly' AND period = ?)",
+            (periods["monthly"], periods["yearly"]),
+        ).fetchall()
+    conn.close()
+    return {(kind, subcategory): cents for kind, subcategory, cents in rows}
+
+
+def budget_status(store, day, subcategories=None):
+    """Return (subcategory, kind, limit, spent) for each configured budget in the day's month and year."""
+    spend = budget_spend(store, day)
+    status = []
+    for subcategory, limits in sorted(load_budgets().items()):
+        if subcategories is not None and subcategory not in subcategories:
+            continue
+        for kind in BUDGET_PERIODS:
+            if limits.get(kind):
+                status.append((subcategory, kind, float(limits[kind]),
+                               spend.get((kind, subcategory), 0) / 100))
+    return status
+
+
+def _budget_period_label(kind, day):
+    day = date.fromordinal(day)
+    return day.strftime("%m-%Y") if kind == "monthly" else str(day.year)
+
+
+def warn_over_budget(store, entries):
+    """Print a warning for every budget that is over its limit after adding `entries`."""
+    budgets = load_budgets()
+    touched = {}
+    for entry in entries:
+        if entry["category"] == "Expense" and entry["subcategory"] in budgets:
+            touched.setdefault(entry["date"], set()).add(entry["subcategory"])
+    if not touched:
+        return
+    currency = currency_info(ledger_currency())
+    for date_str, subcategories in touched.items():
+        day = CSV._day_number(date_str)
+        for subcategory, kind, limit, spent in budget_status(store, day, subcategories):
+            if spent > limit:
+                print(f"{Fore.RED}⚠️  Over budget: {subcategory} {kind} ({_budget_period_label(kind, day)}) "
+                      f"at {format_amount(spent, currency)} of {format_amount(limit, currency)}{Style.RESET_ALL}")
+
+
+def set_budget(subcategory, monthly=None, yearly=None):
+    """Set (or with 0, clear) the monthly and/or yearly budget for an Expense subcategory."""
+    if not has_category("Expense", subcategory):
+        print(f"{Fore.RED}Unknown Expense category: {subcategory}{Style.RESET_ALL}")
+        return False
+    if (monthly is not None and monthly < 0) or (yearly is not None and yearly < 0):
+        print(f"{Fore.RED}Budgets must not be negative.{Style.RESET_ALL}")
+        return False
+    config = load_config()
+    limits = config.setdefault("budgets", {}).setdefault(subcategory, {})
+    for kind, limit in (("monthly", monthly), ("yearly", yearly)):
+        if limit is None:
+            continue
+        if limit:
+            limits[kind] = limit
+        else:
+            limits.pop(kind, None)
+    if not limits:
+        del config["budgets"][subcategory]
+    save_config(config)
+    print(f"{Fore.GREEN}✓ Budget for {subcategory} updated{Style.RESET_ALL}")
+    return True
+
+
+def view_budgets(month=None):
+    """Print spend against every budget for a month (mm-yyyy, default: this month) and its year."""
+    day = datetime.strptime(month, "%m-%Y").date() if month else date.today()
+    store = get_store()
+    store.initialize_csv()
+    status = budget_status(store, day.toordinal())
+    if not status:
+        print(f"{Fore.YELLOW}⚠️  No budgets set. Add some with `budgets --set CATEGORY --monthly AMOUNT`.{Style.RESET_ALL}")
+        return
+    currency = currency_info(ledger_currency())
+    print(f"\n{Fore.CYAN}Budgets for {day.strftime('%m-%Y')}:{Style.RESET_ALL}")
+    print(f"{'Category':<20} {'Period':<10} {'Budget':>15} {'Spent':>15} {'Remaining':>15}")
+    print("-" * 79)
+    for subcategory, kind, limit, spent in status:
+        color = Fore.RED if spent > limit else Fore.GREEN
+        print(f"{subcategory:<20} {_budget_period_label(kind, day.toordinal()):<10} "
+              f"{format_amount(limit, currency):>15} {format_amount(spent, currency):>15} "
+              f"{color}{format_amount(limit - spent, currency):>15}{Style.RESET_ALL}")
+
+
+# Inverted index sidecar: a header (magic, sorted_count, ledger position, ledger mtime_ns)
+# followed by the sorted part as two contiguous arrays (term keys, then row ids, sorted by
+# (term, id)) and then (term, id) records appended by later commits until the next compaction.
+# Row ids are CSV byte offsets or columnar row numbers, so ids increase in file order.
+SEARCH_MAGIC = b"PFMSRC1\0"
+SEARCH_HEADER = struct.Struct("<8sQqq")
+SEARCH_RECORD = struct.Struct("<qq")
+SEARCH_COMPACT_MIN = 4096
+SEARCH_TOKEN = re.compile(r"[^\W_]+")
+SEARCH_MAX_CENTS = 10 ** 12  # upper end of open-ended amount ranges
+
+
+def _term_key(term):
+    """64-bit key of a search term; the index stores keys, not strings."""
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "little", signed=True)
+
+
+def _amount_bucket(cents):
+    """Amounts are indexed in buckets of two significant digits (exact below 100 cents)."""
+    if cents < 100:
+        return max(cents, 0)
+    step = 10 ** (len(str(cents)) - 2)
+    return cents - cents % step
+
+
+def _amount_buckets(min_cents, max_cents):
+    """Every bucket that overlaps [min_cents, max_cents]."""
+    bucket = _amount_bucket(max(min_cents, 0))
+    buckets = []
+    while bucket <= max_cents:
+        buckets.append(bucket)
+        bucket += 1 if bucket < 100 else 10 ** (len(str(bucket)) - 2)
+    return buckets
+
+
+def _search_terms(entry):
+    """Terms indexed for one entry: description tokens plus category, subcategory and amount bucket."""
+    terms = set(SEARCH_TOKEN.findall(str(entry.get("description") or "").lower()))
+    terms.add(f"category:{entry['category'].lower()}")
+    terms.add(f"subcategory:{entry['subcategory'].lower()}")
+    terms.add(f"amount:{_amount_bucket(CSV._to_cents(entry['amount']))}")
+    return terms
+
+
+def _write_search_index(store, terms, ids, stamp=None):
+    """Write a fully sorted index atomically, stamped as covering the ledger at `stamp` (default: now)."""
+    import numpy as np
+    order = np.lexsort((ids, terms))
+    terms, ids = terms[order], ids[order]
+    unique = np.ones(len(terms), dtype=bool)
+    unique[1:] = (terms[1:] != terms[:-1]) | (ids[1:] != ids[:-1])
+    terms, ids = terms[unique], ids[unique]
+    position, mtime_ns = stamp or store._ledger_stamp()
+    tmp_file = store._search_file() + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(SEARCH_HEADER.pack(SEARCH_MAGIC, len(terms), position, mtime_ns))
+        f.write(terms.astype("<i8").tobytes())
+        f.write(ids.astype("<i8").tobytes())
+    os.replace(tmp_file, store._search_file())
+
+
+def rebuild_search_index(store=None):
+    """Tokenize every row of the ledger into a fresh inverted index.
+
+    Descriptions repeat a lot, so each distinct description is tokenized once
+    per chunk and category, subcategory and amount terms are looked up per
+    distinct value rather than built per row.
+    """
+    import numpy as np
+    import pandas as pd
+    store = store or get_store()
+    with file_lock(store._lock_path()), profile_stage("search.rebuild"):
+        all_terms = []
+        all_ids = []
+        for ids, _, chunk in store._indexed_rows():
+            ids = np.asarray(ids, dtype=np.int64)
+            codes, descriptions = pd.factorize(chunk["description"].fillna("").to_numpy(dtype=object))
+            token_keys = [[_term_key(token) for token in set(SEARCH_TOKEN.findall(description.lower()))]
+                          for description in descriptions]
+            counts = np.array([len(keys) for keys in token_keys], dtype=np.int64)
+            flat = np.array([key for keys in token_keys for key in keys], dtype=np.int64)
+            row_counts = counts[codes]
+            starts = np.repeat(np.cumsum(counts)[codes] - row_counts, row_counts)
+            within = np.arange(row_counts.sum()) - np.repeat(np.cumsum(row_counts) - row_counts, row_counts)
+            all_terms.append(flat[starts + within])
+            all_ids.append(np.repeat(ids, row_counts))
+
+            for name in ("category", "subcategory"):
+                values = chunk[name]
+                # Code -1 (missing) picks the last key
+                keys = [_term_key(f"{name}:{str(value).lower()}") for value in values.cat.categories]
+                keys = np.array(keys + [_term_key(f"{name}:nan")], dtype=np.int64)
+                all_terms.append(keys[values.cat.codes.to_numpy()])
+                all_ids.append(ids)
+            cents = np.round(chunk["amount"].to_numpy(dtype=float) * 100).astype(np.int64)
+            unique_cents, inverse = np.unique(cents, return_inverse=True)
+            buckets = np.array([_term_key(f"amount:{_amount_bucket(value)}") for value in unique_cents.tolist()],
+                               dtype=np.int64)
+            all_terms.append(buckets[inverse])
+            all_ids.append(ids)
+        terms = np.concatenate(all_terms) if all_terms else np.empty(0, dtype=np.int64)
+        ids = np.concatenate(all_ids) if all_ids else np.empty(0, dtype=np.int64)
+        _write_search_index(store, terms, ids)
+
+
+def _search_index_append(store, start_position, entries, ids):
+    """Add entries just appended at `start_position` (with their row ids) to the index.
+
+    Called under the ledger lock. Like the date index, the search index is
+    only extended when it was current up to the append; otherwise it is
+    rebuilt on the next search.
+    """
+    try:
+        with open(store._search_file(), "rb") as f:
+            header = f.read(SEARCH_HEADER.size)
+    except FileNotFoundError:
+        return
+    if len(header) != SEARCH_HEADER.size:
+        return
+    magic, sorted_count, position, _ = SEARCH_HEADER.unpack(header)
+    if magic != SEARCH_MAGIC or position != start_position:
+        return
+    records = b"".join(SEARCH_RECORD.pack(_term_key(term), row_id)
+                       for entry, row_id in zip(entries, ids) for term in _search_terms(entry))
+    position, mtime_ns = store._ledger_stamp()
+    with open(store._search_file(), "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        f.write(records)
+        f.seek(0)
+        f.write(SEARCH_HEADER.pack(SEARCH_MAGIC, sorted_count, position, mtime_ns))
+
+
+def _load_search_index(store):
+    """Return (sorted term keys, their row ids, tail records), rebuilding or compacting as needed."""
+    import numpy as np
+    path = store._search_file()
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(SEARCH_HEADER.size)
+    except FileNotFoundError:
+        raw = b""
+    header = SEARCH_HEADER.unpack(raw) if len(raw) == SEARCH_HEADER.size else None
+    if header is None or header[0] != SEARCH_MAGIC or header[2:] != tuple(store._ledger_stamp()):
+        rebuild_search_index(store)
+        return _load_search_index(store)
+    sorted_count = header[1]
+    tail_offset = SEARCH_HEADER.size + 16 * sorted_count
+    tail_count = (os.path.getsize(path) - tail_offset) // SEARCH_RECORD.size
+    if sorted_count == 0 and tail_count == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=[("term", "<i8"), ("id", "<i8")])
+    data = np.memmap(path, dtype="<i8", mode="r", offset=SEARCH_HEADER.size,
+                     shape=(2 * sorted_count + 2 * tail_count,))
+    terms, ids = data[:sorted_count], data[sorted_count:2 * sorted_count]
+    tail = data[2 * sorted_count:].view([("term", "<i8"), ("id", "<i8")])
+    if tail_count > max(SEARCH_COMPACT_MIN, sorted_count // 8):
+        with file_lock(store._lock_path()):
+            _write_search_index(store, np.concatenate([terms, tail["term"]]), np.concatenate([ids, tail["id"]]),
+                                stamp=header[2:])
+        return _load_search_index(store)
+    return terms, ids, tail
+
+
+def _postings(index, keys):
+    """Sorted row ids of rows carrying any of the term `keys`."""
+    import numpy as np
+    terms, ids, tail = index
+    parts = []
+    for key in keys:
+        lo = np.searchsorted(terms, key, side="left")
+        hi = np.searchsorted(terms, key, side="right")
+        parts.append(ids[lo:hi])
+    if len(tail):
+        parts.append(tail["id"][np.isin(tail["term"], keys)])
+    if len(parts) == 1:
+        return parts[0]
+    postings = np.concatenate(parts)
+    # Appended rows usually come after the sorted part, but a sharded ledger can append to an older shard
+    if len(keys) == 1 and not (postings[1:] < postings[:-1]).any():
+        return postings
+    return np.unique(postings)
+
+
+def _intersect(postings):
+    """Intersect sorted id lists, probing the longer lists for the candidates of the shortest."""
+    import numpy as np
+    postings = sorted(postings, key=len)
+    result = np.asarray(postings[0])
+    for other in postings[1:]:
+        if not len(result) or not len(other):
+            return result[:0]
+        position = np.minimum(np.searchsorted(other, result), len(other) - 1)
+        result = result[other[position] == result]
+    return result
+
+
+def search_transactions(words=(), category=None, subcategory=None, year=None, start_date=None, end_date=None,
+                        min_amount=None, max_amount=None, store=None):
+    """Return the transactions matching every given condition, in date order.
+
+    `words` must all appear as whole words in the description (case
+    insensitive); category and subcategory match exactly. Each condition is a
+    postings list from the search index (dates come from the date index) and
+    only rows in their intersection are read from the ledger.
+    """
+    if any(SEARCH_TOKEN.search(word) is None for word in words):
+        raise ValueError("Search words must contain letters or digits")
+    store = store or get_store()
+    store.initialize_csv()
+    with profile_stage("search.postings"):
+        index = _load_search_index(store)
+        postings = [_postings(index, [_term_key(token)])
+                    for word in words for token in SEARCH_TOKEN.findall(word.lower())]
+        for name, value in (("category", category), ("subcategory", subcategory)):
+            if value:
+                postings.append(_postings(index, [_term_key(f"{name}:{value.lower()}")]))
+        min_cents = CSV._to_cents(min_amount) if min_amount is not None else None
+        max_cents = CSV._to_cents(max_amount) if max_amount is not None else None
+        if min_cents is not None or max_cents is not None:
+            buckets = _amount_buckets(min_cents or 0, SEARCH_MAX_CENTS if max_cents is None else max_cents)
+            postings.append(_postings(index, [_term_key(f"amount:{bucket}") for bucket in buckets]))
+        if year:
+            postings.append(store._date_ids(date(year, 1, 1).toordinal(), date(year, 12, 31).toordinal()))
+        if start_date or end_date:
+            start_day = CSV._day_number(start_date) if start_date else 1
+            end_day = CSV._day_number(end_date) if end_date else date.max.toordinal()
+            postings.append(store._date_ids(start_day, end_day))
+        if not postings:
+            raise ValueError("Give at least one search word or filter")
+        profile_count("search.postings_read", sum(len(ids) for ids in postings))
+        ids = _intersect(postings)
+    with profile_stage("search.read_rows"):
+        df = store._rows_by_id(ids)
+    # Amount buckets are coarser than the range, so check the edge buckets exactly
+    if min_cents is not None:
+        df = df[df["amount"] >= min_cents / 100]
+    if max_cents is not None:
+        df = df[df["amount"] <= max_cents / 100]
+    return df.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+def view_search(words=(), limit=50, **filters):
+    """Print the matches of search_transactions (at most `limit`) with summaries of all of them."""
+    try:
+        df = search_transactions(words, **filters)
+        if df.empty:
+            print(f"{Fore.YELLOW}⚠️  No matching transactions.{Style.RESET_ALL}")
+            return
+        print(f"{Fore.CYAN}{len(df):,} matching transactions{Style.RESET_ALL}")
+        format_transaction_table(df, limit=limit)
+    except ValueError as e:
+        print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+
+
+# Fingerprint sidecar for duplicate detection: a header (magic, sorted_count, ledger position,
+# ledger mtime_ns) followed by the sorted part as four contiguous arrays (keys, day ordinals,
+# cents and row ids, sorted by (key, id)) and then (key, day, cents, id) records appended by
+# later commits until the next compaction. A key hashes an entry's subcategory and normalized
+# description together with its DEDUPE_BUCKET_DAYS-day date bucket, so the rows that can
+# duplicate an entry are the few under its own key (or a neighbouring bucket's, when fuzzy).
+DEDUPE_MAGIC = b"PFMDUP1\0"
+DEDUPE_HEADER = struct.Struct("<8sQqq")
+DEDUPE_RECORD = struct.Struct("<qqqq")
+DEDUPE_DTYPE = [("key", "<i8"), ("day", "<i8"), ("cents", "<i8"), ("id", "<i8")]
+DEDUPE_INT = struct.Struct("<q")
+DEDUPE_COMPACT_MIN = 4096  # single adds search the unsorted tail linearly, so it is kept this short
+DEDUPE_BUCKET_DAYS = 8
+DEDUPE_VECTOR_MIN = 256  # smaller batches are checked without numpy, keeping single adds light
+DEDUPE_EXAMPLES = 5
+DUPLICATE_POLICIES = ("skip", "warn", "force")
+# Overridden by the config's "duplicates" key; fuzzy_amount is a fraction of the amount
+DUPLICATE_DEFAULTS = {"policy": "warn", "fuzzy": False, "fuzzy_days": 3, "fuzzy_amount": 0.02}
+
+
+def duplicate_settings():
+    """Return the configured duplicate policy and fuzzy tolerances, filled in from DUPLICATE_DEFAULTS."""
+    return dict(DUPLICATE_DEFAULTS, **load_config().get("duplicates", {}))
+
+
+def _text_key(subcategory, description):
+    """64-bit hash of a subcategory and description, ignoring case, punctuation and spacing."""
+    words = " ".join(SEARCH_TOKEN.findall(str(description).lower()))
+    text = f"{str(subcategory).strip().lower()}\0{words}"
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+
+def _mix64(value):
+    """splitmix64 finalizer over an unsigned 64-bit int or uint64 array."""
+    mask = 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & mask
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & mask
+    return value ^ (value >> 31)
+
+
+def _fingerprint_key(text_key, bucket):
+    """Signed index key of a text key in one date bucket; _fingerprint_keys is the array version."""
+    key = _mix64(text_key ^ _mix64(bucket))
+    return key - (1 << 64) if key >> 63 else key
+
+
+def _fingerprint_keys(text_keys, buckets):
+    import numpy as np
+    keys = _mix64(np.asarray(text_keys, dtype=np.uint64) ^ _mix64(np.asarray(buckets).astype(np.uint64)))
+    return keys.view(np.int64)
+
+
+def _entry_fingerprints(entries):
+    """Lists of text keys and cents for entries about to be written."""
+    cache = {}
+    text_keys = []
+    for entry in entries:
+        pair = (entry["subcategory"], entry.get("description") or "")
+        if pair not in cache:
+            cache[pair] = _text_key(*pair)
+        text_keys.append(cache[pair])
+    return text_keys, [CSV._to_cents(entry["amount"]) for entry in entries]
+
+
+def _write_fingerprints(store, keys, days, cents, ids, stamp=None):
+    """Write a fully sorted fingerprint index atomically, stamped as covering the ledger at `stamp` (default: now)."""
+    import numpy as np
+    order = np.lexsort((ids, keys))
+    position, mtime_ns = stamp or store._ledger_stamp()
+    tmp_file = store._fingerprint_file() + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(DEDUPE_HEADER.pack(DEDUPE_MAGIC, len(keys), position, mtime_ns))
+        for column in (keys, days, cents, ids):
+            f.write(np.asarray(column)[order].astype("<i8").tobytes())
+    os.replace(tmp_file, store._fingerprint_file())
+
+
+def create_fingerprints(store):
+    """Start an empty fingerprint index for a ledger that was just created (no numpy needed)."""
+    position, mtime_ns = store._ledger_stamp()
+    with open(store._fingerprint_file(), "wb") as f:
+        f.write(DEDUPE_HEADER.pack(DEDUPE_MAGIC, 0, position, mtime_ns))
+
+
+def ensure_fingerprints(store):
+    """Index a ledger that has no fingerprint index yet (it predates duplicate detection), once.
+
+    CSV ledgers are seeded without numpy or pandas, so single adds stay
+    light. If the ledger cannot be read the index stays missing and checks
+    are skipped with a warning, as for a stale one.
+    """
+    if os.path.exists(store._fingerprint_file()):
+        return
+    with contextlib.suppress(ValueError):
+        if issubclass(store, CSV):
+            seed_fingerprints(store)
+        else:
+            rebuild_fingerprints(store)
+
+
+def seed_fingerprints(store):
+    """Fingerprint every row of an existing CSV ledger with the standard library, for single adds.
+
+    Rows whose date or amount cannot be read are left out rather than
+    failing the write that triggered the seeding.
+    """
+    records = []
+    days, cents, text_keys, keys = {}, {}, {}, {}
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # millions of small tuples would otherwise trigger repeated full collections
+    try:
+        with file_lock(store._lock_path()), profile_stage("dedupe.seed"), open(store.CSV_FILE, "rb") as f:
+            stamp = store._ledger_stamp()
+            header = next(csv.reader([f.readline().decode()]))
+            columns = [header.index(name) for name in ("date", "amount", "subcategory", "description")]
+            for offset, row in store._row_spans(f):
+                row = row.decode()
+                fields = next(csv.reader([row]), []) if '"' in row else row.rstrip("\r\n").split(",")
+                try:
+                    date_str, amount, subcategory, description = (fields[i] for i in columns)
+                    if date_str not in days:
+                        days[date_str] = store._day_number(date_str.strip())
+                    if amount not in cents:
+                        cents[amount] = store._to_cents(amount)
+                except (IndexError, ValueError, OverflowError):
+                    continue
+                day = days[date_str]
+                pair = (subcategory, description)
+                if pair not in text_keys:
+                    text_keys[pair] = _text_key(*pair)
+                bucket = (text_keys[pair], day // DEDUPE_BUCKET_DAYS)
+                if bucket not in keys:
+                    keys[bucket] = _fingerprint_key(*bucket)
+                records.append((keys[bucket], offset, day, cents[amount]))  # sorts by (key, id)
+        records.sort()
+        key_column, id_column, day_column, cents_column = (
+            [array.array("q", column) for column in zip(*records)] or [array.array("q") for _ in range(4)])
+        _write_fingerprint_arrays(store, [key_column, day_column, cents_column, id_column], stamp)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _write_fingerprint_arrays(store, columns, stamp):
+    """Write (keys, days, cents, ids) arrays already sorted by (key, id) as the whole index; see _write_fingerprints."""
+    position, mtime_ns = stamp
+    tmp_file = store._fingerprint_file() + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(DEDUPE_HEADER.pack(DEDUPE_MAGIC, len(columns[0]), position, mtime_ns))
+        for column in columns:
+            if sys.byteorder == "big":
+                column.byteswap()
+            f.write(column.tobytes())
+    os.replace(tmp_file, store._fingerprint_file())
+
+
+def rebuild_fingerprints(store=None):
+    """Fingerprint every row of the ledger into a fresh duplicate index.
+
+    Each distinct (subcategory, description) pair of a chunk is hashed once;
+    dates and amounts are folded in with array arithmetic.
+    """
+    import numpy as np
+    import pandas as pd
+    store = store or get_store()
+    with file_lock(store._lock_path()), profile_stage("dedupe.rebuild"):
+        columns = ([], [], [], [])
+        for ids, days, chunk in store._indexed_rows():
+            subcategory_codes, subcategories = pd.factorize(chunk["subcategory"].astype(object).fillna("").to_numpy())
+            description_codes, descriptions = pd.factorize(chunk["description"].fillna("").to_numpy(dtype=object))
+            pairs, inverse = np.unique(subcategory_codes * len(descriptions) + description_codes, return_inverse=True)
+            text_keys = np.array([_text_key(subcategories[pair // len(descriptions)], descriptions[pair % len(descriptions)])
+                                  for pair in pairs.tolist()], dtype=np.uint64)
+            days = np.asarray(days, dtype=np.int64)
+            columns[0].append(_fingerprint_keys(text_keys[inverse], days // DEDUPE_BUCKET_DAYS))
+            columns[1].append(days)
+            columns[2].append(np.round(chunk["amount"].to_numpy(dtype=float) * 100).astype(np.int64))
+            columns[3].append(np.asarray(ids, dtype=np.int64))
+        _write_fingerprints(store, *(np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+                                     for parts in columns))
+
+
+def _fingerprints_append(store, start_position, entries, days, ids):
+    """Add entries just appended at `start_position` (with their day ordinals and row ids) to the index.
+
+    Called under the ledger lock. Like the search index, the fingerprints are
+    only extended when they were current up to the append.
+    """
+    try:
+        with open(store._fingerprint_file(), "rb") as f:
+            header = f.read(DEDUPE_HEADER.size)
+    except FileNotFoundError:
+        return
+    if len(header) != DEDUPE_HEADER.size:
+        return
+    magic, sorted_count, position, _ = DEDUPE_HEADER.unpack(header)
+    if magic != DEDUPE_MAGIC or position != start_position:
+        return
+    text_keys, cents = _entry_fingerprints(entries)
+    records = b"".join(DEDUPE_RECORD.pack(_fingerprint_key(text_key, day // DEDUPE_BUCKET_DAYS), day, amount, row_id)
+                       for text_key, day, amount, row_id in zip(text_keys, map(int, days), cents, ids))
+    position, mtime_ns = store._ledger_stamp()
+    with open(store._fingerprint_file(), "r+b") as f:
+        f.seek(0, os.SEEK_END)
+        f.write(records)
+        f.seek(0)
+        f.write(DEDUPE_HEADER.pack(DEDUPE_MAGIC, sorted_count, position, mtime_ns))
+
+
+def _fingerprint_counts(store, vectorized=False):
+    """Return (sorted_count, tail_count) of the index after compacting it as needed.
+
+    Without `vectorized` the tail is merged in without numpy, which keeps
+    single adds light; the vectorized path sorts it with numpy instead and
+    lets it grow to an eighth of the index first.
+
+    Returns None when the index is missing or does not cover the ledger (it
+    was edited by another tool); only rebuild_fingerprints builds it from
+    the ledger, never a write.
+    """
+    path = store._fingerprint_file()
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(DEDUPE_HEADER.size)
+    except FileNotFoundError:
+        raw = b""
+    header = DEDUPE_HEADER.unpack(raw) if len(raw) == DEDUPE_HEADER.size else None
+    if header is None or header[0] != DEDUPE_MAGIC or header[2:] != tuple(store._ledger_stamp()):
+        return None
+    sorted_count = header[1]
+    tail_count = (os.path.getsize(path) - DEDUPE_HEADER.size) // DEDUPE_RECORD.size - sorted_count
+    if vectorized and tail_count > max(DEDUPE_COMPACT_MIN, sorted_count // 8):
+        import numpy as np
+        runs = _load_fingerprints(store, (sorted_count, tail_count))
+        with file_lock(store._lock_path()):
+            _write_fingerprints(store, *(np.concatenate(column) for column in zip(*runs)), stamp=header[2:])
+        return _fingerprint_counts(store, vectorized)
+    if not vectorized and tail_count > DEDUPE_COMPACT_MIN:
+        with file_lock(store._lock_path()):
+            _merge_fingerprint_tail(store, sorted_count, tail_count, header[2:])
+        return _fingerprint_counts(store, vectorized)
+    return sorted_count, tail_count
+
+
+def _int64_array(raw):
+    """array("q") of the little-endian int64s in `raw`."""
+    values = array.array("q", raw)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def _merge_fingerprint_tail(store, sorted_count, tail_count, stamp):
+    """Merge the appended records into the sorted part with the standard library."""
+    with open(store._fingerprint_file(), "rb") as f:
+        f.seek(DEDUPE_HEADER.size)
+        columns = [_int64_array(f.read(DEDUPE_INT.size * sorted_count)) for _ in range(4)]
+        tail = sorted(DEDUPE_RECORD.iter_unpack(f.read(DEDUPE_RECORD.size * tail_count)),
+                      key=lambda record: (record[0], record[3]))
+    keys, ids = columns[0], columns[3]
+    merged = [array.array("q") for _ in range(4)]
+    start = 0
+    for record in tail:
+        position = bisect.bisect_left(keys, record[0], start)
+        while position < sorted_count and keys[position] == record[0] and ids[position] < record[3]:
+            position += 1
+        for column, merged_column, value in zip(columns, merged, record):
+            merged_column.extend(column[start:position])
+            merged_column.append(value)
+        start = position
+    for column, merged_column in zip(columns, merged):
+        merged_column.extend(column[start:])
+    _write_fingerprint_arrays(store, merged, stamp)
+
+
+def _load_fingerprints(store, counts):
+    """Return the index as sorted runs of (keys, days, cents, ids) arrays.
+
+    The first run is the memory-mapped sorted part; appended records, if
+    any, are sorted in memory into a second run.
+    """
+    import numpy as np
+    sorted_count, tail_count = counts
+    if sorted_count == 0 and tail_count == 0:
+        return []
+    data = np.memmap(store._fingerprint_file(), dtype="<i8", mode="r", offset=DEDUPE_HEADER.size,
+                     shape=(4 * (sorted_count + tail_count),))
+    runs = [tuple(data[i * sorted_count:(i + 1) * sorted_count] for i in range(4))]
+    if tail_count:
+        tail = np.sort(data[4 * sorted_count:].view(DEDUPE_DTYPE), order=["key", "id"])
+        runs.append((tail["key"], tail["day"], tail["cents"], tail["id"]))
+    return runs
+
+
+def _scan_fingerprints(store, counts):
+    """Return a lookup from key to [(day, cents, id), ...] that reads the index without numpy.
+
+    The sorted part is memory-mapped and binary searched in place, so a
+    lookup only touches the pages it probes; the short unsorted tail is
+    searched as an array.
+    """
+    sorted_count, tail_count = counts
+    with open(store._fingerprint_file(), "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    tail_start = DEDUPE_HEADER.size + DEDUPE_RECORD.size * sorted_count
+    tail = _int64_array(data[tail_start:tail_start + DEDUPE_RECORD.size * tail_count])
+    tail_keys = tail[0::4]
+
+    def value(column, position):
+        return DEDUPE_INT.unpack_from(data, DEDUPE_HEADER.size + 8 * (column * sorted_count + position))[0]
+
+    def lookup(key):
+        rows = []
+        position = bisect.bisect_left(range(sorted_count), key, key=lambda mid: value(0, mid))
+        while position < sorted_count and value(0, position) == key:
+            rows.append((value(1, position), value(2, position), value(3, position)))
+            position += 1
+        found = -1
+        with contextlib.suppress(ValueError):
+            while True:
+                found = tail_keys.index(key, found + 1)
+                rows.append(tuple(tail[4 * found + 1:4 * found + 4]))
+        return rows
+
+    return lookup
+
+
+class DuplicateCheck:
+    """Match batches of new entries against the rows already in the ledger.
+
+    A row matches an entry with the same subcategory and description (up to
+    case and punctuation) on the same day for the same amount or, when fuzzy,
+    within `fuzzy_days` days and `fuzzy_amount` of the amount. Each row
+    matches at most one entry, so re-importing an overlapping feed finds
+    exactly the rows it added before while repeats within the feed are kept.
+    Under "skip" matches are dropped, under "warn" they are written and
+    reported, and under "force" nothing is checked.
+    """
+
+    def __init__(self, store, policy=None, fuzzy=None):
+        settings = duplicate_settings()
+        self.store = store
+        self.policy = policy or settings["policy"]
+        if self.policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Unknown duplicate policy '{self.policy}'. Use one of: {', '.join(DUPLICATE_POLICIES)}")
+        self.fuzzy = settings["fuzzy"] if fuzzy is None else fuzzy
+        self.fuzzy_days = int(settings["fuzzy_days"]) if self.fuzzy else 0
+        self.fuzzy_amount = float(settings["fuzzy_amount"]) if self.fuzzy else 0.0
+        self.index = None
+        self.unchecked = 0
+        self.matched = set()
+        self.found = 0
+        self.examples = []
+
+    def filter(self, entries):
+        """Return the entries of a batch that should be written. Call under the ledger lock.
+
+        The index is read on the first batch, so later batches are only
+        compared with rows that existed before this check started.
+        """
+        if self.policy == "force" or not entries:
+            return entries
+        with profile_stage("dedupe.check"):
+            if self.index is None:
+                ensure_fingerprints(self.store)
+                counts = _fingerprint_counts(self.store, vectorized=len(entries) >= DEDUPE_VECTOR_MIN)
+                if counts is None:
+                    self.index = False
+                elif len(entries) < DEDUPE_VECTOR_MIN:  # add_entries only passes a short first batch when it is also the last
+                    self.index = _scan_fingerprints(self.store, counts)
+                else:
+                    self.index = _load_fingerprints(self.store, counts)
+            if self.index is False:  # a stale index must never block a write: let the entries through
+                self.unchecked += len(entries)
+                return entries
+            days = [CSV._day_number(entry["date"]) for entry in entries]
+            text_keys, cents = _entry_fingerprints(entries)
+            match = self._match_scan if callable(self.index) else self._match_arrays
+            duplicates = {}
+            for owner, row_id in match(days, text_keys, cents):
+                if owner not in duplicates and row_id not in self.matched:
+                    self.matched.add(row_id)
+                    duplicates[owner] = row_id
+        profile_count("dedupe.checked", len(entries))
+        self.found += len(duplicates)
+        for i in sorted(duplicates)[:DEDUPE_EXAMPLES - len(self.examples)]:
+            self.examples.append(entries[i])
+        if self.policy == "warn" or not duplicates:
+            return entries
+        return [entry for i, entry in enumerate(entries) if i not in duplicates]
+
+    def _buckets(self, day):
+        return range((day - self.fuzzy_days) // DEDUPE_BUCKET_DAYS, (day + self.fuzzy_days) // DEDUPE_BUCKET_DAYS + 1)
+
+    def _match_scan(self, days, text_keys, cents):
+        """(entry index, row id) candidate pairs, closest first per entry, via the numpy-free lookup."""
+        pairs = []
+        for owner, (day, text_key, amount) in enumerate(zip(days, text_keys, cents)):
+            tolerance = round(abs(amount) * self.fuzzy_amount)
+            for bucket in self._buckets(day):
+                for row_day, row_cents, row_id in self.index(_fingerprint_key(text_key, bucket)):
+                    if abs(row_day - day) <= self.fuzzy_days and abs(row_cents - amount) <= tolerance:
+                        pairs.append((owner, abs(row_day - day), abs(row_cents - amount), row_id))
+        pairs.sort()
+        return [(owner, row_id) for owner, _, _, row_id in pairs]
+
+    def _match_arrays(self, days, text_keys, cents):
+        """Vectorized _match_scan over the memory-mapped index."""
+        import numpy as np
+        if not self.index:
+            return []
+        days = np.array(days, dtype=np.int64)
+        text_keys = np.array(text_keys, dtype=np.uint64)
+        cents = np.array(cents, dtype=np.int64)
+        tolerance = np.round(np.abs(cents) * self.fuzzy_amount).astype(np.int64)
+        first_bucket = (days - self.fuzzy_days) // DEDUPE_BUCKET_DAYS
+        last_bucket = (days + self.fuzzy_days) // DEDUPE_BUCKET_DAYS
+
+        owners, row_days, row_cents, row_ids = [], [], [], []
+        for step in range(int((last_bucket - first_bucket).max()) + 1):
+            probing = np.flatnonzero(first_bucket + step <= last_bucket)
+            keys = _fingerprint_keys(text_keys[probing], first_bucket[probing] + step)
+            for run_keys, run_days, run_cents, run_ids in self.index:
+                lo = np.searchsorted(run_keys, keys, side="left")
+                counts = np.searchsorted(run_keys, keys, side="right") - lo
+                positions = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+                owners.append(np.repeat(probing, counts))
+                row_days.append(run_days[positions])
+                row_cents.append(run_cents[positions])
+                row_ids.append(run_ids[positions])
+        owners, row_days, row_cents, row_ids = map(np.concatenate, (owners, row_days, row_cents, row_ids))
+        day_drift = np.abs(row_days - days[owners])
+        amount_drift = np.abs(row_cents - cents[owners])
+        close = (day_drift <= self.fuzzy_days) & (amount_drift <= tolerance[owners])
+        order = np.lexsort((row_ids[close], amount_drift[close], day_drift[close], owners[close]))
+        return zip(owners[close][order].tolist(), row_ids[close][order].tolist())
+
+    def report(self):
+        """Print how many entries matched existing rows, with a few examples."""
+        if self.unchecked:
+            print(f"{Fore.YELLOW}⚠️  The duplicate index does not cover the ledger, so {self.unchecked:,} new "
+                  f"{'entry was' if self.unchecked == 1 else 'entries were'} not checked. "
+                  f"Run `python project.py dedupe` to rebuild it.{Style.RESET_ALL}")
+        if not self.found:
+            return
+        noun = "entry duplicates an existing transaction" if self.found == 1 else \
+            "entries duplicate existing transactions"
+        action = "skipped" if self.policy == "skip" else "added anyway"
+        print(f"{Fore.YELLOW}⚠️  {self.found:,} {noun} ({action}):{Style.RESET_ALL}")
+        for entry in self.examples:
+            print(f"{Fore.YELLOW}  {entry['date']}  {entry['amount']}  {entry['subcategory']}  "
+                  f"{entry.get('description') or ''}{Style.RESET_ALL}")
+        if self.found > len(self.examples):
+            print(f"{Fore.YELLOW}  ... and {self.found - len(self.examples):,} more{Style.RESET_ALL}")
+
+
+def find_duplicates(store=None):
+    """Return the ids of rows that exactly duplicate an earlier row, after rebuilding the index."""
+    import numpy as np
+    store = store or get_store()
+    rebuild_fingerprints(store)
+    runs = _load_fingerprints(store, _fingerprint_counts(store))
+    if not runs:
+        return np.empty(0, dtype=np.int64)
+    keys, days, cents, ids = runs[0]
+    order = np.lexsort((ids, cents, days, keys))
+    keys, days, cents, ids = keys[order], days[order], cents[order], ids[order]
+    repeat = np.zeros(len(keys), dtype=bool)
+    repeat[1:] = (keys[1:] == keys[:-1]) & (days[1:] == days[:-1]) & (cents[1:] == cents[:-1])
+    return np.sort(ids[repeat])
+
+
+def set_duplicate_policy(policy=None, fuzzy=None, fuzzy_days=None, fuzzy_amount=None):
+    """Store the default duplicate policy and fuzzy tolerances in the config."""
+    if policy is not None and policy not in DUPLICATE_POLICIES:
+        print(f"{Fore.RED}Unknown duplicate policy '{policy}'. Use one of: {', '.join(DUPLICATE_POLICIES)}{Style.RESET_ALL}")
+        return False
+    if (fuzzy_days is not None and fuzzy_days < 0) or (fuzzy_amount is not None and fuzzy_amount < 0):
+        print(f"{Fore.RED}Fuzzy tolerances must not be negative.{Style.RESET_ALL}")
+        return False
+    config = load_config()
+    settings = config.setdefault("duplicates", {})
+    for key, value in (("policy", policy), ("fuzzy", fuzzy), ("fuzzy_days", fuzzy_days),
+                       ("fuzzy_amount", fuzzy_amount)):
+        if value is not None:
+            settings[key] = value
+    save_config(config)
+    settings = duplicate_settings()
+    fuzzy_note = (f", fuzzy within {settings['fuzzy_days']} days and {settings['fuzzy_amount']:.0%}"
+                  if settings["fuzzy"] else "")
+    print(f"{Fore.GREEN}✓ Duplicate policy: {settings['policy']}{fuzzy_note}{Style.RESET_ALL}")
+    return True
+
+
+def view_duplicates(limit=20):
+    """Build the fingerprint index and list the rows that repeat an earlier one exactly."""
+    store = get_store()
+    store.initialize_csv()
+    start = time.perf_counter()
+    try:
+        ids = find_duplicates(store)
+    except ValueError as e:  # e.g. a hand-edited row with a malformed date
+        print(f"{Fore.RED}Could not index the ledger: {e}{Style.RESET_ALL}")
+        return
+    print(f"{Fore.GREEN}✓ Fingerprint index built in {time.perf_counter() - start:.2f}s{Style.RESET_ALL}")
+    if not len(ids):
+        print(f"{Fore.GREEN}No duplicate transactions found.{Style.RESET_ALL}")
+        return
+    print(f"{Fore.YELLOW}⚠️  Exact repeats of an earlier transaction: {len(ids):,}{Style.RESET_ALL}")
+    format_transaction_table(store._rows_by_id(ids[:limit]))
+
+
+REPORT_CHARTS = ("trends", "categories", "category_trends", "net_savings")
+REPORT_FORMATS = ("png", "svg")
+REPORT_MAX_POINTS = 120  # months are summed into wider bins beyond this many points per series
+REPORT_TOP_CATEGORIES = 8
+
+
+def _month_label(month):
+    return f"{month % 12 + 1:02d}-{month // 12}"
+
+
+def _parse_month(month_str):
+    """Return the month number of an mm-yyyy string."""
+    return CSV._month_number(datetime.strptime(month_str, "%m-%Y").date())
+
+
+def build_report_series(monthly_totals, start_month=None, end_month=None, max_points=REPORT_MAX_POINTS):
+    """Turn (month, category, subcategory, cents) rows into the small series each report chart plots.
+
+    Consecutive months are summed into equal bins so that no series has more
+    than `max_points` points, whatever the span of the ledger.
+    """
+    import numpy as np
+    rows = [row for row in monthly_totals
+            if (start_month is None or row[0] >= start_month) and (end_month is None or row[0] <= end_month)]
+    if not rows:
+        return {}
+    first = start_month if start_month is not None else min(row[0] for row in rows)
+    last = end_month if end_month is not None else max(row[0] for row in rows)
+    bin_months = -(-(last - first + 1) // max_points)
+    bins = (last - first) // bin_months + 1
+
+    income = np.zeros(bins, dtype=np.int64)
+    expense = np.zeros(bins, dtype=np.int64)
+    income_totals = {}
+    expense_series = {}
+    for month, category, subcategory, cents in rows:
+        slot = (month - first) // bin_months
+        if category == "Income":
+            income[slot] += cents
+            income_totals[subcategory] = income_totals.get(subcategory, 0) + cents
+        elif category == "Expense":
+            expense[slot] += cents
+            expense_series.setdefault(subcategory, np.zeros(bins, dtype=np.int64))[slot] += cents
+
+    ranked = sorted(expense_series, key=lambda name: -expense_series[name].sum())
+    stacked = {name: expense_series[name] for name in ranked[:REPORT_TOP_CATEGORIES]}
+    if len(ranked) > REPORT_TOP_CATEGORIES:
+        stacked["Other"] = sum(expense_series[name] for name in ranked[REPORT_TOP_CATEGORIES:])
+
+    common = {
+        "labels": [_month_label(first + slot * bin_months) for slot in range(bins)],
+        "period": f"{_month_label(first)} to {_month_label(last)}",
+        "bin_months": bin_months,
+    }
+    return {
+        "trends": dict(common, income=(income / 100).tolist(), expense=(expense / 100).tolist()),
+        "categories": dict(
+            common,
+            income={name: cents / 100 for name, cents in sorted(income_totals.items(), key=lambda item: -item[1])},
+            expense={name: int(expense_series[name].sum()) / 100 for name in ranked},
+        ),
+        "category_trends": dict(common, series={name: (values / 100).tolist() for name, values in stacked.items()}),
+        "net_savings": dict(common, net=(np.cumsum(income - expense) / 100).tolist()),
+    }
+
+
+def _render_chart(name, series, path, currency):
+    """Draw one report chart to `path` on the Agg backend; returns (name, path, seconds)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from matplotlib.ticker import FuncFormatter
+
+    start = time.perf_counter()
+    sns.set_theme(style="whitegrid")
+    # Whole currency units keep the axis labels short
+    symbol = currency["symbol"]
+    money = FuncFormatter(lambda value, _: f"{symbol}{value:,.0f}" if currency["position"] == "before"
+                          else f"{value:,.0f}{symbol}")
+    per = "Monthly" if series["bin_months"] == 1 else f"Per {series['bin_months']} months"
+    labels = series["labels"]
+    x = range(len(labels))
+
+    if name == "categories":
+        fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+        for ax, (title, totals, color) in zip(axes, (("Income", series["income"], "seagreen"),
+                                                     ("Expenses", series["expense"], "indianred"))):
+            if totals:
+                sns.barplot(x=list(totals.values()), y=list(totals), orient="h", color=color, ax=ax)
+            ax.set_title(f"{title} by category")
+            ax.xaxis.set_major_formatter(money)
+            ax.tick_params(axis="x", labelrotation=30)
+        fig.suptitle(series["period"])
+    else:
+        fig, ax = plt.subplots(figsize=(12, 5))
+        if name == "trends":
+            ax.plot(x, series["income"], color="seagreen", label="Income")
+            ax.plot(x, series["expense"], color="indianred", label="Expenses")
+            ax.set_title(f"{per} income and expenses, {series['period']}")
+            ax.legend()
+        elif name == "category_trends":
+            ax.stackplot(x, *series["series"].values(), labels=list(series["series"]))
+            ax.set_title(f"{per} expenses by category, {series['period']}")
+            ax.legend(loc="upper left", bbox_to_anchor=(1.01, 1), fontsize="small")
+        elif name == "net_savings":
+            net = series["net"]
+            ax.plot(x, net, color="steelblue")
+            ax.fill_between(x, net, 0, where=[value >= 0 for value in net], color="seagreen", alpha=0.3)
+            ax.fill_between(x, net, 0, where=[value < 0 for value in net], color="indianred", alpha=0.3)
+            ax.set_title(f"Cumulative net savings, {series['period']}")
+        step = max(1, len(labels) // 12)
+        ax.set_xticks(list(x)[::step], labels[::step], rotation=45, ha="right")
+        ax.yaxis.set_major_formatter(money)
+
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+    return name, path, time.perf_counter() - start
+
+
+def generate_report(output_dir="reports", file_format="png", start_month=None, end_month=None,
+                    workers=None, max_points=REPORT_MAX_POINTS):
+    """Render every report chart from the store's monthly totals, one chart per worker process.
+
+    Returns a list of (chart name, path, render seconds).
+    """
+    start = time.perf_counter()
+    store = get_store()
+    store.initialize_csv()
+    monthly_totals = store.get_monthly_totals()
+    series = build_report_series(monthly_totals, start_month, end_month, max_points)
+    if not series:
+        print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
+        return []
+    series_time = time.perf_counter() - start
+
+    os.makedirs(output_dir, exist_ok=True)
+    currency = load_config()["currency"]
+    jobs = [(name, series[name], os.path.join(output_dir, f"{name}.{file_format}"), currency)
+            for name in REPORT_CHARTS]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_render_chart, *zip(*jobs)))
+    else:
+        results = [_render_chart(*job) for job in jobs]
+
+    print(f"{Fore.CYAN}Series built from {len(monthly_totals):,} monthly buckets in "
+          f"{series_time * 1000:.1f}ms{Style.RESET_ALL}")
+    for name, path, seconds in results:
+        print(f"{Fore.GREEN}✓ {name:<16} {path:<40} {seconds * 1000:8.1f}ms{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Rendered {len(results)} charts with {workers} worker(s) in "
+          f"{time.perf_counter() - start:.2f}s{Style.RESET_ALL}")
+    return results
+
+
+class LedgerDaemon:
+    """Resident server that keeps the ledger in memory and answers queries from it.
+
+    Requests and responses are newline-delimited JSON objects with an "op" of
+    ping, query, summary, add or shutdown. The backing store is polled every
+    `poll_interval` seconds and rows appended by other processes are ingested
+    incrementally; writes go through validate_entry like `import` does.
+    """
+    COMPACT_MIN = 10000
+
+    def __init__(self, store=None, poll_interval=0.5):
+        self.store = store or get_store()
+        self.poll_interval = poll_interval
+        self.position = None
+        self.main = None
+        self.main_days = None
+        self.tail = []
+        self.tail_rows = 0
+        self.server = None
+        self.write_lock = None
+
+    def load(self):
+        """(Re)load the whole ledger, sorted by date."""
+        self.store.initialize_csv()
+        self.position = None
+        self.main = None
+        self.tail = []
+        self.tail_rows = 0
+        self.refresh()
+        self._compact()
+
+    def refresh(self):
+        """Ingest rows appended to the store since the last refresh; returns how many."""
+        df, position = self.store.read_appended(self.position)
+        if position is None:
+            self.load()
+            return len(self)
+        self.position = position
+        if df is None or df.empty:
+            return 0
+        self.tail.append(df)
+        self.tail_rows += len(df)
+        if self.main is None or self.tail_rows > max(self.COMPACT_MIN, len(self.main) // 8):
+            self._compact()
+        return len(df)
+
+    def _compact(self):
+        import numpy as np
+        import pandas as pd
+        frames = ([self.main] if self.main is not None else []) + self.tail
+        if not frames:
+            # Empty ledger: parse just the header to get correctly typed columns
+            frames = [CSV.read_ledger(io.BytesIO((",".join(CSV.COLUMNS) + "\n").encode()))]
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        for col in ("category", "subcategory"):
+            if not isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype("category")
+        df = CSV._apply_ledger_types(df, False)
+        self.main = df.sort_values("date", kind="stable", ignore_index=True)
+        self.main_days = self.main["date"].to_numpy().astype("datetime64[D]")
+        self.tail = []
+        self.tail_rows = 0
+
+    def __len__(self):
+        return (0 if self.main is None else len(self.main)) + self.tail_rows
+
+    def select(self, start_date, end_date):
+        """Rows dated within the range, in date order."""
+        import numpy as np
+        import pandas as pd
+        start = np.datetime64(datetime.strptime(start_date, CSV.FORMAT).date(), "D")
+        end = np.datetime64(datetime.strptime(end_date, CSV.FORMAT).date(), "D")
+        lo = np.searchsorted(self.main_days, start, side="left")
+        hi = np.searchsorted(self.main_days, end, side="right")
+        frames = [self.main.iloc[lo:hi]]
+        for df in self.tail:
+            days = df["date"].to_numpy().astype("datetime64[D]")
+            frames.append(df[(days >= start) & (days <= end)])
+        if len(frames) == 1:
+            return frames[0]
+        return pd.concat(frames, ignore_index=True).sort_values("date", kind="stable")
+
+    def summary(self, start_date, end_date):
+        """Totals per (category, subcategory) in the display currency, summed in cents to match CSV.get_summary."""
+        import numpy as np
+        import pandas as pd
+        df = self.select(start_date, end_date)
+        days = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64) + CSV.EPOCH_DAY
+        amounts = convert_amounts(df["amount"], df["currency"], days)
+        cents = pd.Series(np.round(amounts * 100).astype("int64"), index=df.index)
+        totals = cents.groupby([df["category"], df["subcategory"]], observed=True).sum() / 100
+        return [[category, subcategory, amount] for (category, subcategory), amount in totals.items()]
+
+    def write(self, rows):
+        """Validate rows as imports do and append the valid ones; returns (rows added, [[row number, error], ...])."""
+        entries = []
+        errors = []
+        for line_no, row in enumerate(rows, 1):
+            try:
+                entries.append(validate_entry(row))
+            except (ValueError, TypeError, AttributeError) as e:
+                errors.append([line_no, str(e)])
+        added = self.store.add_entries(entries) if entries else 0
+        return added, errors
+
+    def handle(self, request):
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "rows": len(self)}
+        if op in ("query", "summary"):
+            start_date = get_date(test_input=request.get("start", ""))
+            end_date = get_date(test_input=request.get("end", ""))
+            if op == "summary":
+                return {"ok": True, "totals": self.summary(start_date, end_date)}
+            df = self.select(start_date, end_date).copy()
+            df["date"] = df["date"].dt.strftime(CSV.FORMAT)
+            return {"ok": True, "rows": df.astype(object).where(df.notna(), None).to_dict("records")}
+        raise ValueError(f"Unknown op '{op}'")
+
+    async def _serve_client(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise ValueError("Requests must be JSON objects")
+                    if request.get("op") == "add":
+                        async with self.write_lock:
+                            # Disk writes run off the event loop; ingesting them back stays on it
+                            added, errors = await asyncio.get_running_loop().run_in_executor(
+                                None, self.write, request.get("entries", []))
+                            self.refresh()
+                        response = {"ok": True, "added": added, "errors": errors}
+                    elif request.get("op") == "shutdown":
+                        response = {"ok": True}
+                    else:
+                        response = self.handle(request)
+                except Exception as e:
+                    response = {"ok": False, "error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+                if response.get("ok") and request.get("op") == "shutdown":
+                    self.server.close()
+                    break
+        finally:
+            writer.close()
+
+    async def _watch(self):
+        import asyncio
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            async with self.write_lock:
+                self.refresh()
+
+    async def serve(self, socket_path=None, port=None):
+        """Load the ledger and serve until a shutdown request arrives."""
+        import asyncio
+        self.write_lock = asyncio.Lock()
+        self.load()
+        if port is not None:
+            self.server = await asyncio.start_server(self._serve_client, "127.0.0.1", port)
+        else:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            self.server = await asyncio.start_unix_server(self._serve_client, socket_path)
+        watcher = asyncio.ensure_future(self._watch())
+        try:
+            async with self.server:
+                try:
+                    await self.server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            watcher.cancel()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+def default_socket_path():
+    return CSV.CSV_FILE + ".sock"
+
+
+def run_daemon(socket_path=None, port=None, poll_interval=0.5):
+    import asyncio
+    if port is None and not hasattr(socket, "AF_UNIX"):
+        port = DAEMON_PORT
+    socket_path = socket_path or default_socket_path()
+    daemon = LedgerDaemon(poll_interval=poll_interval)
+    where = f"127.0.0.1:{port}" if port is not None else socket_path
+    print(f"{Fore.GREEN}Serving {CSV.CSV_FILE if daemon.store is CSV else daemon.store.DATA_DIR} on {where}{Style.RESET_ALL}")
+    asyncio.run(daemon.serve(socket_path if port is None else None, port))
+
+
+def daemon_request(request, socket_path=None, port=None, timeout=30):
+    """Send one request to a running daemon and return its decoded response."""
+    if port is None and hasattr(socket, "AF_UNIX"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_path or default_socket_path()
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", port or DAEMON_PORT)
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        with sock.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode() + b"\n")
+            stream.flush()
+            return json.loads(stream.readline())
+
+
+def run_client(args):
+    """Thin client: forward one command to the daemon and print the answer."""
+    request = {"op": args.op}
+    if args.op in ("query", "summary"):
+        request.update(start=args.start_date, end=args.end_date)
+    elif args.op == "add":
+        source = args.file
+        request["entries"] = [row for _, row in read_import_rows(source)] if source else [json.loads(sys.stdin.read())]
+    try:
+        response = daemon_request(request, args.socket, args.port)
+    except OSError as e:
+        print(f"{Fore.RED}Could not reach the daemon: {e}{Style.RESET_ALL}")
+        return
+    if not response.get("ok"):
+        print(f"{Fore.RED}Error: {response.get('error')}{Style.RESET_ALL}")
+    elif args.op == "summary" and not args.json:
+        format_summary({(category, subcategory): amount for category, subcategory, amount in response["totals"]})
+    else:
+        print(json.dumps(response))
+
+
+def add():
+    store = get_store()
+    store.initialize_csv()
+    date = get_date(
+        "Enter the date of the transaction (dd-mm-yyyy) or enter for today's date: ",
+        allow_default=True,
+    )
+    amount = get_amount()
+    category_type, subcategory = get_category()
+    description = get_description()
+    # Amounts are typed in the display currency; record it when it isn't the ledger's own
+    code = load_config()["currency"]["code"]
+    store.add_entry(date, amount, category_type, subcategory, description,
+                    code if code != ledger_currency() else "")
+
+
+def format_amounts(amounts, currency):
+    """format_amount for a whole column, with the currency looked up once rather than per row."""
+    symbol = currency["symbol"]
+    if currency["position"] == "before":
+        return [f"{symbol}{amount:,.2f}" for amount in amounts]
+    return [f"{amount:,.2f}{symbol}" for amount in amounts]
+
+
+def format_transaction_table(df, limit=None, page_size=10000, out=None, totals=None, count=None):
+    """Format the transaction table with colors and alignment
+
+    `df` is either a DataFrame or an iterable of date-sorted DataFrame chunks
+    (see CSV.iter_transactions). Each chunk is written with a single write and
+    only its per-subcategory totals are kept, so huge ranges render in constant
+    memory. At most `limit` transactions are listed; summaries cover all rows.
+    Pass precomputed `totals` (see CSV.get_summary) to skip the groupby, and
+    the range's row `count` (see CSV.count_transactions) as well to stop
+    reading chunks once `limit` rows are listed.
+    """
+    import numpy as np
+    import pandas as pd
+    out = out or sys.stdout
+    if isinstance(df, pd.DataFrame):
+        # Convert date to datetime for proper sorting
+        df = df.assign(date=pd.to_datetime(df['date'], format='%d-%m-%Y')).sort_values('date', kind='stable')
+        chunks = (df.iloc[start:start + page_size] for start in range(0, len(df), page_size))
+        count = len(df)
+    else:
+        chunks = df
+
+    config = load_config()
+    currency = config["currency"]
+    border = f"{Fore.BLUE}║{Style.RESET_ALL}"
+    income_color, expense_color, reset = Fore.GREEN, Fore.RED, Style.RESET_ALL
+
+    # Print transaction table header with blue borders
+    out.write(
+        f"\n{Fore.BLUE}╔{'═' * 86}╗{Style.RESET_ALL}\n"
+        f"{Fore.BLUE}║{Fore.WHITE}{'Transaction History':^86}{Fore.BLUE}║{Style.RESET_ALL}\n"
+        f"{Fore.BLUE}╠{'═' * 12}╦{'═' * 14}╦{'═' * 12}╦{'═' * 15}╦{'═' * 30}╣{Style.RESET_ALL}\n"
+        f"{Fore.BLUE}║{Fore.WHITE}{'Date':^12}{Fore.BLUE}║{Fore.WHITE}{'Amount':^14}{Fore.BLUE}║{Fore.WHITE}{'Category':^12}{Fore.BLUE}║{Fore.WHITE}{'Subcategory':^15}{Fore.BLUE}║{Fore.WHITE}{'Description':^30}{Fore.BLUE}║{Style.RESET_ALL}\n"
+        f"{Fore.BLUE}╠{'═' * 12}╬{'═' * 14}╬{'═' * 12}╬{'═' * 15}╬{'═' * 30}╣{Style.RESET_ALL}\n"
+    )
+
+    # Print transactions chunk by chunk, accumulating subcategory totals
+    accumulate = totals is None
+    shown = 0
+    hidden = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if "currency" in chunk:
+            with profile_stage("render.convert"):
+                chunk = convert_frame(chunk, currency["code"])
+        if accumulate:
+            with profile_stage("render.totals"):
+                chunk_totals = chunk.groupby(['category', 'subcategory'], observed=True)['amount'].sum()
+                totals = chunk_totals if totals is None else totals.add(chunk_totals, fill_value=0)
+
+        visible = chunk if limit is None else chunk.iloc[:max(limit - shown, 0)]
+        hidden += len(chunk) - len(visible)
+        if visible.empty:
+            continue
+        shown += len(visible)
+        profile_count("rows.rendered", len(visible))
+        with profile_stage("render.rows"):
+            dates = visible['date'].dt.strftime('%d-%m-%Y')
+            amounts = format_amounts(visible['amount'], currency)
+            colors = np.where(visible['category'] == 'Income', income_color, expense_color)
+            out.write("".join(
+                f"{border}{date_str:^12}{border}{color}{amount_str:>14}{reset}{border}"
+                f"{color}{category:^12}{reset}{border}{subcategory:^15}{border}{description:<30}{border}\n"
+                for date_str, amount_str, color, category, subcategory, description in zip(
+                    dates, amounts, colors, visible['category'], visible['subcategory'], visible['description'])
+            ))
+        if not accumulate and count is not None and shown == limit:
+            break  # the rest would only add to `hidden`, which the count already gives
+
+    if count is not None:
+        hidden = count - shown
+    footer = f"{Fore.BLUE}╚{'═' * 12}╩{'═' * 14}╩{'═' * 12}╩{'═' * 15}╩{'═' * 30}╝{Style.RESET_ALL}\n\n"
+    if hidden:
+        footer += f"{Fore.YELLOW}... {hidden} more transactions not shown (summaries include them){Style.RESET_ALL}\n\n"
+    out.write(footer)
+    format_summary(totals, currency, out)
+
+
+def format_summary(totals, currency=None, out=None):
+    """Print the category and financial summaries from per-(category, subcategory) totals.
+
+    `totals` may be a Series indexed by (category, subcategory) or a plain dict
+    with the same keys, so callers without pandas can use it too.
+    """
+    out = out or sys.stdout
+    currency = currency or load_config()["currency"]
+    totals = {} if totals is None else totals
+
+    # Category Summary with magenta borders, category totals from the same grouped totals
+    amounts_by_category = {}
+    for (category, _), amount in totals.items():
+        amounts_by_category.setdefault(category, []).append(amount)
+    cat_totals = {category: math.fsum(amounts) for category, amounts in amounts_by_category.items()}
+    summary = [
+        f"{Fore.MAGENTA}╔{'═' * 50}╗{Style.RESET_ALL}\n",
+        f"{Fore.MAGENTA}║{Fore.WHITE}{'Category Summary':^50}{Fore.MAGENTA}║{Style.RESET_ALL}\n",
+        f"{Fore.MAGENTA}╠{'═' * 25}╦{'═' * 24}╣{Style.RESET_ALL}\n",
+        f"{Fore.MAGENTA}║{Fore.WHITE}{'Category/Subcategory':^25}{Fore.MAGENTA}║{Fore.WHITE}{'Amount':^24}{Fore.MAGENTA}║{Style.RESET_ALL}\n",
+        f"{Fore.MAGENTA}╠{'═' * 25}╬{'═' * 24}╣{Style.RESET_ALL}\n",
+    ]
+    current_category = None
+    for (category, subcategory), amount in totals.items():
+        if current_category != category:
+            if current_category is not None:
+                summary.append(f"{Fore.MAGENTA}╟{'─' * 25}╫{'─' * 24}╢{Style.RESET_ALL}\n")
+            current_category = category
+            category_color = Fore.GREEN if category == 'Income' else Fore.RED
+            summary.append(f"{Fore.MAGENTA}║{category_color}{category:^25}{Fore.MAGENTA}║{category_color}{format_amount(cat_totals[category], currency):>24}{Style.RESET_ALL}{Fore.MAGENTA}║{Style.RESET_ALL}\n")
+        summary.append(f"{Fore.MAGENTA}║{Style.RESET_ALL} - {subcategory:<22}{Fore.MAGENTA}║{Style.RESET_ALL}{format_amount(amount, currency):>24}{Fore.MAGENTA}║{Style.RESET_ALL}\n")
+    summary.append(f"{Fore.MAGENTA}╚{'═' * 25}╩{'═' * 24}╝{Style.RESET_ALL}\n\n")
+
+    # Financial Summary with cyan borders
+    total_income = cat_totals.get('Income', 0.0)
+    total_expense = cat_totals.get('Expense', 0.0)
+    net_savings = total_income - total_expense
+    savings_color = Fore.GREEN if net_savings >= 0 else Fore.RED
+    summary += [
+        f"{Fore.CYAN}╔{'═' * 45}╗{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}║{Fore.WHITE}{'Financial Summary':^45}{Fore.CYAN}║{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}╠{'═' * 45}╣{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}║{Style.RESET_ALL} {'Total Income:':<25} {Fore.GREEN}{format_amount(total_income, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}║{Style.RESET_ALL} {'Total Expenses:':<25} {Fore.RED}{format_amount(total_expense, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}╟{'─' * 45}╢{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}║{Style.RESET_ALL} {'Net Savings:':<25} {savings_color}{format_amount(net_savings, currency):>17}{Style.RESET_ALL} {Fore.CYAN}║{Style.RESET_ALL}\n",
+        f"{Fore.CYAN}╚{'═' * 45}╝{Style.RESET_ALL}\n",
+    ]
+    out.write("".join(summary))
+    out.flush()
+
+
+def display_menu():
+    print(f"\n{Fore.CYAN}╔══════════════════════════════════╗{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║     Personal Finance Manager     ║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}╠══════════════════════════════════╣{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 1. {Fore.YELLOW}📝 Add a new transaction{Style.RESET_ALL}      {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 2. {Fore.YELLOW}📊 View transactions summary{Style.RESET_ALL}  {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 3. {Fore.YELLOW}🚪 Exit{Style.RESET_ALL}                       {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}╚══════════════════════════════════╝{Style.RESET_ALL}")
+
+def display_menu():
+    print(f"\n{Fore.CYAN}╔══════════════════════════════════╗{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║     Personal Finance Manager     ║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}╠══════════════════════════════════╣{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 1. {Fore.YELLOW}📝 Add a new transaction{Style.RESET_ALL}      {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 2. {Fore.YELLOW}📊 View transactions & summary{Style.RESET_ALL}{Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 3. {Fore.YELLOW}💰 Manage categories{Style.RESET_ALL}          {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 4. {Fore.YELLOW}💱 Change currency{Style.RESET_ALL}            {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 5. {Fore.YELLOW}📤 Export data{Style.RESET_ALL}                {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}║{Style.RESET_ALL} 6. {Fore.YELLOW}🚪 Exit{Style.RESET_ALL}                       {Fore.CYAN}║{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}╚══════════════════════════════════╝{Style.RESET_ALL}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Personal Finance Manager")
+    parser.add_argument("--rebuild-aggregates", action="store_true",
+                        help="Recompute the summary aggregates of the configured storage backend and exit")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a breakdown of time per stage, rows scanned/returned and bytes read")
+    parser.add_argument("--profile-json", metavar="FILE", help="Write the profile metrics to FILE as JSON (implies --profile)")
+    parser.add_argument("--profile-capture", choices=PROFILE_CAPTURES,
+                        help="Also capture the top functions (cprofile) or allocation sites (tracemalloc)")
+    subparsers = parser.add_subparsers(dest="command")
+
+    import_parser = subparsers.add_parser("import", help="Bulk import transactions from a CSV or JSONL file")
+    import_parser.add_argument("file", help="Source file with date, amount, category, subcategory, description")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"], help="Source format (default: from extension)")
+    import_parser.add_argument("--on-duplicate", choices=DUPLICATE_POLICIES,
+                               help="Skip, warn about or force rows matching existing ones (default: from config)")
+    import_parser.add_argument("--fuzzy", action=argparse.BooleanOptionalAction,
+                               help="Also match rows with small date or amount drift (default: from config)")
+
+    view_parser = subparsers.add_parser("view", help="Show transactions and summaries for a date range")
+    view_parser.add_argument("start_date", help="Start date (dd-mm-yyyy)")
+    view_parser.add_argument("end_date", help="End date (dd-mm-yyyy)")
+    view_parser.add_argument("--limit", type=int, help="List at most this many transactions")
+    view_parser.add_argument("--page-size", type=int, default=10000,
+                             help="Rows read and rendered per chunk (default: 10000)")
+
+    summary_parser = subparsers.add_parser("summary", help="Show category and financial summaries for a date range")
+    summary_parser.add_argument("start_date", help="Start date (dd-mm-yyyy)")
+    summary_parser.add_argument("end_date", help="End date (dd-mm-yyyy)")
+    summary_parser.add_argument("--workers", type=int,
+                                help="Processes summing shards in parallel with sharded storage (default: one per CPU)")
+
+    export_parser = subparsers.add_parser("export", help="Export the ledger in streamed chunks")
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv", help="Output format (default: csv)")
+    export_parser.add_argument("--output", help="Output file (default: finance_export.<format>)")
+    export_parser.add_argument("--start-date", help="Only export rows on or after this date (dd-mm-yyyy)")
+    export_parser.add_argument("--end-date", help="Only export rows on or before this date (dd-mm-yyyy)")
+    export_parser.add_argument("--columns", help="Comma-separated subset of columns to export")
+    export_parser.add_argument("--chunksize", type=int, default=50000, help="Rows per chunk (default: 50000)")
+
+    migrate_parser = subparsers.add_parser("migrate", help="Copy the ledger into another storage backend and switch to it")
+    migrate_parser.add_argument("--to", choices=list(STORAGE_BACKENDS), default="columnar",
+                                help="Target backend (default: columnar)")
+
+    split_parser = subparsers.add_parser("split", help="Split finance_data.csv into per-year or per-month shards and switch to them")
+    split_parser.add_argument("--period", choices=SHARD_PERIODS, default="year", help="Shard period (default: year)")
+
+    serve_parser = subparsers.add_parser("serve", help="Run a resident query daemon that keeps the ledger in memory")
+    serve_parser.add_argument("--socket", help="Unix socket path (default: <data file>.sock)")
+    serve_parser.add_argument("--port", type=int, help="Listen on this localhost TCP port instead of a Unix socket")
+    serve_parser.add_argument("--poll-interval", type=float, default=0.5,
+                              help="Seconds between checks for rows appended by other processes (default: 0.5)")
+
+    client_parser = subparsers.add_parser("client", help="Send a request to a running daemon")
+    client_parser.add_argument("op", choices=["ping", "query", "summary", "add", "shutdown"])
+    client_parser.add_argument("start_date", nargs="?", help="Start date for query/summary (dd-mm-yyyy)")
+    client_parser.add_argument("end_date", nargs="?", help="End date for query/summary (dd-mm-yyyy)")
+    client_parser.add_argument("--file", help="CSV or JSONL file of entries for add (default: one JSON entry on stdin)")
+    client_parser.add_argument("--socket", help="Unix socket path (default: <data file>.sock)")
+    client_parser.add_argument("--port", type=int, help="Connect to this localhost TCP port instead")
+    client_parser.add_argument("--json", action="store_true", help="Print the raw JSON response")
+
+    budgets_parser = subparsers.add_parser("budgets", help="Show or set monthly and yearly spending budgets")
+    budgets_parser.add_argument("--month", help="Month to report on (mm-yyyy, default: this month)")
+    budgets_parser.add_argument("--set", metavar="CATEGORY", help="Expense category whose budget to set")
+    budgets_parser.add_argument("--monthly", type=float, help="Monthly limit for --set (0 clears it)")
+    budgets_parser.add_argument("--yearly", type=float, help="Yearly limit for --set (0 clears it)")
+    budgets_parser.add_argument("--rebuild", action="store_true",
+                                help="Recompute the spend counters from the ledger")
+
+    report_parser = subparsers.add_parser("report", help="Render income/expense charts to image files")
+    report_parser.add_argument("--output-dir", default="reports", help="Directory for the charts (default: reports)")
+    report_parser.add_argument("--format", choices=REPORT_FORMATS, default="png", help="Image format (default: png)")
+    report_parser.add_argument("--start", help="First month to chart (mm-yyyy, default: first in the ledger)")
+    report_parser.add_argument("--end", help="Last month to chart (mm-yyyy, default: last in the ledger)")
+    report_parser.add_argument("--workers", type=int, help="Charts rendered in parallel (default: one per CPU)")
+    report_parser.add_argument("--max-points", type=int, default=REPORT_MAX_POINTS,
+                               help=f"Most points per series; months are binned beyond this (default: {REPORT_MAX_POINTS})")
+
+    search_parser = subparsers.add_parser("search", help="Find transactions by description words, category and amount")
+    search_parser.add_argument("words", nargs="*", help="Words that must all appear in the description")
+    search_parser.add_argument("--category", help="Only this category (Income or Expense)")
+    search_parser.add_argument("--subcategory", help="Only this subcategory")
+    search_parser.add_argument("--year", type=int, help="Only transactions in this year")
+    search_parser.add_argument("--start-date", help="Only transactions on or after this date (dd-mm-yyyy)")
+    search_parser.add_argument("--end-date", help="Only transactions on or before this date (dd-mm-yyyy)")
+    search_parser.add_argument("--min-amount", type=float, help="Smallest amount to match")
+    search_parser.add_argument("--max-amount", type=float, help="Largest amount to match")
+    search_parser.add_argument("--limit", type=int, default=50, help="List at most this many matches (default: 50)")
+    search_parser.add_argument("--rebuild", action="store_true", help="Rebuild the search index from the ledger first")
+
+    dedupe_parser = subparsers.add_parser("dedupe", help="Build the duplicate index and list repeated transactions")
+    dedupe_parser.add_argument("--limit", type=int, default=20, help="List at most this many duplicates (default: 20)")
+    dedupe_parser.add_argument("--policy", choices=DUPLICATE_POLICIES, help="Set the default policy for new entries")
+    dedupe_parser.add_argument("--fuzzy", action=argparse.BooleanOptionalAction,
+                               help="Set whether new entries are also matched with small date or amount drift")
+    dedupe_parser.add_argument("--fuzzy-days", type=int, help="Set the date drift allowed when fuzzy")
+    dedupe_parser.add_argument("--fuzzy-amount", type=float,
+                               help="Set the amount drift allowed when fuzzy, as a fraction (0.02 = 2%%)")
+
+    subparsers.add_parser("stats", help="Show the ledger's row count and in-memory footprint")
+
+    return parser
+
+
+def show_stats():
+    """Load the whole ledger with typed columns and report the memory saved."""
+    store = get_store()
+    store.initialize_csv()
+    df = store.read_ledger()
+    typed, untyped = CSV.memory_usage(df)
+    saved = 1 - typed / untyped if untyped else 0.0
+    print(f"{Fore.CYAN}Transactions: {len(df):,}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}In memory: {typed / 2**20:.2f} MiB typed vs {untyped / 2**20:.2f} MiB as untyped strings "
+          f"({saved:.0%} saved){Style.RESET_ALL}")
+
+
+def view_transactions(start_date, end_date, limit=None, page_size=10000):
+    """Stream a date range through format_transaction_table in page-sized chunks."""
+    start_date = get_date(test_input=start_date)
+    end_date = get_date(test_input=end_date)
+    store = get_store()
+    store.initialize_csv()
+    chunks = store.iter_transactions(start_date, end_date, chunksize=page_size)
+    first = next(chunks, None)
+    if first is None:
+        print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
+        return
+    try:
+        totals = store.get_summary(start_date, end_date)
+        count = store.count_transactions(start_date, end_date)
+        format_transaction_table(itertools.chain([first], chunks), limit=limit, totals=totals, count=count)
+    except ValueError as e:  # missing exchange rates
+        print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+
+
+def view_summary(start_date, end_date):
+    """Print summaries for a date range straight from the aggregates, without reading rows."""
+    start_date = get_date(test_input=start_date)
+    end_date = get_date(test_input=end_date)
+    store = get_store()
+    store.initialize_csv()
+    try:
+        totals = store.get_summary(start_date, end_date)
+    except ValueError as e:  # missing exchange rates
+        print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+        return
+    if totals.empty:
+        print(f"{Fore.YELLOW}⚠️  No transactions found in the given date range.{Style.RESET_ALL}")
+        return
+    format_summary(totals)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.profile or args.profile_json or args.profile_capture):
+        run_command(args)
+        return
+    with profiling(args.profile_capture) as metrics:
+        run_command(args)
+    metrics["command"] = args.command or "menu"
+    print_profile(metrics)
+    if args.profile_json:
+        with open(args.profile_json, "w") as f:
+            json.dump(metrics, f, indent=2)
+        print(f"{Fore.GREEN}✓ Profile metrics written to {args.profile_json}{Style.RESET_ALL}")
+
+
+def run_command(args):
+    """Run the subcommand in `args`, or the interactive menu when there is none."""
+    # Initialize config if it doesn't exist
+    if not os.path.exists(CONFIG_FILE):
+        save_config(copy.deepcopy(DEFAULT_CONFIG))
+
+    if args.rebuild_aggregates:
+        store = get_store()
+        if not hasattr(store, "rebuild_aggregates"):
+            print(f"{Fore.RED}The {load_config().get('storage')} backend computes summaries from its columns "
+                  f"and keeps no aggregates to rebuild.{Style.RESET_ALL}")
+            return
+        store.initialize_csv()
+        store.rebuild_aggregates()
+        print(f"{Fore.GREEN}✓ Aggregates rebuilt from {getattr(store, 'CSV_FILE', store.DATA_DIR)}{Style.RESET_ALL}")
+        return
+    if args.command == "import":
+        import_transactions(args.file, args.format, args.on_duplicate, args.fuzzy)
+        return
+    if args.command == "view":
+        view_transactions(args.start_date, args.end_date, args.limit, args.page_size)
+        return
+    if args.command == "summary":
+        if args.workers:
+            ShardedStore.WORKERS = args.workers
+        view_summary(args.start_date, args.end_date)
+        return
+    if args.command == "split":
+        split_ledger(args.period)
+        return
+    if args.command == "serve":
+        run_daemon(args.socket, args.port, args.poll_interval)
+        return
+    if args.command == "client":
+        run_client(args)
+        return
+    if args.command == "budgets":
+        if args.rebuild:
+            store = get_store()
+            store.initialize_csv()
+            rebuild_budget_counters(store)
+            print(f"{Fore.GREEN}✓ Budget counters rebuilt{Style.RESET_ALL}")
+        if args.set:
+            set_budget(args.set, args.monthly, args.yearly)
+        try:
+            view_budgets(args.month)
+        except ValueError:
+            print(f"{Fore.RED}Invalid month. Please use mm-yyyy format{Style.RESET_ALL}")
+        return
+    if args.command == "report":
+        try:
+            start_month = _parse_month(args.start) if args.start else None
+            end_month = _parse_month(args.end) if args.end else None
+        except ValueError:
+            print(f"{Fore.RED}Invalid month. Please use mm-yyyy format{Style.RESET_ALL}")
+            return
+        try:
+            generate_report(args.output_dir, args.format, start_month, end_month, args.workers, args.max_points)
+        except ValueError as e:
+            print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+        return
+    if args.command == "search":
+        if args.rebuild:
+            store = get_store()
+            store.initialize_csv()
+            rebuild_search_index(store)
+            print(f"{Fore.GREEN}✓ Search index rebuilt{Style.RESET_ALL}")
+        try:
+            start_date = get_date(test_input=args.start_date) if args.start_date else None
+            end_date = get_date(test_input=args.end_date) if args.end_date else None
+        except ValueError as e:
+            print(f"{Fore.RED}{e}{Style.RESET_ALL}")
+            return
+        if args.rebuild and not (args.words or args.category or args.subcategory or args.year or start_date
+                                 or end_date or args.min_amount is not None or args.max_amount is not None):
+            return
+        view_search(args.words, category=args.category, subcategory=args.subcategory, year=args.year,
+                    start_date=start_date, end_date=end_date, min_amount=args.min_amount,
+                    max_amount=args.max_amount, limit=args.limit)
+        return
+    if args.command == "dedupe":
+        settings = (args.policy, args.fuzzy, args.fuzzy_days, args.fuzzy_amount)
+        if any(value is not None for value in settings) and not set_duplicate_policy(*settings):
+            return
+        view_duplicates(args.limit)
+        return
+    if args.command == "stats":
+        show_stats()
+        return
+    if args.command == "migrate":
+        migrate_storage(args.to)
+        return
+    if args.command == "export":
+        get_store().initialize_csv()
+        start_date = get_date(test_input=args.start_date) if args.start_date else None
+        end_date = get_date(test_input=args.end_date) if args.end_date else None
+        columns = [col.strip() for col in args.columns.split(",")] if args.columns else None
+        try:
+            print_export_stats(export_ledger(args.format, args.output, start_date, end_date, columns, args.chunksize))
+        except Exception as e:
+            print(f"{Fore.RED}Error exporting data: {str(e)}{Style.RESET_ALL}")
+        return
+
+    while True:
+        display_menu()
+        choice = input(f"{Fore.GREEN}Enter your choice (1-6): {Style.RESET_ALL}")
+
+        if choice == "1":
+            add()
+        elif choice == "2":
+            start_date = get_date("Enter the start date (dd-mm-yyyy): ")
+            end_date = get_date("Enter the end date (dd-mm-yyyy): ")
+            store = get_store()
+            store.initialize_csv()
+            df = store.get_transactions(start_date, end_date)
+            if not df.empty:
+                try:
+                    format_transaction_table(df, totals=store.get_summary(start_date, end_date))
+                except ValueError as e:
+                    print(f"{Fore.RED}{e}{Style.RESET_ALL}")
         elif choice == "3":
             manage_categories()
         elif choice == "4":
@@ -1,6 +1,25 @@
 import pytest
 import pandas as pd
-from project import get_amount, get_date, CSV
+import glob
+import io
+import json
+import multiprocessing
+import os
+import random
+import zlib
+import shutil
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from datetime import date, timedelta
+import benchmark
+import project
+from project import DuplicateCheck, ShardedStore, profiling, search_transactions, get_amount, get_date, CSV, ColumnarStore, LedgerWriter, LedgerDaemon, daemon_request, budget_spend, rebuild_budget_counters, set_budget, build_report_series, generate_report, convert_amounts, load_config, save_config, has_category, import_transactions, format_transaction_table, export_ledger
+
+# Import-time budget for `import project` without pandas/numpy (python -X importtime)
+STARTUP_BUDGET_MS = 250
 
 @pytest.fixture
 def test_csv():
@@ -9,9 +28,31 @@ def test_csv():
     CSV.CSV_FILE = test_file
     CSV.initialize_csv()
     yield test_file
-    import os
-    if os.path.exists(test_file):
-        os.remove(test_file)
+    for path in glob.glob(test_file + "*"):
+        os.remove(path)
+
+@pytest.fixture
+def test_config(tmp_path, monkeypatch):
+    """Fixture pointing the config at a temporary copy of test_finance_config.json"""
+    config_file = str(tmp_path / "finance_config.json")
+    shutil.copy("test_finance_config.json", config_file)
+    monkeypatch.setattr(project, "CONFIG_FILE", config_file)
+    yield config_file
+
+@pytest.fixture
+def test_columnar(tmp_path, monkeypatch):
+    """Fixture pointing the columnar store at a temporary directory"""
+    monkeypatch.setattr(ColumnarStore, "DATA_DIR", str(tmp_path / "ledger.cols"))
+    ColumnarStore.initialize_csv()
+    yield ColumnarStore.DATA_DIR
+
+@pytest.fixture
+def test_sharded(tmp_path, monkeypatch):
+    """Fixture pointing the sharded store at a temporary directory, with monthly shards"""
+    monkeypatch.setattr(ShardedStore, "DATA_DIR", str(tmp_path / "ledger.shards"))
+    monkeypatch.setattr(ShardedStore, "PERIOD", "month")
+    ShardedStore.initialize_csv()
+    yield ShardedStore.DATA_DIR
 
 def test_amount_validation():
     """Test amount validation with valid and invalid inputs"""
@@ -26,6 +67,9 @@ def test_amount_validation():
     with pytest.raises(ValueError):
         get_amount(test_input="abc")  # Non-numeric input
 
+    with pytest.raises(ValueError):
+        get_amount(test_input="nan")  # float() accepts it, but it is not an amount
+
 def test_date_validation():
     """Test date input validation"""
     # Test valid dates
@@ -59,3 +103,855 @@ def test_basic_transaction(test_csv):
     assert transaction["category"] == "Income"
     assert transaction["subcategory"] == "Salary"
     assert transaction["description"] == "Test salary"
+
+def test_indexed_range_query(test_csv):
+    """Test that indexed range queries match the full scan"""
+    entries = [
+        ("05-03-2025", 40.00, "Expense", "Food", "Lunch"),
+        ("10-01-2025", 3000.00, "Income", "Salary", "January Salary"),
+        ("20-02-2025", 900.00, "Expense", "Housing", "Rent"),
+        ("10-01-2025", 15.50, "Expense", "Transportation", "Bus"),
+    ]
+    for entry in entries:
+        CSV.add_entry(*entry)
+
+    df = CSV.get_transactions("01-01-2025", "28-02-2025")
+    expected = CSV._scan_transactions("01-01-2025", "28-02-2025")
+    assert list(df["description"]) == list(expected["description"])
+    assert list(df["description"]) == ["January Salary", "Rent", "Bus"]
+
+    # Rows added after the index was built are still found
+    CSV.add_entry("15-02-2025", 60.00, "Expense", "Food", "Dinner")
+    df = CSV.get_transactions("15-02-2025", "15-02-2025")
+    assert list(df["description"]) == ["Dinner"]
+
+def test_index_rebuilds_after_manual_edit(test_csv):
+    """Test that a stale index is rebuilt when the CSV is edited by hand"""
+    CSV.add_entry("10-01-2025", 3000.00, "Income", "Salary", "Salary")
+    CSV.get_transactions("01-01-2025", "31-01-2025")
+    with open(test_csv, "a", newline="") as f:
+        f.write("12-01-2025,25.00,Expense,Food,Added by hand\r\n")
+
+    df = CSV.get_transactions("11-01-2025", "31-01-2025")
+    assert list(df["description"]) == ["Added by hand"]
+
+def test_multiline_description(test_csv):
+    """Test that a quoted description spanning lines is read back whole, before and after an index rebuild"""
+    CSV.add_entry("01-03-2025", 12.00, "Expense", "Food", "line one\nline two")
+    with open(test_csv, "a", newline="") as f:  # a hand-edited row with an embedded newline and quotes
+        f.write('02-03-2025,8.00,Expense,Food,"say ""hi""\r\nthere",\r\n')
+    CSV.add_entry("03-03-2025", 5.00, "Expense", "Food", "Tea")
+    for rebuild in (False, True):
+        if rebuild:
+            CSV.rebuild_index()
+        df = CSV.get_transactions("01-03-2025", "31-03-2025")
+        assert list(df["description"]) == ["line one\nline two", 'say "hi"\r\nthere', "Tea"]
+        assert list(CSV.get_transactions("02-03-2025", "03-03-2025")["amount"]) == [8.00, 5.00]
+    rows, position = CSV.read_appended()
+    assert len(rows) == 3 and position == os.path.getsize(test_csv)
+
+def test_config_cache(test_config):
+    """Test that the config is cached and reloaded when the file changes"""
+    config = load_config()
+    assert load_config() is config
+    assert has_category("Expense", "Transport")
+    assert not has_category("Expense", "Salary")
+
+    # Saves are written through to the cache
+    config["categories"]["Expense"].append("Rent")
+    save_config(config)
+    assert has_category("Expense", "Rent")
+    assert not os.path.exists(test_config + ".tmp")
+
+    # External edits are picked up on the next load
+    with open(test_config, "w") as f:
+        f.write('{"currency": {"symbol": "$", "code": "USD", "position": "before"}, '
+                '"categories": {"Income": ["Bonus"], "Expense": []}}')
+    os.utime(test_config, ns=(0, 0))
+    assert load_config()["categories"]["Income"] == ["Bonus"]
+    assert has_category("Income", "Bonus")
+
+def test_bulk_import(test_csv, test_config, tmp_path):
+    """Test bulk import validates rows and collects errors instead of prompting"""
+    source = tmp_path / "feed.jsonl"
+    source.write_text(
+        '{"date": "01-02-2025", "amount": 2500, "category": "Income", "subcategory": "Salary", "description": "Pay"}\n'
+        '{"date": "2025-02-02", "amount": 10, "category": "Expense", "subcategory": "Food", "description": "Bad date"}\n'
+        '{"date": "03-02-2025", "amount": 0, "category": "Expense", "subcategory": "Food", "description": "Zero"}\n'
+        '{"date": "04-02-2025", "amount": 12.5, "category": "Expense", "subcategory": "Rent", "description": "Unknown"}\n'
+        '{"date": "05-02-2025", "amount": "12.5", "category": "expense", "subcategory": "Food", "description": "Snacks"}\n'
+    )
+    imported, errors = import_transactions(str(source))
+    assert imported == 2
+    assert [line_no for line_no, _ in errors] == [2, 3, 4]
+
+    df = CSV.get_transactions("01-02-2025", "28-02-2025")
+    assert list(df["description"]) == ["Pay", "Snacks"]
+    assert list(df["amount"]) == [2500.0, 12.5]
+
+def test_import_rejects_non_finite_amounts(test_csv, test_config, tmp_path):
+    """Test nan and infinite amounts are rejected instead of poisoning totals"""
+    source = tmp_path / "feed.csv"
+    source.write_text(
+        "date,amount,category,subcategory,description\n"
+        "01-03-2025,nan,Expense,Food,Not a number\n"
+        "02-03-2025,inf,Income,Salary,Infinite\n"
+        "03-03-2025,-inf,Expense,Food,Negative infinite\n"
+        "04-03-2025,1e400,Expense,Food,Overflows\n"
+        "05-03-2025,7.25,Expense,Food,Lunch\n"
+    )
+    imported, errors = import_transactions(str(source))
+    assert imported == 1
+    assert [line_no for line_no, _ in errors] == [2, 3, 4, 5]
+    assert all("finite" in str(error) for _, error in errors)
+    assert list(CSV.get_summary("01-03-2025", "31-03-2025").items()) == [(("Expense", "Food"), 7.25)]
+
+def test_streamed_table_limit(test_csv, test_config):
+    """Test chunked rendering lists at most `limit` rows but summarizes all of them"""
+    CSV.add_entry("03-01-2025", 100.00, "Expense", "Food", "Groceries")
+    CSV.add_entry("01-01-2025", 2000.00, "Income", "Salary", "Pay")
+    CSV.add_entry("02-01-2025", 50.00, "Expense", "Transport", "Train")
+
+    out = io.StringIO()
+    chunks = CSV.iter_transactions("01-01-2025", "31-01-2025", chunksize=2)
+    format_transaction_table(chunks, limit=2, out=out)
+    output = out.getvalue()
+
+    assert output.index("Pay") < output.index("Train")
+    assert "Groceries" not in output
+    assert "1 more transactions not shown" in output
+    assert "$150.00" in output  # Expense total includes the hidden row
+    assert "$1,850.00" in output  # Net savings
+
+    # With totals and the row count given, chunks past the limit are never read
+    read = []
+    def chunks():
+        for chunk in CSV.iter_transactions("01-01-2025", "31-01-2025", chunksize=1):
+            read.append(chunk)
+            yield chunk
+    out = io.StringIO()
+    format_transaction_table(chunks(), limit=1, out=out, totals=CSV.get_summary("01-01-2025", "31-01-2025"),
+                             count=CSV.count_transactions("01-01-2025", "31-01-2025"))
+    assert len(read) == 1
+    assert "2 more transactions not shown" in out.getvalue()
+    assert "$1,850.00" in out.getvalue()
+
+def test_summary_matches_full_recompute(test_csv):
+    """Property test: aggregate range summaries equal a full recompute over random ledgers"""
+    rng = random.Random(42)
+    subcategories = {"Income": ["Salary", "Freelance"], "Expense": ["Food", "Housing", "Utilities"]}
+
+    def random_day():
+        return date(2024, 1, 1) + timedelta(days=rng.randrange(800))
+
+    CSV.get_summary("01-01-2024", "01-01-2024")  # create the aggregates so appends update them
+    for _ in range(8):
+        entries = []
+        for _ in range(rng.randrange(1, 60)):
+            category = rng.choice(["Income", "Expense"])
+            entries.append({
+                "date": random_day().strftime(CSV.FORMAT),
+                "amount": rng.randrange(1, 500000) / 100,
+                "category": category,
+                "subcategory": rng.choice(subcategories[category]),
+                "description": "",
+            })
+        CSV.add_entries(entries)
+
+        for _ in range(10):
+            start, end = sorted([random_day(), random_day()])
+            start, end = start.strftime(CSV.FORMAT), end.strftime(CSV.FORMAT)
+            df = CSV._scan_transactions(start, end)
+            cents = (df["amount"] * 100).round().astype("int64")
+            expected = (cents.groupby([df["category"], df["subcategory"]]).sum() / 100).rename("amount")
+            assert CSV.get_summary(start, end).equals(expected.astype(float))
+
+def test_aggregates_rebuild_after_manual_edit(test_csv):
+    """Test that summaries pick up rows added to the CSV by hand"""
+    CSV.add_entry("10-01-2025", 30.00, "Expense", "Food", "Lunch")
+    assert CSV.get_summary("01-01-2025", "31-01-2025")[("Expense", "Food")] == 30.00
+    with open(test_csv, "a", newline="") as f:
+        f.write("12-01-2025,12.25,Expense,Food,Added by hand\r\n")
+    assert CSV.get_summary("01-01-2025", "31-01-2025")[("Expense", "Food")] == 42.25
+
+def test_rebuild_aggregates_follows_storage(test_config, test_columnar, test_sharded, capsys):
+    """Test that --rebuild-aggregates rebuilds the configured backend's aggregates, or says it has none"""
+    ShardedStore.add_entry("05-03-2025", 40.00, "Expense", "Food", "Lunch")
+    shard = ShardedStore._shard(ShardedStore._read_manifest()["shards"][0])
+    ShardedStore.get_summary("01-03-2025", "31-03-2025")
+    os.remove(shard._aggregate_file())
+    config = load_config()
+    config["storage"] = "sharded"
+    save_config(config)
+    project.main(["--rebuild-aggregates"])
+    assert os.path.exists(shard._aggregate_file())
+    assert "Aggregates rebuilt from" in capsys.readouterr().out
+
+    config["storage"] = "columnar"
+    save_config(config)
+    project.main(["--rebuild-aggregates"])
+    assert "keeps no aggregates" in capsys.readouterr().out
+
+
+def test_streamed_export(test_csv, tmp_path):
+    """Test chunked export of the whole ledger and of a date range / column subset"""
+    CSV.add_entry("01-01-2025", 2000.00, "Income", "Salary", "Pay")
+    CSV.add_entry("15-02-2025", 75.25, "Expense", "Food", "")
+    CSV.add_entry("03-01-2025", 20.00, "Expense", "Food", "Lunch")
+
+    stats = export_ledger("csv.gz", str(tmp_path / "all.csv.gz"), chunksize=2)
+    assert stats["rows"] == 3
+    assert pd.read_csv(stats["output_file"]).equals(pd.read_csv(test_csv))
+
+    stats = export_ledger("csv", str(tmp_path / "jan.csv"), start_date="01-01-2025",
+                          end_date="31-01-2025", columns=["date", "amount"])
+    df = pd.read_csv(stats["output_file"])
+    assert list(df.columns) == ["date", "amount"]
+    assert list(df["date"]) == ["01-01-2025", "03-01-2025"]
+
+def test_parquet_export(test_csv, tmp_path):
+    """Test Parquet export when pyarrow is available"""
+    pytest.importorskip("pyarrow")
+    CSV.add_entry("01-01-2025", 2000.00, "Income", "Salary", "Pay")
+    CSV.add_entry("15-02-2025", 75.25, "Expense", "Food", "")
+    stats = export_ledger("parquet", str(tmp_path / "ledger.parquet"), chunksize=1)
+    df = pd.read_parquet(stats["output_file"])
+    assert list(df["amount"]) == [2000.00, 75.25]
+    assert list(df["subcategory"]) == ["Salary", "Food"]
+
+def test_typed_ledger_load(test_csv):
+    """Test the shared loader's dtypes and memory accounting"""
+    CSV.add_entry("01-01-2025", 2000.00, "Income", "Salary", "Pay")
+    CSV.add_entry("02-01-2025", 20.00, "Expense", "Custom", "Not in config")
+    df = CSV.read_ledger()
+    assert pd.api.types.is_datetime64_any_dtype(df["date"])
+    assert df["amount"].dtype == "float64"
+    assert isinstance(df["subcategory"].dtype, pd.CategoricalDtype)
+    assert "Food" in df["subcategory"].cat.categories  # seeded from the config
+    assert list(df["subcategory"]) == ["Salary", "Custom"]  # values outside the config are kept
+
+    CSV.add_entries([{"date": "03-01-2025", "amount": 5.00, "category": "Expense",
+                      "subcategory": "Food", "description": "Snack"}] * 500)
+    typed, untyped = CSV.memory_usage(CSV.read_ledger())
+    assert typed < untyped / 2
+
+def test_columnar_store_matches_csv(test_csv, test_columnar):
+    """Test that the columnar backend returns the same data as the CSV backend"""
+    entries = [
+        ("05-03-2025", 40.00, "Expense", "Food", "Lunch"),
+        ("10-01-2025", 3000.00, "Income", "Salary", "January Salary"),
+        ("20-02-2025", 900.10, "Expense", "Housing", ""),
+        ("10-01-2025", 15.50, "Expense", "Transportation", "Bus"),
+    ]
+    for entry in entries:
+        CSV.add_entry(*entry)
+        ColumnarStore.add_entry(*entry)
+
+    for start, end in [("01-01-2025", "28-02-2025"), ("10-01-2025", "10-01-2025"), ("01-01-2024", "31-12-2025")]:
+        expected = CSV.get_transactions(start, end).reset_index(drop=True)
+        pd.testing.assert_frame_equal(ColumnarStore.get_transactions(start, end), expected)
+        assert ColumnarStore.get_summary(start, end).equals(CSV.get_summary(start, end))
+        assert ColumnarStore.count_transactions(start, end) == CSV.count_transactions(start, end) == len(expected)
+    assert ColumnarStore.get_monthly_totals() == CSV.get_monthly_totals()
+
+def test_columnar_store_ignores_torn_append(test_columnar):
+    """Test that bytes written past the committed row count are discarded on the next append"""
+    ColumnarStore.add_entry("01-01-2025", 10.00, "Expense", "Food", "First")
+    with open(os.path.join(test_columnar, "cents.i8"), "ab") as f:
+        f.write(b"\xff" * 12)
+    ColumnarStore.add_entry("02-01-2025", 20.00, "Expense", "Food", "Second")
+    df = ColumnarStore.get_transactions("01-01-2025", "31-01-2025")
+    assert list(df["amount"]) == [10.00, 20.00]
+    assert list(df["description"]) == ["First", "Second"]
+
+def test_columnar_journal_recovers_lost_writes(test_columnar, monkeypatch):
+    """Test each columnar append fsyncs only its journal, which restores column and meta writes lost in a crash"""
+    ColumnarStore.add_entry("01-01-2025", 10.00, "Expense", "Food", "First")
+    before = {name: open(os.path.join(test_columnar, name), "rb").read()
+              for name in ColumnarStore._journaled_files() + ["meta.json"]}
+
+    fsyncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd))
+    ColumnarStore.add_entry("02-01-2025", 20.00, "Income", "Salary", "Second")
+    assert len(fsyncs) == 1
+    monkeypatch.setattr(os, "fsync", fsync)
+
+    # Power loss: the unsynced column files and meta.json fall back to their old contents
+    for name, data in before.items():
+        with open(os.path.join(test_columnar, name), "wb") as f:
+            f.write(data)
+    ColumnarStore.initialize_csv()
+    df = ColumnarStore.get_transactions("01-01-2025", "31-01-2025")
+    assert list(df["description"]) == ["First", "Second"]
+    assert list(df["amount"]) == [10.00, 20.00]
+    assert os.path.getsize(ColumnarStore._journal_file()) == 0  # checkpointed
+
+    # A torn meta.json is rewritten from the journal too
+    ColumnarStore.add_entry("03-01-2025", 30.00, "Expense", "Food", "Third")
+    with open(ColumnarStore._meta_file(), "w") as f:
+        f.write('{"rows": ')
+    ColumnarStore.initialize_csv()
+    assert len(ColumnarStore.get_transactions("01-01-2025", "31-01-2025")) == 3
+
+def _journal_record(offset, payload):
+    return CSV.JOURNAL_HEADER.pack(CSV.JOURNAL_MAGIC, offset, len(payload), zlib.crc32(payload)) + payload
+
+def test_journal_replay_and_discard(test_csv):
+    """Test crash recovery replays a complete journal and discards a torn one"""
+    CSV.add_entry("01-01-2025", 10.00, "Expense", "Food", "Committed")
+    size = os.path.getsize(test_csv)
+    row = b"02-01-2025,20.0,Expense,Food,Replayed\r\n"
+
+    # Crash after the journal was written but mid-way through the CSV append
+    with open(CSV._journal_file(), "wb") as f:
+        f.write(_journal_record(size, row))
+    with open(test_csv, "ab") as f:
+        f.write(row[:9])
+    CSV.initialize_csv()
+    df = CSV.get_transactions("01-01-2025", "31-01-2025")
+    assert list(df["description"]) == ["Committed", "Replayed"]
+    assert os.path.getsize(CSV._journal_file()) == 0
+
+    # Crash while the journal itself was being written
+    size = os.path.getsize(test_csv)
+    with open(CSV._journal_file(), "wb") as f:
+        f.write(_journal_record(size, row)[:-5])
+    CSV.initialize_csv()
+    assert os.path.getsize(test_csv) == size
+    assert len(CSV.get_transactions("01-01-2025", "31-01-2025")) == 2
+
+    # The CSV was cut short after the journal was written, e.g. by a hand edit
+    with open(CSV._journal_file(), "wb") as f:
+        f.write(_journal_record(size, row))
+    os.truncate(test_csv, size - len(row))
+    CSV.initialize_csv()
+    assert os.path.getsize(test_csv) == size - len(row)
+    assert b"\0" not in open(test_csv, "rb").read()
+    assert os.path.getsize(CSV._journal_file()) == 0
+    assert list(CSV.get_transactions("01-01-2025", "31-01-2025")["description"]) == ["Committed"]
+
+def _stress_writer(csv_file, worker, count):
+    CSV.CSV_FILE = csv_file
+    with LedgerWriter(CSV, batch_size=7) as writer:
+        for i in range(count):
+            writer.add({"date": "01-03-2025", "amount": 1.00, "category": "Expense",
+                        "subcategory": "Food", "description": f"w{worker}-{i}"})
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork and fcntl")
+def test_concurrent_writers_lose_no_rows(test_csv):
+    """Stress test: several processes group-committing at once lose and tear no rows"""
+    workers, count = 4, 60
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_stress_writer, args=(test_csv, w, count)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    df = pd.read_csv(test_csv)
+    assert len(df) == workers * count
+    assert set(df["description"]) == {f"w{w}-{i}" for w in range(workers) for i in range(count)}
+    assert len(CSV.get_transactions("01-03-2025", "01-03-2025")) == workers * count
+
+def test_startup_skips_heavy_imports(tmp_path):
+    """Test that importing the CLI and using the validators stays within the startup budget"""
+    code = (
+        "import sys, project\n"
+        "project.get_amount(test_input='12.50')\n"
+        "project.get_date(test_input='01-01-2025')\n"
+        "project.CSV.CSV_FILE = sys.argv[1]\n"
+        "with open(sys.argv[1], 'w') as f:\n"  # an existing ledger without sidecars is indexed on open
+        "    f.write('date,amount,category,subcategory,description,currency\\n31-12-2024,9.00,Expense,Food,Tea,\\n')\n"
+        "project.CSV.initialize_csv()\n"
+        "project.CSV.add_entry('01-01-2025', 12.50, 'Expense', 'Food', 'Lunch')\n"
+        "with open(sys.argv[1], 'a') as f:\n"  # a hand edit leaves the sidecars stale; writes must not rebuild them
+        "    f.write('02-01-2025,3.00,Expense,Food,Tea\\n')\n"
+        "project.CSV.add_entry('03-01-2025', 4.00, 'Expense', 'Food', 'Cake')\n"
+        "heavy = [name for name in ('pandas', 'numpy') if name in sys.modules]\n"
+        "assert not heavy, heavy\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code, str(tmp_path / "ledger.csv")],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    assert result.returncode == 0, result.stderr
+    cumulative_us = {
+        line.split("|")[2].strip(): int(line.split("|")[1])
+        for line in result.stderr.splitlines() if line.startswith("import time:") and "|" in line
+        and line.split("|")[1].strip().isdigit()
+    }
+    assert cumulative_us["project"] / 1000 < STARTUP_BUDGET_MS
+
+def test_daemon_serves_queries_and_ingests_appends(test_csv, test_config, tmp_path):
+    """Test the resident daemon answers from memory, validates writes and picks up external appends"""
+    CSV.add_entry("01-01-2025", 2000.00, "Income", "Salary", "Pay")
+    socket_path = str(tmp_path / "daemon.sock")
+    daemon = LedgerDaemon(CSV, poll_interval=0.05)
+    thread = threading.Thread(target=asyncio.run, args=(daemon.serve(socket_path),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    # The socket file appears at bind(), slightly before the server accepts connections
+    while time.monotonic() < deadline:
+        try:
+            ping = daemon_request({"op": "ping"}, socket_path)
+            break
+        except OSError:
+            time.sleep(0.01)
+
+    try:
+        assert ping["rows"] == 1
+
+        response = daemon_request({"op": "add", "entries": [
+            {"date": "03-01-2025", "amount": "25.50", "category": "Expense", "subcategory": "Food", "description": "Lunch"},
+            {"date": "03-01-2025", "amount": "-5", "category": "Expense", "subcategory": "Food", "description": "Bad"},
+        ]}, socket_path)
+        assert response["added"] == 1
+        assert [line_no for line_no, _ in response["errors"]] == [2]
+
+        # Non-finite amounts, whether JSON's NaN/Infinity or strings, get the same rejection as imports
+        response = daemon_request({"op": "add", "entries": [
+            {"date": "03-01-2025", "amount": amount, "category": "Expense", "subcategory": "Food"}
+            for amount in (float("nan"), float("inf"), "-inf", "nan")
+        ]}, socket_path)
+        assert response["ok"] and response["added"] == 0
+        assert [line_no for line_no, _ in response["errors"]] == [1, 2, 3, 4]
+        assert all("finite" in error for _, error in response["errors"])
+
+        response = daemon_request({"op": "summary", "start": "01-01-2025", "end": "31-01-2025"}, socket_path)
+        assert response["totals"] == [["Expense", "Food", 25.5], ["Income", "Salary", 2000.0]]
+
+        # Rows appended by another process show up without restarting the daemon
+        with open(test_csv, "a", newline="") as f:
+            f.write("02-01-2025,9.75,Expense,Transport,Bus\r\n")
+        rows = []
+        while len(rows) < 3 and time.monotonic() < deadline:
+            rows = daemon_request({"op": "query", "start": "01-01-2025", "end": "31-01-2025"}, socket_path)["rows"]
+            time.sleep(0.02)
+        assert [row["description"] for row in rows] == ["Pay", "Bus", "Lunch"]
+
+        assert not daemon_request({"op": "query", "start": "bad"}, socket_path)["ok"]
+    finally:
+        daemon_request({"op": "shutdown"}, socket_path)
+        thread.join(timeout=10)
+    assert not thread.is_alive()
+
+@pytest.mark.parametrize("backend", ["csv", "columnar"])
+def test_budget_counters_match_recompute(backend, test_csv, test_columnar, test_config):
+    """Property test: incrementally maintained budget counters equal a full recompute of the ledger"""
+    store = {"csv": CSV, "columnar": ColumnarStore}[backend]
+    rng = random.Random(7)
+    subcategories = {"Income": ["Salary", "Freelance"], "Expense": ["Food", "Transport"]}
+    set_budget("Food", monthly=500)
+    budget_spend(store, date(2024, 1, 1).toordinal())  # create the counters so appends update them
+    for _ in range(6):
+        entries = []
+        for _ in range(rng.randrange(1, 80)):
+            category = rng.choice(["Income", "Expense"])
+            entries.append({
+                "date": (date(2024, 1, 1) + timedelta(days=rng.randrange(800))).strftime(CSV.FORMAT),
+                "amount": rng.randrange(1, 50000) / 100,
+                "category": category,
+                "subcategory": rng.choice(subcategories[category]),
+                "description": "",
+            })
+        store.add_entries(entries)
+        store.add_entry("15-06-2025", 12.34, "Expense", "Food", "Lunch")
+
+        df = store.read_ledger()
+        df = df[df["category"] == "Expense"]
+        cents = (df["amount"] * 100).round().astype("int64")
+        for day in (date(2024, 2, 10), date(2025, 6, 1), date(2026, 1, 31)):
+            month = df["date"].dt.to_period("M") == pd.Period(day, "M")
+            year = df["date"].dt.year == day.year
+            expected = {}
+            for kind, mask in (("monthly", month), ("yearly", year)):
+                for subcategory, total in cents[mask].groupby(df["subcategory"][mask], observed=True).sum().items():
+                    expected[(kind, subcategory)] = total
+            assert budget_spend(store, day.toordinal()) == expected
+    rebuilt_before = budget_spend(store, date(2025, 6, 1).toordinal())
+    rebuild_budget_counters(store)
+    assert budget_spend(store, date(2025, 6, 1).toordinal()) == rebuilt_before
+
+def test_over_budget_warning(test_csv, test_config, capsys):
+    """Test that adding a transaction warns as soon as it pushes a budget over its limit"""
+    set_budget("Food", monthly=50, yearly=1000)
+    assert not set_budget("Food", monthly=80, yearly=-1)  # a rejected limit leaves the others unchanged too
+    assert load_config()["budgets"]["Food"] == {"monthly": 50, "yearly": 1000}
+    CSV.add_entry("10-01-2025", 30.00, "Expense", "Food", "Lunch")
+    assert "Over budget" not in capsys.readouterr().out
+    CSV.add_entry("12-01-2025", 25.00, "Expense", "Food", "Dinner")
+    out = capsys.readouterr().out
+    assert "Over budget: Food monthly (01-2025)" in out
+    assert "yearly" not in out
+    with open(test_csv, "a", newline="") as f:
+        f.write("01-02-2025,990.00,Expense,Food,Added by hand\r\n")
+    CSV.add_entry("02-02-2025", 1.00, "Expense", "Food", "Snack")
+    assert "Over budget: Food yearly (2025)" in capsys.readouterr().out
+
+def test_report_series_are_downsampled():
+    """Test that report series stay within max_points and keep the ledger's totals"""
+    monthly_totals = []
+    for month in range(24000, 25000):
+        monthly_totals.append((month, "Income", "Salary", 300000))
+        monthly_totals.append((month, "Expense", "Food" if month % 2 else "Rent", 100000 + month))
+    series = build_report_series(monthly_totals, max_points=100)
+    assert len(series["trends"]["labels"]) == 100
+    assert series["trends"]["bin_months"] == 10
+    income = sum(row[3] for row in monthly_totals if row[1] == "Income") / 100
+    expense = sum(row[3] for row in monthly_totals if row[1] == "Expense") / 100
+    assert sum(series["trends"]["income"]) == pytest.approx(income)
+    assert sum(series["categories"]["expense"].values()) == pytest.approx(expense)
+    assert series["net_savings"]["net"][-1] == pytest.approx(income - expense)
+
+    partial = build_report_series(monthly_totals, start_month=24010, end_month=24011)
+    assert partial["trends"]["labels"] == ["11-2000", "12-2000"]
+    assert partial["categories"]["expense"] == {"Food": 1240.11, "Rent": 1240.10}
+
+def test_report_renders_charts(test_csv, test_config, tmp_path):
+    """Test that the report renders every chart headlessly in a process pool"""
+    CSV.add_entry("05-01-2025", 3000.00, "Income", "Salary", "January Salary")
+    CSV.add_entry("10-01-2025", 40.00, "Expense", "Food", "Lunch")
+    CSV.add_entry("02-03-2025", 80.00, "Expense", "Transport", "Train")
+    output_dir = tmp_path / "reports"
+    results = generate_report(str(output_dir), "svg", workers=2)
+    assert [name for name, _, _ in results] == list(project.REPORT_CHARTS)
+    for name, path, seconds in results:
+        assert path == str(output_dir / f"{name}.svg")
+        assert "<svg" in open(path).read(2000)
+        assert seconds > 0
+
+@pytest.fixture
+def test_fx_rates(tmp_path, monkeypatch):
+    """Fixture with a small euro reference rate table"""
+    rates_file = tmp_path / "fx_rates.csv"
+    rates_file.write_text(
+        "date,code,rate\n"
+        "01-01-2025,USD,1.10\n"
+        "01-02-2025,USD,1.20\n"
+        "01-01-2025,GBP,0.80\n"
+    )
+    monkeypatch.setattr(project, "FX_RATES_FILE", str(rates_file))
+    yield str(rates_file)
+
+def test_currency_conversion(test_csv, test_columnar, test_config, test_fx_rates, tmp_path):
+    """Test that summaries, tables and exports convert per-row currencies with as-of rates"""
+    entries = [
+        ("05-01-2025", 100.00, "Expense", "Food", "Paris", "EUR"),     # 110.00 USD
+        ("05-02-2025", 100.00, "Expense", "Food", "Paris", "EUR"),     # 120.00 USD
+        ("06-02-2025", 100.00, "Expense", "Food", "London", "GBP"),    # 150.00 USD
+        ("07-02-2025", 2000.00, "Income", "Salary", "Pay", ""),
+    ]
+    for entry in entries:
+        CSV.add_entry(*entry)
+        ColumnarStore.add_entry(*entry)
+
+    for store in (CSV, ColumnarStore):
+        summary = store.get_summary("01-01-2025", "28-02-2025")
+        assert summary[("Expense", "Food")] == pytest.approx(380.00)
+        assert summary[("Income", "Salary")] == 2000.00
+    assert CSV.get_monthly_totals() == [(24300, "Expense", "Food", 11000),
+                                        (24301, "Expense", "Food", 27000), (24301, "Income", "Salary", 200000)]
+    assert ColumnarStore.get_monthly_totals() == CSV.get_monthly_totals()
+
+    out = io.StringIO()
+    format_transaction_table(CSV.iter_transactions("01-02-2025", "28-02-2025"), out=out)
+    assert "$120.00" in out.getvalue() and "$150.00" in out.getvalue()
+
+    stats = export_ledger("csv", str(tmp_path / "ledger.csv"))
+    df = pd.read_csv(stats["output_file"], keep_default_na=False)
+    assert list(df["amount"]) == [110.00, 120.00, 150.00, 2000.00]
+    assert list(df["currency"]) == ["USD", "USD", "USD", ""]
+
+    # Switching the display currency converts ledger-currency rows instead of relabelling them
+    config = load_config()
+    config["base_currency"] = "USD"
+    config["currency"] = {"symbol": "€", "code": "EUR", "position": "before"}
+    save_config(config)
+    summary = CSV.get_summary("01-02-2025", "28-02-2025")
+    assert summary[("Income", "Salary")] == pytest.approx(2000.00 / 1.20)
+    assert summary[("Expense", "Food")] == pytest.approx(100.00 + 100.00 / 0.80)
+
+    with pytest.raises(ValueError, match="No exchange rate for GBP"):
+        convert_amounts([1.00], ["GBP"], [date(2024, 12, 31).toordinal()], "EUR")
+
+def test_legacy_ledger_gains_currency_column(test_config, tmp_path, monkeypatch):
+    """Test that a ledger written before the currency column, like the sample data, is upgraded in place"""
+    ledger = str(tmp_path / "finance_data.csv")
+    shutil.copy("finance_data.csv", ledger)  # the tracked sample itself is never rewritten
+    monkeypatch.setattr(CSV, "CSV_FILE", ledger)
+    CSV.initialize_csv()
+    CSV.add_entry("31-01-2025", 12.00, "Expense", "Food", "Snack")
+    with open(ledger, newline="") as f:
+        assert f.readline() == "date,amount,category,subcategory,description,currency\r\n"
+    df = CSV.get_transactions("01-01-2025", "31-01-2025")
+    assert list(df["amount"]) == [3500.00, 800.00, 150.00, 200.00, 300.00, 12.00]
+    assert df["currency"].isna().all()
+    assert CSV.get_summary("01-01-2025", "31-01-2025")[("Expense", "Food")] == 212.00
+    with open("finance_data.csv", newline="") as f:
+        assert f.readline() == "date,amount,category,subcategory,description\r\n"
+
+
+def test_synthetic_ledger_is_reproducible(tmp_path):
+    """Test that the benchmark ledger generator is seeded and follows the config's categories"""
+    config = {"categories": {"Income": ["Salary", "Bonus"], "Expense": ["Food", "Pets"]}}
+    first = benchmark.generate_ledger(str(tmp_path / "a.csv"), 5000, seed=7, config=config, chunk_rows=2000)
+    second = benchmark.generate_ledger(str(tmp_path / "b.csv"), 5000, seed=7, config=config, chunk_rows=2000)
+    with open(first, "rb") as a, open(second, "rb") as b:
+        assert a.read() == b.read()
+    df = pd.read_csv(first)
+    assert len(df) == 5000 and list(df.columns) == CSV.COLUMNS
+    assert set(df["subcategory"]) == {"Salary", "Bonus", "Food", "Pets"}
+    assert (df.loc[df["category"] == "Income", "subcategory"].isin(["Salary", "Bonus"])).all()
+    assert df["amount"].min() > 0
+    # Salaries are larger than groceries
+    assert df.loc[df["subcategory"] == "Salary", "amount"].median() > 10 * df.loc[df["subcategory"] == "Food", "amount"].median()
+
+def test_benchmark_baseline_comparison():
+    """Test that only metrics worse than the baseline by more than the threshold are regressions"""
+    baseline = {"results": {"render/10000": {"full_table_s": 1.0, "full_table_rows_per_s": 1000.0, "shown": 5},
+                            "range_query/10000": {"indexed_ms": 2.0}}}
+    results = {"results": {"render/10000": {"full_table_s": 1.1, "full_table_rows_per_s": 500.0, "shown": 50},
+                           "range_query/10000": {"indexed_ms": 3.0},
+                           "range_query/100000": {"indexed_ms": 9.0}}}
+    regressions = benchmark.compare_results(results, baseline, threshold=0.2)
+    assert [(name, metric) for name, metric, *_ in regressions] == [
+        ("render/10000", "full_table_rows_per_s"), ("range_query/10000", "indexed_ms")]
+    assert regressions[0][4] == pytest.approx(1.0)
+    assert benchmark.compare_results(results, baseline, threshold=1.5) == []
+
+
+def test_profile_breakdown(test_csv, test_config, tmp_path):
+    """Test that --profile records stage timings, rows scanned vs returned and config reloads"""
+    CSV.add_entries([{"date": f"{day:02d}-01-2025", "amount": 10.0, "category": "Expense",
+                      "subcategory": "Food", "description": f"Meal {day}"} for day in range(1, 29)])
+    with profiling() as metrics:
+        CSV.get_transactions("01-01-2025", "07-01-2025")
+        CSV._scan_transactions("01-01-2025", "07-01-2025")
+    assert {"csv.index_lookup", "csv.seek_read", "csv.read_csv", "scan.date_mask"} <= set(metrics["stages"])
+    assert metrics["counters"]["rows.returned"] == 14
+    assert metrics["counters"]["rows.scanned"] == 7 + 28
+    assert metrics["counters"]["bytes.read"] > 0
+    assert not project._profile["enabled"]
+
+    output = str(tmp_path / "profile.json")
+    os.utime(test_config, ns=(0, 0))  # force a config reload
+    project.main(["--profile-json", output, "view", "01-01-2025", "31-01-2025", "--limit", "5"])
+    with open(output) as f:
+        dumped = json.load(f)
+    assert dumped["command"] == "view"
+    assert dumped["counters"]["rows.rendered"] == 5
+    assert dumped["counters"]["config.reloads"] == 1
+    assert dumped["stages"]["render.rows"]["calls"] == 1
+
+def test_profiling_off_overhead(test_csv, test_config):
+    """Test that the profiling hooks cost well under 1% of a query while profiling is off"""
+    CSV.add_entries([{"date": f"{day % 28 + 1:02d}-01-2025", "amount": 10.0, "category": "Expense",
+                      "subcategory": "Food", "description": f"Meal {day}"} for day in range(2000)])
+
+    def query():
+        df = CSV.get_transactions("01-01-2025", "31-01-2025")
+        format_transaction_table(df, out=io.StringIO(), totals=CSV.get_summary("01-01-2025", "31-01-2025"))
+
+    query()
+    with profiling() as metrics:
+        query()
+    # Generous upper bound on how many hooks one query passes through
+    hooks = 10 * (sum(stage["calls"] for stage in metrics["stages"].values()) + len(metrics["counters"]))
+
+    def disabled_hooks():
+        for _ in range(hooks):
+            with project.profile_stage("stage"):
+                pass
+            project.profile_count("counter")
+
+    def best_time(fn):
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    assert best_time(disabled_hooks) < 0.01 * best_time(query)
+    assert "stage" not in project._profile["stages"] and "counter" not in project._profile["counters"]
+
+
+@pytest.mark.parametrize("backend", ["csv", "columnar"])
+def test_search_index(backend, test_csv, test_columnar, test_config, monkeypatch):
+    """Test combined searches through the inverted index, kept up to date by appends"""
+    store = {"csv": CSV, "columnar": ColumnarStore}[backend]
+    store.add_entries([
+        {"date": "01-01-2024", "amount": 900.00, "category": "Expense", "subcategory": "Food", "description": "Rent payment"},
+        {"date": "01-02-2024", "amount": 950.00, "category": "Expense", "subcategory": "Transport", "description": "rent, February"},
+        {"date": "01-02-2023", "amount": 900.00, "category": "Expense", "subcategory": "Food", "description": "Rent payment"},
+        {"date": "15-02-2024", "amount": 40.00, "category": "Income", "subcategory": "Salary", "description": "Rent refund"},
+        {"date": "16-02-2024", "amount": 12.50, "category": "Expense", "subcategory": "Food", "description": "Parent's lunch"},
+    ])
+    assert len(search_transactions(["rent"], store=store)) == 4
+    assert list(search_transactions(["RENT"], category="Expense", year=2024, store=store)["amount"]) == [900.0, 950.0]
+    assert list(search_transactions(["rent", "payment"], subcategory="food", store=store)["date"].dt.year) == [2023, 2024]
+    assert list(search_transactions(min_amount=40, max_amount=900, store=store)["amount"]) == [900.0, 900.0, 40.0]
+    assert search_transactions(["rent"], start_date="02-01-2024", end_date="14-02-2024", store=store)["description"].tolist() == ["rent, February"]
+    assert search_transactions(["lunch"], category="Income", store=store).empty
+
+    # Later appends extend the index instead of rebuilding it
+    monkeypatch.setattr(project, "rebuild_search_index", lambda store=None: pytest.fail("index was rebuilt"))
+    store.add_entry("20-02-2024", 905.00, "Expense", "Food", "Late rent")
+    assert list(search_transactions(["rent"], category="Expense", year=2024, store=store)["amount"]) == [900.0, 950.0, 905.0]
+    assert len(search_transactions(min_amount=900.5, max_amount=950, store=store)) == 2
+    with pytest.raises(ValueError):
+        search_transactions(store=store)
+
+
+@pytest.mark.parametrize("backend", ["csv", "columnar", "sharded"])
+def test_duplicate_policies(backend, test_csv, test_columnar, test_sharded, test_config, tmp_path, capsys, monkeypatch):
+    """Test that re-imports skip, warn about or force rows already in the ledger"""
+    store = {"csv": CSV, "columnar": ColumnarStore, "sharded": ShardedStore}[backend]
+    monkeypatch.setattr(project, "get_store", lambda: store)
+    feed = tmp_path / "feed.csv"
+    feed.write_text(
+        "date,amount,category,subcategory,description\n"
+        "01-03-2024,4.50,Expense,Food,Coffee shop\n"
+        "01-03-2024,4.50,Expense,Food,Coffee shop\n"
+        "02-03-2024,30.00,Expense,Transport,Train ticket\n"
+    )
+    assert import_transactions(str(feed))[0] == 3  # identical rows within one feed are all kept
+    assert import_transactions(str(feed), duplicates="skip")[0] == 0
+    assert "3 entries duplicate existing transactions (skipped)" in capsys.readouterr().out
+    assert import_transactions(str(feed))[0] == 3  # the default policy warns but still writes
+    assert "(added anyway)" in capsys.readouterr().out
+    assert import_transactions(str(feed), duplicates="force")[0] == 3
+    assert "duplicate" not in capsys.readouterr().out
+
+    # Fuzzy matching allows a little date and amount drift; case and punctuation never matter
+    drifted = {"date": "03-03-2024", "amount": 30.30, "category": "Expense", "subcategory": "Transport", "description": "TRAIN ticket!"}
+    assert store.add_entries([drifted], DuplicateCheck(store, "skip", fuzzy=True)) == 0
+    assert store.add_entries([drifted], DuplicateCheck(store, "skip")) == 1
+
+    # Large batches take the vectorized path; each existing row absorbs one new entry
+    meals = [{"date": f"{day % 28 + 1:02d}-04-2024", "amount": day + 1.0, "category": "Expense",
+              "subcategory": "Food", "description": f"Meal {day % 7}"} for day in range(300)]
+    assert store.add_entries(meals) == 300
+    assert store.add_entries(meals + meals[:10], DuplicateCheck(store, "skip")) == 10
+    assert len(store.read_ledger()) == 9 + 1 + 310
+
+
+def test_existing_ledger_is_fingerprinted(test_config, tmp_path, monkeypatch, capsys):
+    """Test that a ledger from before duplicate detection is indexed on first use, exactly as a rebuild would"""
+    ledger = str(tmp_path / "finance_data.csv")
+    shutil.copy("finance_data.csv", ledger)
+    monkeypatch.setattr(CSV, "CSV_FILE", ledger)
+    CSV.initialize_csv()
+    with open(CSV._fingerprint_file(), "rb") as f:
+        seeded = f.read()
+    project.rebuild_fingerprints(CSV)
+    with open(CSV._fingerprint_file(), "rb") as f:
+        assert f.read() == seeded
+
+    os.remove(CSV._fingerprint_file())  # adding without opening the ledger first seeds it too
+    CSV.add_entry("28-01-2025", 200.00, "Expense", "Food", "Grocery Shopping")
+    assert "1 entry duplicates an existing transaction (added anyway)" in capsys.readouterr().out
+
+
+def test_fingerprint_tail_is_merged(test_csv, test_config, monkeypatch):
+    """Test that single adds fold appended fingerprints into the sorted index and still find every row"""
+    monkeypatch.setattr(project, "DEDUPE_COMPACT_MIN", 2)
+    entries = [{"date": f"{day:02d}-05-2024", "amount": 7.0 * day, "category": "Expense", "subcategory": "Food",
+                "description": f"Meal {day % 3}"} for day in range(1, 9)]
+    for entry in entries:
+        assert CSV.add_entries([entry], DuplicateCheck(CSV, "skip")) == 1
+    sorted_count, tail_count = project._fingerprint_counts(CSV)
+    assert sorted_count >= 6 and tail_count <= 2
+    assert CSV.add_entries(entries, DuplicateCheck(CSV, "skip")) == 0
+
+
+def test_malformed_row_never_blocks_writes(test_csv, test_config, capsys):
+    """Test that a hand-edited row the indexes cannot read leaves duplicate checks off instead of failing adds"""
+    with open(test_csv, "a") as f:
+        f.write("2025-01-31,12.00,Expense,Food,Lunch\n")
+    CSV.add_entry("01-02-2025", 12.00, "Expense", "Food", "Lunch")
+    out = capsys.readouterr().out
+    assert "1 new entry was not checked" in out
+    assert "Entry added successfully" in out
+    assert len(pd.read_csv(test_csv)) == 2
+    project.main(["dedupe"])
+    assert "Could not index the ledger" in capsys.readouterr().out
+
+
+def test_dedupe_command(test_csv, test_config, capsys):
+    """Test that dedupe indexes an existing ledger, lists repeats and sets the policy"""
+    with open(test_csv, "a") as f:  # rows written by another tool leave the fingerprints stale
+        f.write("05-03-2024,12.00,Expense,Food,Lunch\n05-03-2024,12.00,Expense,Food,lunch\n"
+                "06-03-2024,12.00,Expense,Food,Lunch\n")
+    project.main(["dedupe"])
+    assert "Exact repeats of an earlier transaction: 1" in capsys.readouterr().out
+
+    project.main(["dedupe", "--policy", "skip", "--fuzzy", "--fuzzy-days", "2"])
+    assert load_config()["duplicates"] == {"policy": "skip", "fuzzy": True, "fuzzy_days": 2}
+    CSV.add_entry("07-03-2024", 12.10, "Expense", "Food", "Lunch")
+    assert "1 entry duplicates an existing transaction (skipped)" in capsys.readouterr().out
+    CSV.add_entry("09-03-2024", 12.00, "Expense", "Food", "Lunch")
+    assert "Entry added successfully" in capsys.readouterr().out
+    assert len(CSV.read_ledger()) == 4
+
+
+def test_sharded_store_matches_csv(test_csv, test_sharded, monkeypatch):
+    """Test that shards are pruned by date and account and pooled summaries match the CSV backend"""
+    rng = random.Random(19)
+    entries = [{"date": f"{rng.randint(1, 28):02d}-{rng.randint(1, 6):02d}-2025", "amount": rng.randint(1, 500) / 4,
+                "category": rng.choice(["Income", "Expense"]), "subcategory": rng.choice(["Food", "Rent", "Salary"]),
+                "description": f"Row {n}", "account": rng.choice(["", "savings"])} for n in range(200)]
+    CSV.add_entries([{k: v for k, v in entry.items() if k != "account"} for entry in entries])
+    assert ShardedStore.add_entries(entries) == 200
+    assert len(ShardedStore._read_manifest()["shards"]) == 12  # six months for each of two accounts
+
+    monkeypatch.setattr(ShardedStore, "WORKERS", 2)
+    monkeypatch.setattr(ShardedStore, "_pool", None)
+    ShardedStore.get_summary("01-01-2025", "31-12-2025")
+    assert ShardedStore._pool is None  # too few rows to be worth a process pool
+    monkeypatch.setattr(ShardedStore, "POOL_MIN_ROWS", 0)
+    for start, end in [("01-01-2025", "31-12-2025"), ("10-02-2025", "20-03-2025"), ("05-04-2025", "05-04-2025")]:
+        expected = CSV.get_transactions(start, end).sort_values(["date", "description"], ignore_index=True)
+        actual = ShardedStore.get_transactions(start, end).sort_values(["date", "description"], ignore_index=True)
+        pd.testing.assert_frame_equal(actual, expected)
+        pd.testing.assert_series_equal(ShardedStore.get_summary(start, end), CSV.get_summary(start, end))
+        assert ShardedStore.count_transactions(start, end) == len(expected)
+    assert ShardedStore.get_monthly_totals() == CSV.get_monthly_totals()
+    key, pool = ShardedStore._pool
+    assert key[1] == 2 and pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    ShardedStore.get_summary("01-01-2025", "31-12-2025")
+    assert ShardedStore._pool[1] is pool  # one pool per process, reused across queries
+    pool.shutdown()
+
+    with profiling() as metrics:
+        savings = ShardedStore.get_transactions("01-02-2025", "28-02-2025", accounts=["savings"])
+    assert (metrics["counters"]["shards.read"], metrics["counters"]["shards.pruned"]) == (1, 11)
+    assert set(savings["description"]) == {e["description"] for e in entries
+                                           if e["account"] == "savings" and e["date"].endswith("-02-2025")}
+
+
+def test_split_command(test_csv, test_config, tmp_path, monkeypatch, capsys):
+    """Test that split copies the ledger into shards and switches storage to them"""
+    monkeypatch.setattr(ShardedStore, "DATA_DIR", str(tmp_path / "ledger.shards"))
+    for entry in [("30-12-2024", 50.00, "Expense", "Food", "Dinner"), ("02-01-2025", 3000.00, "Income", "Salary", ""),
+                  ("15-02-2025", 20.00, "Expense", "Food", "Lunch")]:
+        CSV.add_entry(*entry)
+    project.main(["split", "--period", "month"])
+    assert "Split 3 transactions into 3 shards by month" in capsys.readouterr().out
+    assert project.get_store() is ShardedStore
+    assert len(ShardedStore.read_ledger()) == 3
+
+    ShardedStore.add_entry("20-02-2025", 5.00, "Expense", "Food", "Snack")
+    assert list(ShardedStore.get_transactions("01-02-2025", "28-02-2025")["description"]) == ["Lunch", "Snack"]
+    assert search_transactions(["snack"])["amount"].tolist() == [5.00]
+    project.main(["split"])  # refuses to overwrite a store that already holds transactions
+    assert "already contains transactions" in capsys.readouterr().out
+
+    os.remove(os.path.join(ShardedStore.DATA_DIR, "manifest.json"))  # e.g. lost in a crash
+    project.main(["split"])
+    assert "already contains transactions" in capsys.readouterr().out
+    ShardedStore.add_entry("21-02-2025", 6.00, "Expense", "Food", "Bagel")
+    assert list(ShardedStore.get_transactions("01-02-2025", "28-02-2025")["description"]) == ["Lunch", "Snack", "Bagel"]
+    assert len(ShardedStore.read_ledger()) == 5